@@ -0,0 +1,407 @@
+"""
+Benchmark each stage of the pipeline on synthetic data
+
+Generates order files shaped like the example input config (three date
+formats and a join file) in a temporary folder, then times reading,
+date parsing, concat, join, range filtering, column formatting and writing
+separately, with the change of resident memory over each stage. The
+whole read path (InputHandler.read_input_files) is run first, so the peak
+memory of the process right after it is the read path's own and can be
+compared with and without --chunksize. Results are printed (and optionally
+appended) as JSON lines so runs can be compared over time.
+
+Usage:
+    python3 benchmarks/benchmark_pipeline.py [--rows N [N ...]]
+        [--writer NAME] [--skus N] [--extra-columns N] [--seed N]
+        [--chunksize N] [--output FILE] [--keep]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+from datetime import datetime as dt
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# make srcs importable when ran from anywhere
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from srcs.input_handler import InputHandler  # noqa: E402
+from srcs.output_handler import OutputHandler  # noqa: E402
+from srcs.config_reader import WRITERS  # noqa: E402
+from srcs.sheet_writers import create_sheet_writer  # noqa: E402
+from srcs.instrumentation import get_rss_mb  # noqa: E402
+
+# rows that fit in a sheet below the header
+EXCEL_ROW_LIMIT = 1048575
+
+# number of rows generated and written at a time
+GENERATE_CHUNKSIZE = 1000000
+
+# order files as (filename, date column, date format, sku column, qty column)
+ORDER_FILES = [
+    ("bench_one.csv", "Order Date", "%Y/%m/%d", "SKU", "QTY"),
+    ("bench_two.csv", "Date of Order", "%Y-%m-%d", "SKU Number", "Quantity"),
+    ("bench_three.csv", "DOO", "%d/%m/%Y", "Product SKU", "Product QTY"),
+]
+JOIN_FILE = "bench_join.csv"
+
+# stages in the order they run
+STAGES = ["read_input_files", "csv_read", "date_parse", "concat", "join",
+          "range_filter", "format", "write"]
+
+
+def get_peak_rss_mb() -> float | None:
+    """
+    Get the peak resident memory of the process so far
+
+    The peak never goes down, so it's only reported for the whole process,
+    not for stages that run after others
+
+    Returns:
+        peak resident memory in MB or None if it can't be measured
+    """
+
+    if resource is None:
+        return None
+
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10),
+                 1)
+
+
+def generate_input_files(rows: int, skus: int,
+                         extra_columns: int, seed: int) -> None:
+    """
+    Generate synthetic input files in the "input_files" folder
+
+    Arguments:
+        rows (int):
+            total number of order rows across the order files
+        skus (int):
+            number of distinct SKUs in the join file
+        extra_columns (int):
+            number of unused columns in each order file
+        seed (int):
+            seed of the random generator
+    """
+
+    rng = np.random.default_rng(seed)
+    os.makedirs("input_files", exist_ok=True)
+
+    # product master list to join on
+    sku_names = np.array([f"A{index}" for index in range(1, skus + 1)])
+    pd.DataFrame({"SKU": sku_names,
+                  "Product Name": [f"Example Product {index}"
+                                   for index in range(1, skus + 1)],
+                  "Price": rng.integers(1, 1000, skus) + 0.9}
+                 ).to_csv("input_files/" + JOIN_FILE, index=False)
+
+    # order files split the rows evenly across a year of dates
+    days = pd.date_range("2023-01-01", "2023-12-31")
+    for index, order_file in enumerate(ORDER_FILES):
+        filename, date_col, date_format, sku_col, qty_col = order_file
+        file_rows = rows // len(ORDER_FILES)
+        file_rows += index < rows % len(ORDER_FILES)
+
+        # format each distinct date once and pick from them
+        date_labels = np.array(days.strftime(date_format))
+        for begin in range(0, max(file_rows, 1), GENERATE_CHUNKSIZE):
+            count = min(GENERATE_CHUNKSIZE, file_rows - begin)
+            chunk = pd.DataFrame({
+                date_col: date_labels[rng.integers(0, len(days), count)],
+                sku_col: sku_names[rng.integers(0, skus, count)],
+                qty_col: rng.integers(1, 30, count)})
+            for extra in range(extra_columns):
+                chunk[f"Extra {extra + 1}"] = rng.integers(0, 1000, count)
+            chunk.to_csv("input_files/" + filename, index=False,
+                         mode="w" if begin == 0 else "a",
+                         header=begin == 0)
+
+
+def write_configs(chunksize: int | None = None) -> None:
+    """
+    Write input and output configs for the synthetic input files
+
+    Arguments:
+        chunksize (int | None):
+            number of rows to read order files in at a time, or None to
+            read them whole
+    """
+
+    os.makedirs("configs", exist_ok=True)
+
+    # input config mirroring input_config_example.json
+    input_config = [{"filename": filename,
+                     "columns": [{"name": "Order Date", "from": date_col,
+                                  "format": date_format},
+                                 {"name": "SKU", "from": sku_col},
+                                 {"name": "QTY", "from": qty_col},
+                                 {"name": "Origin", "value": filename}]}
+                    for filename, date_col, date_format, sku_col, qty_col
+                    in ORDER_FILES]
+    if chunksize:
+        for input_file in input_config:
+            input_file["chunksize"] = chunksize
+    input_config.append({"filename": JOIN_FILE, "join_on": "SKU",
+                         "columns": [{"name": "SKU", "from": "SKU"},
+                                     {"name": "Product Name",
+                                      "from": "Product Name"},
+                                     {"name": "Price", "from": "Price"}]})
+
+    # output config with a sheet per month like output_config_example.json
+    sheets = []
+    for month in range(1, 13):
+        end = pd.Timestamp(2023, month, 1) + pd.offsets.MonthEnd(0)
+        sheets.append({"name": f"month_{month}", "title": f"Month {month}",
+                       "type": "sheet",
+                       "range": {"column": "Order Date",
+                                 "begin": [2023, month, 1],
+                                 "end": [2023, month, end.day]},
+                       "columns": [{"name": "Date", "from": "Order Date",
+                                    "format": "%a"},
+                                   {"name": "SKU", "from": "SKU"},
+                                   {"name": "Product Name",
+                                    "from": "Product Name"},
+                                   {"name": "Price", "from": "Price"},
+                                   {"name": "Amount", "from": "QTY"},
+                                   {"name": "Sheet", "value": "Monthly"}]})
+    output_config = [{"filename": "bench", "sheets": sheets}]
+
+    with open("configs/bench_input.json", "w") as config_file:
+        json.dump(input_config, config_file, indent=4)
+    with open("configs/bench_output.json", "w") as config_file:
+        json.dump(output_config, config_file, indent=4)
+
+
+def run_benchmark(writer: str) -> dict:
+    """
+    Time each stage of the pipeline on the generated files
+
+    Arguments:
+        writer (str):
+            name of the writer to write sheets with
+
+    Returns:
+        result of the benchmark
+    """
+
+    stages = {stage: {"seconds": 0.0, "rows": 0, "rss_delta_mb": 0.0}
+              for stage in STAGES}
+
+    def begin() -> tuple[float, float | None]:
+        return time.perf_counter(), get_rss_mb()
+
+    def record(stage: str, start: tuple[float, float | None],
+               stage_rows: int) -> None:
+        stages[stage]["seconds"] += time.perf_counter() - start[0]
+        stages[stage]["rows"] += stage_rows
+
+        # memory the stage's runs added (or freed), from the current rss
+        rss = get_rss_mb()
+        if start[1] is None or rss is None:
+            stages[stage]["rss_delta_mb"] = None
+        elif stages[stage]["rss_delta_mb"] is not None:
+            stages[stage]["rss_delta_mb"] += rss - start[1]
+
+    # run the whole read path first so the peak of the process is its own
+    input_handler = InputHandler("bench_input.json")
+    input_handler.read_config_file()
+    start = begin()
+    all_data = input_handler.read_input_files()
+    record("read_input_files", start, len(all_data))
+    read_peak_rss_mb = get_peak_rss_mb()
+    del all_data
+
+    # read and transform each input file separately
+    data = []
+    join_data = []
+    for input_file in input_handler.config:
+        # leave dates as strings so parsing is timed on its own
+        options = input_handler.get_read_options(input_file)
+        options.pop("parse_dates", None)
+        options.pop("date_format", None)
+
+        start = begin()
+        new_data = pd.read_csv("input_files/" + input_file["filename"],
+                               **options)
+        record("csv_read", start, len(new_data))
+
+        # selects, renames and parses dates
+        start = begin()
+        new_data = input_handler.transform_input_data(input_file, new_data)
+        record("date_parse", start, len(new_data))
+
+        if "join_on" in input_file:
+            join_data.append((new_data, input_file["join_on"],
+                              input_file["filename"]))
+        else:
+            data.append(new_data)
+
+    # combine and join data
+    start = begin()
+    all_data = input_handler.concat_input_data(data)
+    record("concat", start, len(all_data))
+    start = begin()
+    all_data = input_handler.join_input_data(all_data, join_data)
+    record("join", start, len(all_data))
+
+    # filter, format and write each sheet
+    output_handler = OutputHandler("bench_output.json", writer)
+    output_handler.read_config_file()
+    os.makedirs("output_files", exist_ok=True)
+    for output_file in output_handler.config:
+        output_path = output_handler.generate_output_path(
+                                        output_file["filename"])
+        start = begin()
+        sheet_writer = create_sheet_writer(writer, output_path)
+        record("write", start, 0)
+        for sheet in output_file["sheets"]:
+            output_handler.current_sheet = sheet
+
+            start = begin()
+            filtered = output_handler.filter_dataframe(all_data)
+            record("range_filter", start, len(filtered))
+
+            start = begin()
+            sheet_df = output_handler.format_output_sheet(
+                                        filtered, output_handler.current_rows)
+            record("format", start, len(sheet_df))
+
+            # sheets can't hold more rows than excel allows
+            start = begin()
+            sheet_df = sheet_df.iloc[:EXCEL_ROW_LIMIT]
+            sheet_writer.write_sheet(
+                sheet["name"], sheet_df,
+                output_handler.get_output_values(sheet_df))
+            record("write", start, len(sheet_df))
+
+        start = begin()
+        sheet_writer.close()
+        record("write", start, 0)
+
+    # get throughput of each stage
+    for stage in stages.values():
+        stage["seconds"] = round(stage["seconds"], 4)
+        if stage["rss_delta_mb"] is not None:
+            stage["rss_delta_mb"] = round(stage["rss_delta_mb"], 1)
+        stage["rows_per_second"] = (round(stage["rows"] / stage["seconds"])
+                                    if stage["seconds"] else None)
+
+    return {"stages": stages,
+            "total_seconds": round(sum(stage["seconds"]
+                                       for stage in stages.values()), 4),
+            "read_process_peak_rss_mb": read_peak_rss_mb,
+            "process_peak_rss_mb": get_peak_rss_mb()}
+
+
+def get_commit() -> str | None:
+    """
+    Get the current git commit of the repository
+
+    Returns:
+        hash of the commit or None if it can't be determined
+    """
+
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args: list[str]) -> None:
+    """Parse arguments, run benchmarks and report results"""
+
+    parser = argparse.ArgumentParser(
+                description="Benchmark the pipeline on synthetic data")
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[10000, 100000],
+                        help="total order rows to generate per run")
+    parser.add_argument("--writer", choices=WRITERS, default="stream",
+                        help="writer to write sheets with")
+    parser.add_argument("--skus", type=int, default=1000,
+                        help="distinct SKUs in the join file")
+    parser.add_argument("--extra-columns", type=int, default=4,
+                        help="unused columns in each order file")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random generator")
+    parser.add_argument("--chunksize", type=int,
+                        help="rows to read order files in at a time")
+    parser.add_argument("--output",
+                        help="file to append results to as JSON lines")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the generated files and print their folder")
+    options = parser.parse_args(args)
+    output_path = os.path.abspath(options.output) if options.output else None
+
+    # run each size in its own process so peak memory isn't shared
+    if len(options.rows) > 1:
+        child_args = ["--writer", options.writer,
+                      "--skus", str(options.skus),
+                      "--extra-columns", str(options.extra_columns),
+                      "--seed", str(options.seed)]
+        child_args += (["--chunksize", str(options.chunksize)]
+                       if options.chunksize else [])
+        child_args += ["--output", output_path] if output_path else []
+        child_args += ["--keep"] if options.keep else []
+        for rows in options.rows:
+            subprocess.run([sys.executable, os.path.abspath(__file__),
+                            "--rows", str(rows), *child_args], check=True)
+        return
+
+    # generate data and run the benchmark in a temporary folder
+    rows = options.rows[0]
+    work_dir = tempfile.mkdtemp(prefix="reformatted_sheets_bench_")
+    os.chdir(work_dir)
+    start = time.perf_counter()
+    generate_input_files(rows, options.skus, options.extra_columns,
+                         options.seed)
+    write_configs(options.chunksize)
+    generate_seconds = time.perf_counter() - start
+
+    result = {"timestamp": dt.now().isoformat(timespec="seconds"),
+              "commit": get_commit(),
+              "python": platform.python_version(),
+              "pandas": pd.__version__,
+              "numpy": np.__version__,
+              "rows": rows,
+              "writer": options.writer,
+              "skus": options.skus,
+              "extra_columns": options.extra_columns,
+              "chunksize": options.chunksize,
+              "generate_seconds": round(generate_seconds, 4),
+              **run_benchmark(options.writer)}
+
+    # report results
+    line = json.dumps(result)
+    print(line)
+    if output_path:
+        with open(output_path, "a") as output_file:
+            output_file.write(line + "\n")
+
+    # clean up generated files unless asked to keep them
+    if options.keep:
+        print(f"generated files kept in {work_dir}", file=sys.stderr)
+    else:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# call main if ran directly and not by import
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,17 +1,161 @@
+import os
 import sys
 from srcs.exceptions import UsageError, InputConfigError, OutputConfigError
-from srcs.sheet_reformatter import SheetReformatter
+from srcs.config_reader import (WRITERS, ENGINES, validate_configs,
+                                read_batch_manifest)
+from srcs.instrumentation import INSTRUMENT_ENV
+
+
+def parse_args(args: list[str]) -> tuple[list[str], dict]:
+    """Separate filenames of configs from options"""
+
+    filenames = []
+    options = {}
+
+    # instrumentation can also be enabled from the environment
+    if os.environ.get(INSTRUMENT_ENV):
+        options["instrument"] = os.environ[INSTRUMENT_ENV]
+
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--jobs":
+            # make sure a positive number of jobs is provided
+            if not (index + 1 < len(args) and args[index + 1].isdigit()
+                    and int(args[index + 1]) > 0):
+                raise UsageError(len(filenames), arg)
+            options["jobs"] = int(args[index + 1])
+            index += 1
+        elif arg == "--output-jobs":
+            # make sure a positive number of jobs is provided
+            if not (index + 1 < len(args) and args[index + 1].isdigit()
+                    and int(args[index + 1]) > 0):
+                raise UsageError(len(filenames), arg)
+            options["output_jobs"] = int(args[index + 1])
+            index += 1
+        elif arg == "--processes":
+            options["pool"] = "process"
+        elif arg == "--instrument":
+            # make sure a file (or "-" for stderr) is provided
+            if not (index + 1 < len(args)
+                    and not args[index + 1].startswith("--")):
+                raise UsageError(len(filenames), arg)
+            options["instrument"] = args[index + 1]
+            index += 1
+        elif arg == "--cache":
+            options["cache"] = True
+        elif arg == "--validate":
+            options["validate"] = True
+        elif arg == "--watch":
+            options["watch"] = True
+        elif arg == "--interval":
+            # make sure a positive number of seconds is provided
+            try:
+                options["interval"] = float(args[index + 1])
+                assert options["interval"] > 0
+            except (IndexError, ValueError, AssertionError):
+                raise UsageError(len(filenames), arg)
+            index += 1
+        elif arg == "--port":
+            # make sure a valid port is provided
+            if not (index + 1 < len(args) and args[index + 1].isdigit()
+                    and 0 < int(args[index + 1]) < 65536):
+                raise UsageError(len(filenames), arg)
+            options["port"] = int(args[index + 1])
+            index += 1
+        elif arg == "--writer":
+            # make sure a supported writer is provided
+            if not (index + 1 < len(args) and args[index + 1] in WRITERS):
+                raise UsageError(len(filenames), arg)
+            options["writer"] = args[index + 1]
+            index += 1
+        elif arg == "--batch":
+            # make sure a manifest is provided
+            if not (index + 1 < len(args)
+                    and not args[index + 1].startswith("--")):
+                raise UsageError(len(filenames), arg)
+            options["batch"] = args[index + 1]
+            index += 1
+        elif arg == "--spill":
+            # make sure a folder is provided
+            if not (index + 1 < len(args)
+                    and not args[index + 1].startswith("--")):
+                raise UsageError(len(filenames), arg)
+            options["spill_dir"] = args[index + 1]
+            index += 1
+        elif arg == "--engine":
+            # make sure a supported engine is provided
+            if not (index + 1 < len(args) and args[index + 1] in ENGINES):
+                raise UsageError(len(filenames), arg)
+            options["engine"] = args[index + 1]
+            index += 1
+        elif arg.startswith("--"):
+            raise UsageError(len(filenames), arg)
+        else:
+            filenames.append(arg)
+        index += 1
+
+    return filenames, options
 
 
 def main(args: list[str]) -> None:
     """Create SheetReformatter instance and call their methods"""
 
-    # make sure both configs are provided
-    if len(args) != 2:
-        raise UsageError(len(args))
+    # make sure both configs (or only a batch manifest) are provided
+    filenames, options = parse_args(args)
+    manifest = options.pop("batch", None)
+    if manifest is not None and filenames:
+        raise UsageError(len(filenames), "--batch")
+    if manifest is None and len(filenames) != 2:
+        raise UsageError(len(filenames))
+
+    # only check the configs and the headers of the input files
+    if options.pop("validate", False):
+        if manifest is not None:
+            for pair in read_batch_manifest(manifest):
+                validate_configs(pair["input"], pair["output"])
+            print(f'"{manifest}" and its configs are valid')
+            return
+        validate_configs(filenames[0], filenames[1])
+        print(f'"{filenames[0]}" and "{filenames[1]}" are valid')
+        return
+
+    # import pandas and the rest of the pipeline only when running it
+    from srcs.sheet_reformatter import SheetReformatter
+
+    # separate options of watch mode
+    watch_options = {key: options.pop(key) for key in ["interval", "port"]
+                     if key in options}
+    watch = options.pop("watch", False)
+    if watch_options and not watch:
+        raise UsageError(len(filenames),
+                         "--" + next(iter(watch_options)))
+
+    # spilled data is read back from disk, not kept in memory or in polars
+    if "spill_dir" in options and (watch or options.get("engine")
+                                   == "polars"):
+        raise UsageError(len(filenames), "--spill")
+
+    # run every pair of the manifest, reading each input config once
+    if manifest is not None:
+        if watch:
+            raise UsageError(len(filenames), "--batch")
+
+        from srcs.batch_runner import BatchRunner
+
+        if BatchRunner(manifest, **options).run():
+            sys.exit(1)
+        return
+
+    # initialize with filenames of both configs and options
+    reformatter = SheetReformatter(filenames[0], filenames[1], **options)
+
+    # keep running and regenerate output files when inputs change
+    if watch:
+        from srcs.watch_service import WatchService
 
-    # initialize with filenames of both configs
-    reformatter = SheetReformatter(args[0], args[1])
+        WatchService(reformatter, **watch_options).run()
+        return
 
     # call input handler
     reformatter.handle_input()
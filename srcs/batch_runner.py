@@ -0,0 +1,188 @@
+import os
+import re
+import json
+from .exceptions import InputConfigError, OutputConfigError
+from .config_reader import (read_batch_manifest, read_input_config,
+                            validate_configs)
+from .sheet_reformatter import SheetReformatter
+
+
+class BatchRunner():
+    """
+    Run every config pair of a batch manifest, reading each input once
+
+    Pairs with identical input configs (by content, not filename) are
+    grouped, so the input files of a group are read and combined once and
+    the output files of all its output configs are generated from the same
+    data, in parallel with output_jobs. Pairs that fail don't stop the
+    others and are reported as they fail.
+
+    Methods:
+        report(input_config: str, output_config: str,
+               error: Exception) -> None:
+            record and print the error of a pair
+        group_pairs() -> list[tuple[str, list[str]]]:
+            group the output configs of pairs with identical input configs
+        check_pairs(input_config: str,
+                    output_configs: list[str]) -> list[str]:
+            check the configs of each pair of a group without reading data
+        run_group(input_config: str, output_configs: list[str]) -> None:
+            read the data of a group once and generate its output files
+        run() -> list[tuple]:
+            run every group of the manifest
+
+    Attributes:
+        manifest_filename (str):
+            name of the manifest file
+        options (dict):
+            options of the reformatter of each group
+        spill_dir (str | None):
+            folder to spill the data of the groups to, in a subfolder per
+            input config (named after it with only word characters), or
+            None to keep it in memory
+        failures (list[tuple]):
+            input config, output config and error of each pair that failed
+    """
+
+    def __init__(self, manifest_filename: str, spill_dir: str | None = None,
+                 **options) -> None:
+        """
+        Save the manifest filename and the options of the reformatters
+
+        Arguments:
+            manifest_filename (str):
+                name of the manifest file
+            spill_dir (str | None):
+                folder to spill the data of the groups to, or None to keep
+                it in memory
+            **options:
+                options of SheetReformatter (jobs, writer, cache, ...)
+        """
+
+        self.manifest_filename = manifest_filename
+        self.spill_dir = spill_dir
+        self.options = options
+        self.failures = []
+
+    def report(self, input_config: str, output_config: str,
+               error: Exception) -> None:
+        """
+        Record and print the error of a pair
+
+        Arguments:
+            input_config (str):
+                name of the input config of the pair
+            output_config (str):
+                name of the output config of the pair
+            error (Exception):
+                error the pair failed with
+        """
+
+        self.failures.append((input_config, output_config, error))
+        message = (str(error)
+                   if isinstance(error, (InputConfigError, OutputConfigError))
+                   else f"{type(error).__name__}: {error}")
+        print(f'"{input_config}" -> "{output_config}": {message}', flush=True)
+
+    def group_pairs(self) -> list[tuple[str, list[str]]]:
+        """
+        Group the output configs of pairs with identical input configs
+
+        Returns:
+            name of the first input config of each group and the names of
+            its output configs, in the order of the manifest
+
+        Raises:
+            InputConfigError:
+                any error of read_batch_manifest
+        """
+
+        groups = {}
+        for pair in read_batch_manifest(self.manifest_filename):
+            try:
+                input_config = read_input_config(pair["input"])
+            except InputConfigError as error:
+                self.report(pair["input"], pair["output"], error)
+                continue
+
+            # configs with the same content read the same data
+            key = json.dumps(input_config, sort_keys=True)
+            output_configs = groups.setdefault(key, (pair["input"], []))[1]
+            if pair["output"] not in output_configs:
+                output_configs.append(pair["output"])
+        return list(groups.values())
+
+    def check_pairs(self, input_config: str,
+                    output_configs: list[str]) -> list[str]:
+        """
+        Check the configs of each pair of a group without reading data
+
+        Arguments:
+            input_config (str):
+                name of the input config of the group
+            output_configs (list[str]):
+                names of the output configs of the group
+
+        Returns:
+            names of the output configs whose pairs are valid
+        """
+
+        valid_configs = []
+        for output_config in output_configs:
+            try:
+                validate_configs(input_config, output_config)
+            except (InputConfigError, OutputConfigError) as error:
+                self.report(input_config, output_config, error)
+                continue
+            valid_configs.append(output_config)
+        return valid_configs
+
+    def run_group(self, input_config: str, output_configs: list[str]) -> None:
+        """
+        Read the data of a group once and generate its output files
+
+        Arguments:
+            input_config (str):
+                name of the input config of the group
+            output_configs (list[str]):
+                names of the output configs of the group
+        """
+
+        # keep the spilled data of each group apart, so it can be reused,
+        # in a subfolder whose name can't leave the spill folder
+        options = dict(self.options)
+        if self.spill_dir:
+            options["spill_dir"] = os.path.join(
+                self.spill_dir,
+                re.sub(r"[^\w-]+", "_", os.path.splitext(input_config)[0]))
+
+        try:
+            reformatter = SheetReformatter(input_config, output_configs,
+                                           **options)
+            with reformatter.instrumentation.stage(
+                    "batch_group", input_config=input_config,
+                    output_configs=len(output_configs)):
+                reformatter.handle_input()
+                reformatter.handle_output()
+        except Exception as error:
+            # the data is shared, so every pair of the group failed
+            for output_config in output_configs:
+                self.report(input_config, output_config, error)
+
+    def run(self) -> list[tuple]:
+        """
+        Run every group of the manifest
+
+        Returns:
+            input config, output config and error of each pair that failed
+
+        Raises:
+            InputConfigError:
+                any error of read_batch_manifest
+        """
+
+        for input_config, output_configs in self.group_pairs():
+            output_configs = self.check_pairs(input_config, output_configs)
+            if output_configs:
+                self.run_group(input_config, output_configs)
+        return self.failures
@@ -0,0 +1,527 @@
+import os
+import json
+import time
+import hashlib
+import pandas as pd
+
+# bump when the format of cached data changes to invalidate old caches
+CACHE_VERSION = 3
+
+# keys of an input file's config that don't change the data read from it
+READ_ONLY_KEYS = ["chunksize", "engine", "cache"]
+
+
+class BuildCache():
+    """
+    Save fingerprints and parsed data between runs to skip unchanged work
+
+    Methods:
+        hash_file(path: str) -> str:
+            get the hash of a file's content
+        fingerprint(*parts) -> str:
+            get a fingerprint of json serializable parts
+        fingerprint_input_file(input_file: dict) -> str | None:
+            get a fingerprint of an input file and its config
+        hash_prefix(path: str, size: int) -> str:
+            get the hash of the first bytes of a file
+        get_input_state(input_file: dict) -> dict:
+            get the manifest entries of an input file
+        load_input_state(state: dict) -> None:
+            add the manifest entries of an input file
+        get_append_state(input_file: dict) -> dict | None:
+            get where to continue reading an input file that was appended to
+        save_append_state(input_file: dict, fingerprint: str,
+                          rows: int) -> None:
+            record the saved data of an input file and how much of the
+            file it was parsed from
+        save_parsed_offset(input_file: dict, fingerprint: str,
+                           rows: int) -> None:
+            record how much of an input file its saved data was parsed from
+        get_data_references() -> set[str]:
+            get the fingerprints of the data the manifest references
+        delete_data(fingerprint: str) -> None:
+            delete the data saved under a fingerprint
+        prune_data() -> None:
+            delete saved data that no entry of the manifest references
+        load_data(fingerprint: str) -> pd.DataFrame | None:
+            load parsed data saved under a fingerprint
+        save_data(fingerprint: str, data: pd.DataFrame) -> None:
+            save parsed data under a fingerprint
+        fingerprint_output_file(output_file: dict, writer: str) -> str | None:
+            get a fingerprint of an output file, its config and its data
+        is_output_current(output_path: str, fingerprint: str) -> bool:
+            check if an output file was generated from the same fingerprint
+        save_output(output_path: str, fingerprint: str) -> None:
+            record the fingerprint an output file was generated from
+        save_manifest() -> None:
+            write the manifest to the cache folder and prune saved data
+
+    Attributes:
+        cache_dir (str):
+            path of the cache folder
+        manifest (dict):
+            hashes, saved data and append states of input files and
+            fingerprints of output files
+        data_fingerprint (str):
+            fingerprint of the combined data from all input files
+        loaded_at (float):
+            time the manifest was loaded, data saved since (e.g. by
+            concurrent runs) isn't pruned
+    """
+
+    def __init__(self, cache_dir: str = "cache") -> None:
+        """
+        Load the manifest from the cache folder
+
+        Arguments:
+            cache_dir (str):
+                path of the cache folder
+        """
+
+        self.cache_dir = cache_dir
+        self.data_fingerprint = None
+        self.loaded_at = time.time()
+        self.manifest = {"version": CACHE_VERSION, "files": {}, "outputs": {}}
+
+        # start from scratch if the manifest is missing, invalid or outdated
+        manifest_path = os.path.join(cache_dir, "manifest.json")
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as manifest_file:
+                try:
+                    manifest = json.load(manifest_file)
+                except ValueError:
+                    manifest = {}
+            if manifest.get("version") == CACHE_VERSION:
+                self.manifest = manifest
+        self.manifest.setdefault("appends", {})
+        self.manifest.setdefault("data", {})
+
+    def hash_file(self, path: str) -> str:
+        """
+        Get the hash of a file's content
+
+        The hash is only recomputed if the file's size or mtime changed
+
+        Arguments:
+            path (str):
+                path of the file
+
+        Returns:
+            sha256 hash of the file's content
+        """
+
+        # reuse saved hash if the file hasn't been touched
+        stat = os.stat(path)
+        record = self.manifest["files"].get(path)
+        if (record and record["mtime"] == stat.st_mtime_ns
+                and record["size"] == stat.st_size):
+            return record["hash"]
+
+        # hash the file a block at a time
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+
+        self.manifest["files"][path] = {"mtime": stat.st_mtime_ns,
+                                        "size": stat.st_size,
+                                        "hash": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, *parts) -> str:
+        """
+        Get a fingerprint of json serializable parts
+
+        Arguments:
+            *parts:
+                parts to include in the fingerprint
+
+        Returns:
+            sha256 hash of the parts
+        """
+
+        serialized = json.dumps([CACHE_VERSION, *parts],
+                                sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def fingerprint_input_file(self, input_file: dict) -> str | None:
+        """
+        Get a fingerprint of an input file and its config
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            fingerprint of the input file or None if it cannot be found
+        """
+
+        input_path = "input_files/" + input_file["filename"]
+        if not os.path.isfile(input_path):
+            return None
+
+        return self.fingerprint(self.get_input_settings(input_file),
+                                self.hash_file(input_path))
+
+    def get_input_settings(self, input_file: dict) -> dict:
+        """
+        Get the keys of an input file's config that change the data read
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            config object without the read only keys
+        """
+
+        return {key: value for key, value in input_file.items()
+                if key not in READ_ONLY_KEYS}
+
+    def hash_prefix(self, path: str, size: int) -> str:
+        """
+        Get the hash of the first bytes of a file
+
+        Arguments:
+            path (str):
+                path of the file
+            size (int):
+                number of bytes to hash
+
+        Returns:
+            sha256 hash of the first bytes of the file
+        """
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            remaining = size
+            while remaining > 0:
+                block = file.read(min(1 << 20, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+        return digest.hexdigest()
+
+    def get_input_state(self, input_file: dict) -> dict:
+        """
+        Get the manifest entries of an input file
+
+        Worker processes get these instead of the whole cache, so they can
+        load, continue and save the parsed data of the file
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            hash and append state of the file, if recorded
+        """
+
+        input_path = "input_files/" + input_file["filename"]
+        return {key: {input_path: self.manifest[key][input_path]}
+                for key in ["files", "appends"]
+                if input_path in self.manifest[key]}
+
+    def load_input_state(self, state: dict) -> None:
+        """
+        Add the manifest entries of an input file
+
+        Arguments:
+            state (dict):
+                entries from get_input_state
+        """
+
+        for key, entries in state.items():
+            self.manifest[key].update(entries)
+
+    def get_append_state(self, input_file: dict) -> dict | None:
+        """
+        Get where to continue reading an input file that was appended to
+
+        The file must have the same config and must have only grown since
+        it was last read: the bytes read last time must hash the same,
+        otherwise it was rewritten and has to be read from the start
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            fingerprint of the saved data, number of rows and bytes it was
+            parsed from and size of the file when it was hashed, or None if
+            the file can't be continued
+        """
+
+        input_path = "input_files/" + input_file["filename"]
+        state = self.manifest["appends"].get(input_path)
+        record = self.manifest["files"].get(input_path)
+        if not (state and record and state["settings"] == self.fingerprint(
+                    self.get_input_settings(input_file))
+                and record["size"] > state["offset"]):
+            return None
+
+        if self.hash_prefix(input_path, state["offset"]) != state["prefix"]:
+            return None
+
+        return {**state, "size": record["size"]}
+
+    def save_append_state(self, input_file: dict, fingerprint: str,
+                          rows: int) -> None:
+        """
+        Record the saved data of an input file and how much of the file it
+        was parsed from
+
+        The data the file's previous data is replaced by is deleted. How
+        much of the file was parsed isn't recorded if the file changed
+        since it was hashed (so the data may not match the hash) or doesn't
+        end with a full line
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+            fingerprint (str):
+                fingerprint the parsed data is saved under
+            rows (int):
+                number of rows of the parsed data
+        """
+
+        input_path = "input_files/" + input_file["filename"]
+        previous = self.manifest["data"].get(input_path)
+        self.manifest["data"][input_path] = fingerprint
+        self.save_parsed_offset(input_file, fingerprint, rows)
+
+        # delete the data replaced by the new data of the file
+        if (previous not in (None, fingerprint)
+                and previous not in self.get_data_references()):
+            self.delete_data(previous)
+
+    def save_parsed_offset(self, input_file: dict, fingerprint: str,
+                           rows: int) -> None:
+        """
+        Record how much of an input file its saved data was parsed from
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+            fingerprint (str):
+                fingerprint the parsed data is saved under
+            rows (int):
+                number of rows of the parsed data
+        """
+
+        # nothing to do if the data was loaded from the recorded state
+        input_path = "input_files/" + input_file["filename"]
+        state = self.manifest["appends"].get(input_path)
+        if state and state["data"] == fingerprint and state["rows"] == rows:
+            return
+
+        record = self.manifest["files"].get(input_path)
+        self.manifest["appends"].pop(input_path, None)
+        if not (record and os.path.isfile(input_path)):
+            return
+
+        stat = os.stat(input_path)
+        if (stat.st_mtime_ns != record["mtime"]
+                or stat.st_size != record["size"] or not stat.st_size):
+            return
+        with open(input_path, "rb") as file:
+            file.seek(stat.st_size - 1)
+            if file.read(1) != b"\n":
+                return
+
+        # the hash of the whole file is the hash of the bytes read
+        self.manifest["appends"][input_path] = {
+            "settings": self.fingerprint(self.get_input_settings(input_file)),
+            "offset": record["size"], "prefix": record["hash"],
+            "rows": rows, "data": fingerprint}
+
+    def get_data_path(self, fingerprint: str, extension: str) -> str:
+        """
+        Get the path of data saved under a fingerprint
+
+        Arguments:
+            fingerprint (str):
+                fingerprint of the data
+            extension (str):
+                extension of the file format
+
+        Returns:
+            path of the data file
+        """
+
+        return os.path.join(self.cache_dir, "data",
+                            f"{fingerprint}.{extension}")
+
+    def load_data(self, fingerprint: str) -> pd.DataFrame | None:
+        """
+        Load parsed data saved under a fingerprint
+
+        Arrow files are memory-mapped instead of read, so numeric and date
+        columns are backed by the page cache (shared by concurrent runs)
+        rather than copied into memory
+
+        Arguments:
+            fingerprint (str):
+                fingerprint of the data
+
+        Returns:
+            saved dataframe or None if nothing is saved
+        """
+
+        arrow_path = self.get_data_path(fingerprint, "arrow")
+        if os.path.isfile(arrow_path):
+            from pyarrow import feather
+
+            table = feather.read_table(arrow_path, memory_map=True)
+            return table.to_pandas(split_blocks=True)
+
+        pickle_path = self.get_data_path(fingerprint, "pkl")
+        if os.path.isfile(pickle_path):
+            return pd.read_pickle(pickle_path)
+
+        return None
+
+    def save_data(self, fingerprint: str, data: pd.DataFrame) -> None:
+        """
+        Save parsed data under a fingerprint
+
+        Data is saved as an uncompressed arrow (feather) file so it can be
+        memory-mapped, or pickled if pyarrow isn't installed or can't
+        represent the data (e.g. columns with mixed types)
+
+        Arguments:
+            fingerprint (str):
+                fingerprint of the data
+            data (pd.DataFrame):
+                dataframe to save
+        """
+
+        os.makedirs(os.path.join(self.cache_dir, "data"), exist_ok=True)
+
+        # write to a temporary file first so readers never see partial data
+        arrow_path = self.get_data_path(fingerprint, "arrow")
+        try:
+            from pyarrow import feather
+
+            feather.write_feather(data, arrow_path + ".tmp",
+                                  compression="uncompressed")
+            os.replace(arrow_path + ".tmp", arrow_path)
+        except (ImportError, ValueError, TypeError, NotImplementedError):
+            pickle_path = self.get_data_path(fingerprint, "pkl")
+            data.to_pickle(pickle_path + ".tmp")
+            os.replace(pickle_path + ".tmp", pickle_path)
+
+    def fingerprint_output_file(self, output_file: dict,
+                                writer: str) -> str | None:
+        """
+        Get a fingerprint of an output file, its config and its data
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+            writer (str):
+                writer used for the output file
+
+        Returns:
+            fingerprint of the output file or None if the data is unknown
+        """
+
+        if self.data_fingerprint is None:
+            return None
+
+        return self.fingerprint(self.data_fingerprint, output_file, writer)
+
+    def is_output_current(self, output_path: str, fingerprint: str) -> bool:
+        """
+        Check if an output file was generated from the same fingerprint
+
+        Arguments:
+            output_path (str):
+                full path of the output file
+            fingerprint (str):
+                fingerprint of the output file
+
+        Returns:
+            whether the output file exists and is up to date
+        """
+
+        return (fingerprint is not None and os.path.exists(output_path)
+                and self.manifest["outputs"].get(output_path) == fingerprint)
+
+    def save_output(self, output_path: str, fingerprint: str) -> None:
+        """
+        Record the fingerprint an output file was generated from
+
+        Arguments:
+            output_path (str):
+                full path of the output file
+            fingerprint (str):
+                fingerprint of the output file
+        """
+
+        if fingerprint is not None:
+            self.manifest["outputs"][output_path] = fingerprint
+
+    def get_data_references(self) -> set[str]:
+        """
+        Get the fingerprints of the data the manifest references
+
+        Returns:
+            fingerprints of the saved data of input files
+        """
+
+        appends = self.manifest["appends"].values()
+        return (set(self.manifest["data"].values())
+                | {state["data"] for state in appends})
+
+    def delete_data(self, fingerprint: str) -> None:
+        """
+        Delete the data saved under a fingerprint
+
+        Files that can't be deleted (e.g. still mapped elsewhere) are left
+        for prune_data
+
+        Arguments:
+            fingerprint (str):
+                fingerprint of the data
+        """
+
+        for extension in ["arrow", "pkl"]:
+            try:
+                os.remove(self.get_data_path(fingerprint, extension))
+            except OSError:
+                pass
+
+    def prune_data(self) -> None:
+        """
+        Delete saved data that no entry of the manifest references
+
+        Data saved since the manifest was loaded is kept, since concurrent
+        runs may not have recorded it yet
+        """
+
+        data_dir = os.path.join(self.cache_dir, "data")
+        if not os.path.isdir(data_dir):
+            return
+
+        references = self.get_data_references()
+        for filename in os.listdir(data_dir):
+            path = os.path.join(data_dir, filename)
+            if filename.split(".")[0] in references:
+                continue
+            try:
+                if os.path.getmtime(path) < self.loaded_at:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def save_manifest(self) -> None:
+        """Write the manifest to the cache folder and prune saved data"""
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        with open(manifest_path + ".tmp", "w") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=4)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        self.prune_data()
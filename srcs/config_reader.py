@@ -0,0 +1,644 @@
+import os
+import csv
+import json
+from datetime import datetime as dt
+from .exceptions import InputConfigError, OutputConfigError
+
+# writers output files can be written with
+WRITERS = ["openpyxl", "xlsxwriter", "stream"]
+
+# formats output files can be written in (xlsx uses the writers)
+FORMATS = ["xlsx", "csv", "parquet", "feather"]
+
+# date formats of the labels output files can be partitioned by
+PARTITIONS = {"year": "%Y", "month": "%Y-%m", "day": "%Y-%m-%d"}
+
+# ways sheets too large for xlsx are split into parts
+SPLITS = ["sheets", "files"]
+
+# aggregations supported by value columns of pivot sheets
+AGGREGATES = ["sum", "count", "mean", "min", "max"]
+
+# engines the pipeline can be run with
+ENGINES = ["pandas", "polars"]
+
+# dtypes known to be understood by pandas without importing it
+KNOWN_DTYPES = {"category", "string", "str", "object", "bool", "boolean",
+                "int8", "int16", "int32", "int64",
+                "uint8", "uint16", "uint32", "uint64",
+                "Int8", "Int16", "Int32", "Int64",
+                "UInt8", "UInt16", "UInt32", "UInt64",
+                "float16", "float32", "float64", "Float32", "Float64",
+                "int", "float", "datetime64[ns]"}
+
+
+def load_config(config_filename: str, error_type: type) -> list:
+    """
+    Load a config file as an array of objects
+
+    Arguments:
+        config_filename (str):
+            name of the config file
+        error_type (type):
+            InputConfigError or OutputConfigError
+
+    Returns:
+        config objects (a single object is put in an array)
+
+    Raises:
+        InputConfigError | OutputConfigError:
+            "ConfigFileNotFound": the config file cannot be found
+            "InvalidSyntax": the syntax is invalid
+    """
+
+    # make sure config file exists
+    if not os.path.isfile("configs/" + config_filename):
+        raise error_type("ConfigFileNotFound", config_filename)
+
+    # read and parse the config
+    with open("configs/" + config_filename) as config_file:
+        try:
+            config = json.load(config_file)
+        except ValueError as error:
+            raise error_type("InvalidSyntax", config_filename, str(error))
+
+    # handle single object in config
+    if type(config) is dict:
+        config = [config]
+    return config
+
+
+def is_valid_filename(filename) -> bool:
+    """
+    Check if a name can be used as the name of a file in a folder
+
+    Arguments:
+        filename:
+            name of an output file (or of a sheet's file)
+
+    Returns:
+        whether the name is a non-empty name without path separators or
+        parent references, so its file stays inside its folder
+    """
+
+    return (type(filename) is str and filename not in ["", "."]
+            and ".." not in filename and not os.path.isabs(filename)
+            and not any(separator in filename for separator in "/\\"))
+
+
+def is_valid_dtype(dtype) -> bool:
+    """
+    Check if a dtype is understood by pandas
+
+    pandas is only imported for dtypes that aren't common names
+
+    Arguments:
+        dtype:
+            dtype of a column in the config
+
+    Returns:
+        whether pandas can read a column as the dtype
+    """
+
+    if type(dtype) is str and dtype in KNOWN_DTYPES:
+        return True
+
+    import pandas as pd
+
+    try:
+        pd.api.types.pandas_dtype(dtype)
+    except TypeError:
+        return False
+    return True
+
+
+def read_input_config(config_filename: str) -> list:
+    """
+    Read and parse an input config file
+
+    Arguments:
+        config_filename (str):
+            name of the config file
+
+    Returns:
+        config objects of the input files
+
+    Raises:
+        InputConfigError:
+            "ConfigFileNotFound": the config file cannot be found
+            "InvalidSyntax": the syntax is invalid
+            "MissingInputFileInfo": the input file section is empty
+            "MissingColumnInfo": the column section is empty
+            "InvalidColumnInfo": the column section contains invalid values
+            "MissingKey": the required keys are missing
+            "InvalidKey": an optional key has an invalid value
+    """
+
+    config = load_config(config_filename, InputConfigError)
+
+    # make sure the config isn't empty
+    if not config:
+        raise InputConfigError("MissingInputFileInfo", config_filename)
+
+    # make sure required keys exist
+    missing_keys = []
+    for input_file in config:
+        missing_keys.extend([key for key in ["filename", "columns"]
+                             if key not in input_file])
+
+        # make sure chunk size is a positive integer
+        if "chunksize" in input_file:
+            chunksize = input_file["chunksize"]
+            if not (type(chunksize) is int and chunksize > 0):
+                raise InputConfigError("InvalidKey",
+                                       config_filename, "chunksize")
+
+        # make sure cache is either enabled or disabled
+        if "cache" in input_file and type(input_file["cache"]) is not bool:
+            raise InputConfigError("InvalidKey", config_filename, "cache")
+
+        # make sure engine is supported (pyarrow can't read in chunks)
+        if "engine" in input_file:
+            if (input_file["engine"] not in ["c", "python", "pyarrow"]
+                    or (input_file["engine"] == "pyarrow"
+                        and "chunksize" in input_file)):
+                raise InputConfigError("InvalidKey",
+                                       config_filename, "engine")
+
+        if "columns" in input_file:
+            # make sure the columns aren't empty
+            if not (type(input_file["columns"]) is list
+                    and input_file["columns"]):
+                raise InputConfigError("MissingColumnInfo", config_filename)
+
+            # make sure required keys exist in columns
+            for column in input_file["columns"]:
+                if type(column) is dict:
+                    if "name" not in column:
+                        missing_keys.append("name")
+                    elif "from" not in column and "value" not in column:
+                        missing_keys.append("from / value")
+
+                    # make sure dtype is understood by pandas
+                    if "dtype" in column and not is_valid_dtype(
+                                                        column["dtype"]):
+                        raise InputConfigError("InvalidKey",
+                                               config_filename, "dtype")
+                else:
+                    raise InputConfigError("InvalidColumnInfo",
+                                           config_filename)
+
+    # raise exception if there are keys missing
+    if missing_keys:
+        raise InputConfigError("MissingKey",
+                               config_filename, str(missing_keys))
+    return config
+
+
+def get_pivot_columns(columns: list) -> tuple[list, list]:
+    """
+    Split the columns of a pivot into group keys and aggregated values
+
+    Columns with a custom value are neither, they're added to every row
+
+    Arguments:
+        columns (list):
+            config objects of the columns of the pivot
+
+    Returns:
+        config objects of the group key columns and the value columns
+    """
+
+    keys = [col for col in columns if type(col) is dict and "from" in col
+            and ("type" not in col or col["type"] == "column")]
+    values = [col for col in columns if type(col) is dict
+              and "type" in col and col["type"] == "value"]
+    return keys, values
+
+
+def check_sheet_type(sheet: dict, config_filename: str) -> None:
+    """
+    Make sure the type of a sheet and the types of its columns are valid
+
+    Arguments:
+        sheet (dict):
+            config object of the sheet
+        config_filename (str):
+            name of the config file
+
+    Raises:
+        OutputConfigError:
+            "InvalidColumnInfo": the column section contains invalid values
+            "InvalidKey": an optional key has an invalid value
+    """
+
+    # make sure sheet type is supported
+    if sheet["type"] not in ["sheet", "pivot"]:
+        raise OutputConfigError("InvalidKey", config_filename, "type")
+
+    columns = sheet["columns"] if type(sheet.get("columns")) is list else []
+    for column in columns:
+        # make sure column type is supported
+        if type(column) is not dict:
+            continue
+        column_type = column["type"] if "type" in column else "column"
+        if column_type not in ["column", "value"]:
+            raise OutputConfigError("InvalidKey", config_filename, "type")
+
+        # make sure value columns are aggregated from a column in pivots
+        if column_type == "value":
+            if sheet["type"] != "pivot" or "from" not in column:
+                raise OutputConfigError("InvalidColumnInfo", config_filename)
+            if ("aggregate" in column
+                    and column["aggregate"] not in AGGREGATES):
+                raise OutputConfigError("InvalidKey",
+                                        config_filename, "aggregate")
+
+    if sheet["type"] == "pivot":
+        keys, values = get_pivot_columns(columns)
+
+        # make sure pivots have something to group by and to aggregate
+        if not keys or not values:
+            raise OutputConfigError("InvalidColumnInfo", config_filename)
+
+        # make sure the spread column is one of the group keys
+        if ("spread" in sheet
+                and sheet["spread"] not in [col["name"] for col in keys]):
+            raise OutputConfigError("InvalidKey", config_filename, "spread")
+
+
+def read_output_config(config_filename: str) -> list:
+    """
+    Read and parse an output config file
+
+    Arguments:
+        config_filename (str):
+            name of the config file
+
+    Returns:
+        config objects of the output files
+
+    Raises:
+        OutputConfigError:
+            "ConfigFileNotFound": the file cannot be found
+            "InvalidSyntax": the syntax is invalid
+            "MissingOutputFileInfo": the output file section is empty
+            "MissingSheetInfo": the sheet section is empty
+            "MissingColumnInfo": the column section is empty
+            "InvalidColumnInfo": the column section contains invalid values
+            "MissingKey": the required keys are missing
+            "InvalidKey": an optional key has an invalid value
+    """
+
+    config = load_config(config_filename, OutputConfigError)
+
+    # make sure config isn't empty
+    if not config:
+        raise OutputConfigError("MissingOutputFileInfo", config_filename)
+
+    # make sure output files are valid
+    missing_keys = []
+    for output_file in config:
+        # make sure required keys exist in output file
+        missing_keys.extend([key for key in ["filename", "sheets"]
+                             if key not in output_file])
+
+        # make sure the output file stays inside the output folder
+        if "filename" in output_file and not is_valid_filename(
+                                                output_file["filename"]):
+            raise OutputConfigError("InvalidKey", config_filename,
+                                    "filename")
+
+        # make sure writer is supported
+        if "writer" in output_file and output_file["writer"] not in WRITERS:
+            raise OutputConfigError("InvalidKey", config_filename, "writer")
+
+        # make sure format is supported and only other formats are
+        # partitioned (a sheet of an xlsx file can't span files)
+        if "format" in output_file and output_file["format"] not in FORMATS:
+            raise OutputConfigError("InvalidKey", config_filename, "format")
+        if "partition" in output_file and (
+                output_file["partition"] not in PARTITIONS
+                or output_file.get("format", "xlsx") == "xlsx"):
+            raise OutputConfigError("InvalidKey", config_filename,
+                                    "partition")
+        if "split" in output_file and (
+                output_file["split"] not in SPLITS
+                or output_file.get("format", "xlsx") != "xlsx"):
+            raise OutputConfigError("InvalidKey", config_filename, "split")
+
+        if "sheets" in output_file:
+            # handle single sheet in output file
+            sheets = ([output_file["sheets"]]
+                      if type(output_file["sheets"]) is dict
+                      else output_file["sheets"])
+
+            # make sure sheets aren't empty
+            if not sheets:
+                raise OutputConfigError("MissingSheetInfo", config_filename)
+
+            # make sure sheets are valid
+            for sheet in sheets:
+                # make sure required keys exist in sheet
+                missing_keys.extend([key for key in
+                                     ["name", "title", "type",
+                                      "range", "columns"]
+                                     if key not in sheet])
+
+                # sheets of other formats are files in the output folder
+                if ("name" in sheet
+                        and output_file.get("format", "xlsx") != "xlsx"
+                        and not is_valid_filename(sheet["name"])):
+                    raise OutputConfigError("InvalidKey", config_filename,
+                                            "name")
+                if "range" in sheet:
+                    # make sure range info isn't empty
+                    if not (type(sheet["range"]) is dict and sheet["range"]):
+                        raise OutputConfigError("MissingRangeInfo",
+                                                config_filename)
+
+                    # make sure range info is valid
+                    try:
+                        assert "column" in sheet["range"]
+                        begin = sheet["range"]["begin"]
+                        end = sheet["range"]["end"]
+                        begin_dt = dt(begin[0], begin[1], begin[2])
+                        end_dt = dt(end[0], end[1], end[2])
+                        assert begin_dt <= end_dt
+                    except Exception:
+                        raise OutputConfigError("InvalidRangeInfo",
+                                                config_filename)
+                if "columns" in sheet:
+                    # make sure columns aren't empty
+                    if not (type(sheet["columns"]) is list
+                            and sheet["columns"]):
+                        raise OutputConfigError("MissingColumnInfo",
+                                                config_filename)
+
+                    # make sure required keys exist in columns
+                    for column in sheet["columns"]:
+                        if type(column) is dict:
+                            if "name" not in column:
+                                missing_keys.append("name")
+                            elif ("from" not in column
+                                  and "value" not in column):
+                                missing_keys.append("from / value")
+                        else:
+                            raise OutputConfigError("InvalidColumnInfo",
+                                                    config_filename)
+
+                if "type" in sheet:
+                    check_sheet_type(sheet, config_filename)
+
+    # raise exception if there are keys missing
+    if missing_keys:
+        raise OutputConfigError("MissingKey",
+                                config_filename, str(missing_keys))
+    return config
+
+
+def read_csv_header(input_path: str) -> list[str]:
+    """
+    Read the column names of a csv file without reading any data
+
+    Duplicate names are numbered like pandas does ("a", "a.1", ...)
+
+    Arguments:
+        input_path (str):
+            path of the csv file
+
+    Returns:
+        names of the columns in the header
+    """
+
+    with open(input_path, newline="", encoding="utf-8-sig") as csv_file:
+        header = next(csv.reader(csv_file), [])
+
+    names = []
+    for name in header:
+        new_name = name
+        count = 1
+        while new_name in names:
+            new_name = f"{name}.{count}"
+            count += 1
+        names.append(new_name)
+    return names
+
+
+def get_column_lineage(input_config: list) -> dict[str, list[tuple]]:
+    """
+    Get where each column of the combined data comes from, using only headers
+
+    Columns are traced through their renames, custom values, the columns
+    added by concatenating files and the suffixes added when joining, the
+    same way the data is combined when it's read
+
+    Arguments:
+        input_config (list):
+            config objects of the input files
+
+    Returns:
+        the input files (filename and config object of the column) each
+        column of the combined data comes from, in order of the columns
+
+    Raises:
+        InputConfigError:
+            "InputFileNotFound": the input file cannot be found
+            "ColumnNotFound": the specified columns cannot be found
+            "JoinColumnNotFound": the join_on column cannot be found
+            "InvalidJoinColumn": the join_on column
+                                 doesn't match any other columns
+    """
+
+    # make sure the columns of each input file exist in its header
+    lineage = {}
+    join_files = []
+    for input_file in input_config:
+        input_path = "input_files/" + input_file["filename"]
+        if not os.path.isfile(input_path):
+            raise InputConfigError("InputFileNotFound",
+                                   input_file["filename"])
+
+        header = read_csv_header(input_path)
+        columns_not_found = [col["from"] for col in input_file["columns"]
+                             if "from" in col and col["from"] not in header]
+        if len(columns_not_found):
+            raise InputConfigError("ColumnNotFound", input_file["filename"],
+                                   str(columns_not_found))
+
+        sources = {column["name"]: (input_file["filename"], column)
+                   for column in input_file["columns"]}
+        if "join_on" in input_file:
+            # make sure the column exists
+            if input_file["join_on"] not in sources:
+                raise InputConfigError("JoinColumnNotFound",
+                                       input_file["filename"],
+                                       input_file["join_on"])
+            join_files.append((input_file, sources))
+        else:
+            # files are concatenated, so columns may come from several
+            for name, source in sources.items():
+                lineage.setdefault(name, []).append(source)
+
+    # join files in order, suffixing columns that exist on both sides
+    for input_file, sources in join_files:
+        join_on = input_file["join_on"]
+        if join_on not in lineage:
+            raise InputConfigError("InvalidJoinColumn",
+                                   input_file["filename"], join_on)
+        for name, source in sources.items():
+            if name == join_on:
+                continue
+            if name in lineage:
+                lineage = {(column + "_x" if column == name else column):
+                           column_sources
+                           for column, column_sources in lineage.items()}
+                name += "_y"
+            lineage[name] = [source]
+
+    return lineage
+
+
+def is_date_column(sources: list[tuple]) -> bool:
+    """
+    Check if a column of the combined data will have a date type
+
+    Arguments:
+        sources (list[tuple]):
+            input files (filename and config object of the column) the
+            column comes from
+
+    Returns:
+        whether the column is parsed as dates in every file it comes from
+    """
+
+    return all("format" in column
+               or ("from" in column and "dtype" in column
+                   and str(column["dtype"]).startswith("datetime64"))
+               for _, column in sources)
+
+
+def check_config_columns(input_config: list, output_config: list) -> None:
+    """
+    Make sure the columns used by the configs exist, using only headers
+
+    The columns of the sheets are checked against the lineage of the
+    combined data, so mistakes in either config are found before any data
+    is read
+
+    Arguments:
+        input_config (list):
+            config objects of the input files
+        output_config (list):
+            config objects of the output files
+
+    Raises:
+        InputConfigError:
+            "InputFileNotFound": the input file cannot be found
+            "ColumnNotFound": the specified columns cannot be found
+            "JoinColumnNotFound": the join_on column cannot be found
+            "InvalidJoinColumn": the join_on column
+                                 doesn't match any other columns
+        OutputConfigError:
+            "ColumnNotFound": the specified columns cannot be found
+            "DateColumnNotFound": the range column cannot be found
+            "InvalidDateColumn": the range column doesn't have a date type
+    """
+
+    lineage = get_column_lineage(input_config)
+
+    # make sure the columns of each sheet exist in the combined data
+    for output_file in output_config:
+        sheets = ([output_file["sheets"]]
+                  if type(output_file["sheets"]) is dict
+                  else output_file["sheets"])
+        for sheet in sheets:
+            columns_not_found = [col["from"] for col in sheet["columns"]
+                                 if "from" in col
+                                 and col["from"] not in lineage]
+            if len(columns_not_found):
+                raise OutputConfigError("ColumnNotFound",
+                                        output_file["filename"],
+                                        sheet["name"],
+                                        str(columns_not_found))
+
+            # make sure the range column is parsed as dates
+            date_col = sheet["range"]["column"]
+            if date_col not in lineage:
+                raise OutputConfigError("DateColumnNotFound",
+                                        output_file["filename"],
+                                        sheet["name"],
+                                        date_col)
+            if not is_date_column(lineage[date_col]):
+                raise OutputConfigError("InvalidDateColumn",
+                                        output_file["filename"],
+                                        sheet["name"],
+                                        date_col)
+
+
+def validate_configs(input_config_filename: str,
+                     output_config_filename: str) -> None:
+    """
+    Check both configs and the columns they use without reading any data
+
+    Arguments:
+        input_config_filename (str):
+            name of the input config file
+        output_config_filename (str):
+            name of the output config file
+
+    Raises:
+        InputConfigError:
+            any error of read_input_config or check_config_columns
+        OutputConfigError:
+            any error of read_output_config or check_config_columns
+    """
+
+    input_config = read_input_config(input_config_filename)
+    output_config = read_output_config(output_config_filename)
+    check_config_columns(input_config, output_config)
+
+
+def read_batch_manifest(manifest_filename: str) -> list:
+    """
+    Read and parse a batch manifest of input and output config pairs
+
+    Arguments:
+        manifest_filename (str):
+            name of the manifest file (in "configs" like the configs)
+
+    Returns:
+        objects with the names of the "input" and "output" config of each
+        pair
+
+    Raises:
+        InputConfigError:
+            "ConfigFileNotFound": the manifest file cannot be found
+            "InvalidSyntax": the syntax is invalid
+            "MissingBatchInfo": the manifest is empty
+            "MissingKey": the required keys are missing
+            "InvalidKey": a key isn't the name of a config file
+    """
+
+    manifest = load_config(manifest_filename, InputConfigError)
+
+    # make sure the manifest isn't empty
+    if not manifest:
+        raise InputConfigError("MissingBatchInfo", manifest_filename)
+
+    # make sure each pair names both configs
+    missing_keys = []
+    for pair in manifest:
+        if type(pair) is not dict:
+            pair = {}
+        missing_keys.extend([key for key in ["input", "output"]
+                             if key not in pair])
+        for key in ["input", "output"]:
+            if key in pair and not (type(pair[key]) is str and pair[key]):
+                raise InputConfigError("InvalidKey", manifest_filename, key)
+
+    # raise exception if there are keys missing
+    if missing_keys:
+        raise InputConfigError("MissingKey",
+                               manifest_filename, str(missing_keys))
+    return manifest
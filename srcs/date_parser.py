@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+
+# widths of the directives supported by the fixed-width fast path
+FIXED_WIDTHS = {"Y": 4, "m": 2, "d": 2, "H": 2, "M": 2, "S": 2}
+
+# years of dates that fit in datetime64[ns]
+MIN_YEAR = 1678
+MAX_YEAR = 2261
+
+# days of each month (by number) outside of leap years
+MONTH_DAYS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def get_fixed_width_layout(date_format: str) -> list[tuple] | None:
+    """
+    Get the position of each field of a fixed-width date format
+
+    Formats made only of %Y, %m, %d, %H, %M, %S and literal characters
+    (e.g. "%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y") have every field at the
+    same position in every zero-padded date
+
+    Arguments:
+        date_format (str):
+            strptime format of the dates
+
+    Returns:
+        directive (or None for a literal character), position and width
+        (or the literal character) of each part of the format, or None if
+        the format isn't fixed-width
+    """
+
+    layout = []
+    position = 0
+    index = 0
+    while index < len(date_format):
+        char = date_format[index]
+        if char == "%":
+            if index + 1 == len(date_format):
+                return None
+            directive = date_format[index + 1]
+            index += 2
+            if directive == "%":
+                layout.append((None, position, "%"))
+                position += 1
+            elif directive in FIXED_WIDTHS:
+                layout.append((directive, position, FIXED_WIDTHS[directive]))
+                position += FIXED_WIDTHS[directive]
+            else:
+                return None
+        else:
+            layout.append((None, position, char))
+            position += 1
+            index += 1
+
+    # the fast path needs at least a year, month and day
+    directives = [part[0] for part in layout if part[0] is not None]
+    if (sorted(set(directives)) != sorted(directives)
+            or not {"Y", "m", "d"} <= set(directives)):
+        return None
+    return layout
+
+
+def parse_fixed_width(values: np.ndarray,
+                      layout: list[tuple]) -> np.ndarray | None:
+    """
+    Parse dates in a fixed-width format with vectorized arithmetic
+
+    The characters of every date are read as a 2D array of bytes, so
+    fields are sums of digits instead of a strptime call per date
+
+    Arguments:
+        values (np.ndarray):
+            dates as text
+        layout (list[tuple]):
+            layout of the format (see get_fixed_width_layout)
+
+    Returns:
+        parsed dates as datetime64[ns] or None if any date doesn't match
+        the layout or isn't a valid date (so pandas reports it)
+    """
+
+    # get the characters of the dates as rows of bytes, if they're all
+    # ascii strings of the width of the format
+    width = layout[-1][1] + (layout[-1][2] if layout[-1][0] else 1)
+    try:
+        joined = "".join(values).encode("ascii")
+    except (TypeError, UnicodeEncodeError):
+        return None
+    lengths = np.fromiter(map(len, values), np.int64, len(values))
+    if not (lengths == width).all():
+        return None
+    chars = np.frombuffer(joined, np.uint8).reshape(len(values), width)
+
+    # read each field from its digits after checking the literals
+    fields = {"m": 1, "d": 1, "H": 0, "M": 0, "S": 0}
+    for directive, position, size in layout:
+        if directive is None:
+            if not (chars[:, position] == ord(size)).all():
+                return None
+            continue
+        digits = chars[:, position:position + size].astype(np.int64) - 48
+        if not ((digits >= 0) & (digits <= 9)).all():
+            return None
+        fields[directive] = digits @ (10 ** np.arange(size - 1, -1, -1))
+
+    # make sure each field is in range (including the days of the month)
+    year, month, day = fields["Y"], fields["m"], fields["d"]
+    if not (((year >= MIN_YEAR) & (year <= MAX_YEAR)
+             & (month >= 1) & (month <= 12) & (day >= 1)
+             & (fields["H"] < 24) & (fields["M"] < 60)
+             & (fields["S"] < 60)).all()):
+        return None
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    if not (day <= MONTH_DAYS[month] + (leap & (month == 2))).all():
+        return None
+
+    # count days since 1970-01-01 with integer arithmetic (years are
+    # shifted to start in March so leap days fall at the end of a year)
+    march_year = year - (month <= 2)
+    year_day = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    days = (march_year * 365 + march_year // 4 - march_year // 100
+            + march_year // 400 + year_day - 719468)
+
+    seconds = (days * 86400 + fields["H"] * 3600 + fields["M"] * 60
+               + fields["S"])
+    return (seconds * 10 ** 9).astype("datetime64[ns]")
+
+
+def raise_first_invalid(values: pd.Index, codes: np.ndarray,
+                        date_format: str) -> None:
+    """
+    Raise the error pandas gives for the first row that can't be parsed
+
+    Arguments:
+        values (pd.Index):
+            distinct dates as text
+        codes (np.ndarray):
+            position of each row's date in values (-1 if missing)
+        date_format (str):
+            strptime format of the dates
+
+    Raises:
+        ValueError:
+            pandas' error for the first invalid date, with the position of
+            its row rather than its position among the distinct dates
+    """
+
+    # find the distinct dates that can't be parsed
+    invalid = np.flatnonzero(pd.isna(pd.to_datetime(values,
+                                                    format=date_format,
+                                                    errors="coerce")))
+
+    # find the first row of any of them in a single pass over the rows
+    # (again without dates that pandas takes as missing, e.g. "NaT")
+    while len(invalid):
+        rows = np.isin(codes, invalid)
+        if not rows.any():
+            return
+        row = int(np.argmax(rows))
+        code = codes[row]
+        try:
+            pd.to_datetime(values[code:code + 1], format=date_format)
+        except ValueError as error:
+            raise ValueError(str(error).replace("at position 0",
+                                                f"at position {row}", 1))
+        invalid = invalid[invalid != code]
+
+
+def parse_dates(series: pd.Series, date_format: str) -> pd.Series:
+    """
+    Parse a column of dates, parsing each distinct date only once
+
+    The column is factorized (categorical columns already are) and only its
+    distinct dates are parsed, with a vectorized fast path for fixed-width
+    formats, then mapped back to the rows through their codes
+
+    Arguments:
+        series (pd.Series):
+            dates as text (or a categorical of them)
+        date_format (str):
+            strptime format of the dates
+
+    Returns:
+        series of the parsed dates (missing dates stay missing)
+
+    Raises:
+        ValueError:
+            a date doesn't match the format
+    """
+
+    # get the distinct dates and the code of each row
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        values = series.cat.categories
+    else:
+        codes, values = pd.factorize(series)
+
+    # parse the distinct dates
+    parsed = None
+    layout = get_fixed_width_layout(date_format)
+    if layout is not None and len(values):
+        parsed = parse_fixed_width(values.to_numpy(), layout)
+    if parsed is None:
+        try:
+            parsed = pd.to_datetime(values, format=date_format).to_numpy()
+        except ValueError:
+            raise_first_invalid(values, codes, date_format)
+            raise
+
+    # map them back to the rows (code -1 takes the NaT at the end)
+    parsed = np.append(parsed.astype("datetime64[ns]"),
+                       np.datetime64("NaT", "ns"))
+    return pd.Series(parsed[codes], index=series.index, name=series.name)
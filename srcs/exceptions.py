@@ -1,20 +1,52 @@
 class UsageError(Exception):
     """When an incorrect number of arguments are passed"""
 
-    def __init__(self, arg_len: int) -> None:
+    def __init__(self, arg_len: int, option: str = "") -> None:
         """
-        Determine appropriate message based on number of arguments passed
+        Determine appropriate message based on the arguments passed
 
         Args:
             arg_len: The number of arguments
+            option: The invalid option, if any
         """
 
-        # check if there are too little or too many arguments
-        message = f"{'not enough' if arg_len < 2 else 'too many'} arguments\n"
+        # check if an option is invalid or
+        # if there are too little or too many arguments
+        if option:
+            message = f"invalid option '{option}'\n"
+        else:
+            message = (f"{'not enough' if arg_len < 2 else 'too many'} "
+                       "arguments\n")
 
         # send error message and usage info to Exception
         padding = "            "
-        usage = "python3 reformatted_sheets.py [input_config] [output_config]"
+        usage = ("python3 reformatted_sheets.py "
+                 "[input_config] [output_config] [options]")
+        options = ["--jobs N: read input files with N workers",
+                   "--processes: use processes instead of threads for jobs",
+                   "--output-jobs N: generate output files with "
+                   "N worker processes",
+                   "--writer NAME: write xlsx files with "
+                   "openpyxl, xlsxwriter or stream",
+                   "--cache: reuse unchanged data and output files "
+                   "from previous runs",
+                   "--engine NAME: run the pipeline with pandas or "
+                   "as a lazy polars query",
+                   "--spill DIR: spill the combined data to DIR by month "
+                   "and generate sheets a month at a time",
+                   "--instrument FILE: append timings of each stage to "
+                   "FILE as JSON lines (- for stderr)",
+                   "--validate: only check the configs and the headers "
+                   "of the input files",
+                   "--batch MANIFEST: run every input and output config "
+                   "pair of MANIFEST, reading each input config once",
+                   "--watch: keep running and regenerate output files "
+                   "when inputs or configs change",
+                   "--interval SECONDS: seconds between checks "
+                   "for changes (default 1)",
+                   "--port N: trigger runs with POST "
+                   "http://127.0.0.1:N/run"]
+        usage += "".join("\n" + padding + "  " + opt for opt in options)
         super().__init__("UsageError: " + message + padding + usage)
 
 
@@ -56,6 +88,21 @@ class InputConfigError(Exception):
                         else "key " + args[1][1:-1])
             message += f' in "{args[0]}"'
 
+        if error == "InvalidKey":
+            message = (f"invalid value for key '{args[1]}' "
+                       f'in "{args[0]}"')
+
+        if error == "MissingDependency":
+            message = (f"'{args[1]}' is required by \"{args[0]}\" "
+                       "but isn't installed")
+
+        if error == "MissingBatchInfo":
+            message = f'missing config pairs in "{args[0]}"'
+
+        if error == "InvalidSpillFolder":
+            message = (f'spill folder "{args[0]}" already exists '
+                       "but wasn't created by --spill")
+
         if error == "InputFileNotFound":
             message = (f'input file "{args[0]}" '
                        'cannot be found in "input_files" folder')
@@ -79,8 +126,21 @@ class InputConfigError(Exception):
             message = (f"'join_on' column '{args[1]}' from \"{args[0]}\" "
                        "doesn't match any existing columns")
 
+        if error == "DuplicateJoinKey":
+            message = (f"'join_on' column '{args[1]}' in \"{args[0]}\" "
+                       f"has duplicate values {args[2]}")
+
         super().__init__("InputConfigError: " + message)
 
+        # save arguments so the error can be pickled by worker processes
+        self.error = error
+        self.details = args
+
+    def __reduce__(self) -> tuple:
+        """Recreate the error from its arguments when unpickled"""
+
+        return (self.__class__, (self.error, *self.details))
+
 
 class OutputConfigError(Exception):
     """When an error is found in the output config"""
@@ -129,6 +189,14 @@ class OutputConfigError(Exception):
                         else "key " + args[1][1:-1])
             message += f' in "{args[0]}"'
 
+        if error == "InvalidKey":
+            message = (f"invalid value for key '{args[1]}' "
+                       f'in "{args[0]}"')
+
+        if error == "MissingDependency":
+            message = (f"'{args[1]}' is required by output file "
+                       f'"{args[0]}" but isn\'t installed')
+
         if error == "ColumnNotFound":
             message = ("columns " + args[2] if ',' in args[2]
                        else "column " + args[2][1:-1])
@@ -148,4 +216,18 @@ class OutputConfigError(Exception):
             message = (f"'range.column' '{args[2]}' of sheet \"{args[1]}\" "
                        f'in output file "{args[0]}" doesn\'t have a date type')
 
+        if error == "OutputFilesFailed":
+            message = f"{args[0]} of {args[1]} output files failed"
+            message += "".join("\n                   " + line
+                               for line in args[2].split("\n"))
+
         super().__init__("OutputConfigError: " + message)
+
+        # save arguments so the error can be pickled by worker processes
+        self.error = error
+        self.details = args
+
+    def __reduce__(self) -> tuple:
+        """Recreate the error from its arguments when unpickled"""
+
+        return (self.__class__, (self.error, *self.details))
@@ -1,7 +1,18 @@
+import io
 import os
 import json
+import numpy as np
 import pandas as pd
+from collections.abc import Iterator
+from concurrent.futures import (Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from pandas.api.types import union_categoricals
+from pandas.api.extensions import ExtensionDtype, take
 from .exceptions import InputConfigError
+from .config_reader import read_input_config
+from .date_parser import parse_dates
+from .build_cache import BuildCache
+from .instrumentation import Instrumentation
 
 
 class InputHandler():
@@ -11,6 +22,34 @@ class InputHandler():
     Methods:
         read_config_file() -> None:
             read and parse the config file
+        get_read_options(input_file: dict) -> dict:
+            get options for the csv reader based on config
+        transform_input_data(input_file: dict,
+                             new_data: pd.DataFrame) -> pd.DataFrame:
+            manipulate data read from an input file based on config
+        iter_input_batches(input_file: dict,
+                           source=None) -> Iterator[pd.DataFrame]:
+            read an input file and yield manipulated batches of data
+        read_appended_rows(input_file: dict) -> pd.DataFrame | None:
+            parse only the rows appended to an input file since its last read
+        read_input_batches(input_file: dict, fingerprint: str | None = None
+                           ) -> list[pd.DataFrame]:
+            get manipulated batches of data from a single input file
+        read_input_file(input_file: dict,
+                        fingerprint: str | None = None) -> pd.DataFrame:
+            get data from a single input file and manipulate based on config
+        concat_input_data(frames: list[pd.DataFrame]) -> pd.DataFrame:
+            combine dataframes while keeping categorical columns
+        join_input_data(all_data: pd.DataFrame,
+                        join_data: list[tuple]) -> pd.DataFrame:
+            join data from input files with join_on to the combined data
+        get_file_key(input_file: dict) -> tuple | None:
+            get the key parsed data of an input file is kept under
+        get_cache_state(input_file: dict,
+                        fingerprint: str | None) -> tuple | None:
+            get what a worker process needs of the cache to read a file
+        get_worker_result(future: Future) -> list[pd.DataFrame]:
+            get the batches read by a worker process and write its records
         read_input_files() -> pd.DataFrame:
             get data from input files and manipulate based on config
 
@@ -19,19 +58,51 @@ class InputHandler():
             config objects of the input files
         config_filename (str):
             name of the config file
+        jobs (int):
+            number of workers to read input files with
+        pool (str):
+            type of workers to use, either "thread" or "process"
+        cache (BuildCache | None):
+            cache to reuse parsed data of unchanged input files from
+        cache_all (bool):
+            whether all input files are cached or only those with "cache"
+        instrumentation (Instrumentation):
+            records duration, row counts and memory of each stage
+        keep_data (bool):
+            whether to keep parsed data of input files between reads
+        loaded_files (dict):
+            parsed batches of input files kept by their config, mtime and
+            size
 
     """
 
-    def __init__(self, config_filename: str) -> None:
+    def __init__(self, config_filename: str, jobs: int = 1,
+                 pool: str = "thread", cache: BuildCache | None = None,
+                 instrumentation: Instrumentation | None = None) -> None:
         """
-        Save the config filename
+        Save the config filename, worker settings, cache and instrumentation
 
         Arguments:
             config_filename (str):
                 name of the config file
+            jobs (int):
+                number of workers to read input files with
+            pool (str):
+                type of workers to use, either "thread" or "process"
+            cache (BuildCache | None):
+                cache to reuse parsed data of unchanged input files from
+            instrumentation (Instrumentation | None):
+                records duration, row counts and memory of each stage
         """
 
         self.config_filename = config_filename
+        self.jobs = jobs
+        self.pool = pool
+        self.cache = cache
+        self.cache_all = cache is not None
+        self.instrumentation = instrumentation or Instrumentation()
+        self.keep_data = False
+        self.loaded_files = {}
 
     def read_config_file(self) -> None:
         """
@@ -45,61 +116,521 @@ class InputHandler():
                 "MissingColumnInfo": the column section is empty
                 "InvalidColumnInfo": the column section contains invalid values
                 "MissingKey": the required keys are missing
+                "InvalidKey": an optional key has an invalid value
         """
 
-        # make sure config file exists
-        if not os.path.isfile("configs/" + self.config_filename):
-            raise InputConfigError("ConfigFileNotFound", self.config_filename)
+        self.config = read_input_config(self.config_filename)
 
-        # read and parse the config
-        with open("configs/" + self.config_filename) as config_file:
+    def get_read_options(self, input_file: dict) -> dict:
+        """
+        Get options for the csv reader based on config
+
+        Only the columns used by the config are parsed, with their dtypes
+        applied while reading. Date columns are read as categories, so each
+        distinct date is only parsed once after reading (pyarrow parses them
+        while reading instead). Columns used more than once are left as is
+        and converted after reading instead.
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            keyword arguments for pd.read_csv
+        """
+
+        # get the columns to read from the file
+        sources = [column["from"] for column in input_file["columns"]
+                   if "from" in column]
+        options = {}
+        if sources:
+            options["usecols"] = list(dict.fromkeys(sources))
+
+        # get dtypes and date formats of columns used only once
+        dtypes = {}
+        date_formats = {}
+        for column in input_file["columns"]:
+            if "from" not in column or sources.count(column["from"]) > 1:
+                continue
+            if "format" in column:
+                if input_file.get("engine") == "pyarrow":
+                    date_formats[column["from"]] = column["format"]
+                else:
+                    dtypes[column["from"]] = "category"
+            elif "dtype" in column:
+                dtypes[column["from"]] = column["dtype"]
+        if dtypes:
+            options["dtype"] = dtypes
+        if date_formats:
+            options["parse_dates"] = list(date_formats)
+            options["date_format"] = date_formats
+
+        # use a different parsing engine if specified
+        if "engine" in input_file:
+            options["engine"] = input_file["engine"]
+
+        return options
+
+    def transform_input_data(self, input_file: dict,
+                             new_data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Manipulate data read from an input file based on config
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+            new_data (pd.DataFrame):
+                dataframe containing data (or a batch of it) read from the file
+
+        Returns:
+            dataframe with the columns selected, renamed and converted
+
+        Raises:
+            InputConfigError:
+                "InvalidFormat": a column contains data that
+                                 doesn't match the specified format
+        """
+
+        # get info of the columns from config
+        columns = []
+        new_columns = {}
+        renames = {}
+        dtypes = {}
+        for column in input_file["columns"]:
+            # either take from an existing column or use a custom value
+            if "from" in column:
+                # for columns that already exist
+                columns.append(column["from"])
+
+                # for custom names
+                if column["name"] != column["from"]:
+                    renames[column["from"]] = column["name"]
+            elif "value" in column:
+                # for custom values
+                new_columns[column["name"]] = column["value"]
+
+            # for custom dtypes
+            if "dtype" in column and "format" not in column:
+                dtypes[column["name"]] = column["dtype"]
+
+        # order the columns as specified and rename them
+        new_data = new_data[columns]
+        new_data = new_data.rename(columns=renames)
+
+        # parse date columns not already parsed while reading
+        date_columns = [col for col in input_file["columns"]
+                        if "format" in col and not
+                        pd.api.types.is_datetime64_dtype(
+                            new_data[col["name"]])]
+        if date_columns:
+            with self.instrumentation.stage("parse_dates",
+                                            input_file=input_file["filename"],
+                                            rows_in=len(new_data)):
+                for col in date_columns:
+                    try:
+                        new_data[col["name"]] = parse_dates(
+                                                new_data[col["name"]],
+                                                col["format"])
+                    except ValueError as error:
+                        raise InputConfigError("InvalidFormat",
+                                               input_file["filename"],
+                                               col["from"], str(error))
+
+        # store text values once as a single category instead of per row
+        for name, value in new_columns.items():
+            if isinstance(value, str):
+                new_columns[name] = pd.Categorical.from_codes(
+                                        np.zeros(len(new_data), dtype="int8"),
+                                        [value])
+
+        # add new columns with their values and apply dtypes
+        return new_data.assign(**new_columns).astype(dtypes)
+
+    def iter_input_batches(self, input_file: dict,
+                           source=None) -> Iterator[pd.DataFrame]:
+        """
+        Read an input file and yield manipulated batches of data
+
+        The header is read first so missing columns are caught before any
+        data is parsed. Files with a "chunksize" are read that many rows at a
+        time so only one raw chunk is held in memory while parsing (the
+        batches yielded are up to the caller), otherwise the whole file is
+        read and yielded as a single batch
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+            source (file object | None):
+                csv data to read instead of the whole file (with the same
+                header), e.g. rows appended to it
+
+        Yields:
+            manipulated dataframe for each batch read from the file
+
+        Raises:
+            InputConfigError:
+                "InputFileNotFound": the input file cannot be found
+                "ColumnNotFound": the specified columns cannot be found
+                "InvalidFormat": a column contains data that
+                                 doesn't match the specified format
+                "MissingDependency": the engine isn't installed
+        """
+
+        # get file path and make sure it exists
+        input_path = "input_files/" + input_file["filename"]
+        if not os.path.isfile(input_path):
+            raise InputConfigError("InputFileNotFound",
+                                   input_file["filename"])
+
+        # make sure specified columns exist using only the header
+        header = pd.read_csv(input_path, nrows=0).columns
+        columns_not_found = [col["from"] for col in input_file["columns"]
+                             if "from" in col and col["from"] not in header]
+        if len(columns_not_found):
+            raise InputConfigError("ColumnNotFound",
+                                   input_file["filename"],
+                                   str(columns_not_found))
+
+        # read whole file if no chunk size is given
+        options = self.get_read_options(input_file)
+        if source is None:
+            source = input_path
+        if "chunksize" not in input_file:
+            with self.instrumentation.stage(
+                    "read_csv", input_file=input_file["filename"]) as record:
+                try:
+                    new_data = pd.read_csv(source, **options)
+                except ImportError:
+                    raise InputConfigError("MissingDependency",
+                                           input_file["filename"],
+                                           input_file["engine"])
+                record["rows_out"] = len(new_data)
+            yield self.transform_input_data(input_file, new_data)
+            return
+
+        # read and manipulate file in chunks
+        batch_count = 0
+        with pd.read_csv(source, chunksize=input_file["chunksize"],
+                         **options) as reader:
+            chunks = iter(reader)
+            while True:
+                with self.instrumentation.stage(
+                        "read_csv", input_file=input_file["filename"],
+                        batch=batch_count) as record:
+                    chunk = next(chunks, None)
+                    record["rows_out"] = 0 if chunk is None else len(chunk)
+                if chunk is None:
+                    break
+                batch_count += 1
+                yield self.transform_input_data(input_file, chunk)
+
+        # still yield the (empty) columns for files without any rows
+        if not batch_count:
+            yield self.transform_input_data(input_file,
+                                            pd.read_csv(input_path, nrows=0,
+                                                        **options))
+
+    def read_appended_rows(self, input_file: dict) -> pd.DataFrame | None:
+        """
+        Parse only the rows appended to an input file since its last read
+
+        The data saved from the last read is combined with the new rows, if
+        the file was only appended to since (see BuildCache.get_append_state)
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            dataframe containing manipulated data from the whole input file
+            or None if the file has to be read from the start
+        """
+
+        state = self.cache.get_append_state(input_file)
+        if state is None:
+            return None
+        saved_data = self.cache.load_data(state["data"])
+        if saved_data is None or len(saved_data) != state["rows"]:
+            return None
+
+        # read the header and the bytes appended up to when it was hashed
+        input_path = "input_files/" + input_file["filename"]
+        with open(input_path, "rb") as file:
+            header = file.readline()
+            file.seek(state["offset"])
+            appended = file.read(state["size"] - state["offset"])
+
+        batches = self.iter_input_batches(input_file,
+                                          io.BytesIO(header + appended))
+        return self.concat_input_data([saved_data, *batches])
+
+    def read_input_batches(self, input_file: dict,
+                           fingerprint: str | None = None
+                           ) -> list[pd.DataFrame]:
+        """
+        Get manipulated batches of data from a single input file
+
+        Every batch of a file read in chunks is kept, so only the memory
+        used to parse the file is bounded by its "chunksize", not the memory
+        its data takes. Batches aren't combined here, so they're only copied
+        once when the data of all input files is combined.
+        Data loaded from or saved to the cache is a single batch.
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+            fingerprint (str | None):
+                fingerprint to load and save the parsed data under
+
+        Returns:
+            dataframes containing manipulated data from the input file
+
+        Raises:
+            InputConfigError:
+                "InputFileNotFound": the input file cannot be found
+                "ColumnNotFound": the specified columns cannot be found
+                "InvalidFormat": a column contains data that
+                                 doesn't match the specified format
+        """
+
+        with self.instrumentation.stage("read_input_file",
+                                        input_file=input_file["filename"]
+                                        ) as record:
+            # reuse parsed data if the file and its config haven't changed
+            if self.cache and fingerprint:
+                new_data = self.cache.load_data(fingerprint)
+                record["cached"] = new_data is not None
+                if new_data is not None:
+                    record["rows_out"] = len(new_data)
+                    return [new_data]
+
+            # parse only rows appended since the last read if possible
+            new_data = None
+            if self.cache and fingerprint:
+                new_data = self.read_appended_rows(input_file)
+                record["appended"] = new_data is not None
+
+            # every batch is kept, only parsing is a chunk at a time
+            if new_data is None:
+                batches = list(self.iter_input_batches(input_file))
+            else:
+                batches = [new_data]
+
+            # save parsed data for later runs
+            if self.cache and fingerprint:
+                if len(batches) > 1:
+                    batches = [self.concat_input_data(batches)]
+                self.cache.save_data(fingerprint, batches[0])
+
+            record["rows_out"] = sum(len(batch) for batch in batches)
+            record["batches"] = len(batches)
+            return batches
+
+    def read_input_file(self, input_file: dict,
+                        fingerprint: str | None = None) -> pd.DataFrame:
+        """
+        Get data from a single input file and manipulate based on config
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+            fingerprint (str | None):
+                fingerprint to load and save the parsed data under
+
+        Returns:
+            dataframe containing manipulated data from the input file
+
+        Raises:
+            InputConfigError:
+                "InputFileNotFound": the input file cannot be found
+                "ColumnNotFound": the specified columns cannot be found
+                "InvalidFormat": a column contains data that
+                                 doesn't match the specified format
+        """
+
+        batches = self.read_input_batches(input_file, fingerprint)
+        return (batches[0] if len(batches) == 1
+                else self.concat_input_data(batches))
+
+    def concat_input_data(self, frames: list[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Combine dataframes while keeping categorical columns
+
+        pd.concat falls back to object dtype when categorical columns have
+        different categories, so they are unioned before combining
+
+        Arguments:
+            frames (list[pd.DataFrame]):
+                dataframes to combine
+
+        Returns:
+            dataframe containing data from all the dataframes
+        """
+
+        # give categorical columns the same categories in every dataframe
+        for column in frames[0].columns:
+            series = [frame[column] for frame in frames if column in frame]
+            if not (len(series) == len(frames)
+                    and all(isinstance(col.dtype, pd.CategoricalDtype)
+                            for col in series)):
+                continue
             try:
-                self.config = json.load(config_file)
-            except ValueError as error:
-                raise InputConfigError("InvalidSyntax",
-                                       self.config_filename, str(error))
-
-        # handle single input file in config
-        if type(self.config) is dict:
-            self.config = [self.config]
-
-        # make sure the config isn't empty
-        if not self.config:
-            raise InputConfigError("MissingInputFileInfo",
-                                   self.config_filename)
-
-        # make sure required keys exist
-        missing_keys = []
-        for input_file in self.config:
-            missing_keys.extend([key for key in ["filename", "columns"]
-                                 if key not in input_file])
-            if "columns" in input_file:
-                # make sure the columns aren't empty
-                if not (type(input_file["columns"]) is list
-                        and input_file["columns"]):
-                    raise InputConfigError("MissingColumnInfo",
-                                           self.config_filename)
-
-                # make sure required keys exist in columns
-                for column in input_file["columns"]:
-                    if type(column) is dict:
-                        if "name" not in column:
-                            missing_keys.append("name")
-                        elif "from" not in column and "value" not in column:
-                            missing_keys.append("from / value")
-                    else:
-                        raise InputConfigError("InvalidColumnInfo",
-                                               self.config_filename)
-
-        # raise exception if there are keys missing
-        if missing_keys:
-            raise InputConfigError("MissingKey",
-                                   self.config_filename, str(missing_keys))
+                categories = union_categoricals(series).categories
+            except TypeError:
+                # categories of different types can't be combined
+                continue
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+
+        return pd.concat(frames, ignore_index=True)
+
+    def join_input_data(self, all_data: pd.DataFrame,
+                        join_data: list[tuple]) -> pd.DataFrame:
+        """
+        Join data from input files with join_on to the combined data
+
+        Each file to join is indexed by its join_on column once and its
+        other columns are mapped onto the combined data by position, like a
+        left merge but without copying the combined data for every file.
+        Text columns are joined as categoricals, so each row only holds a
+        code into the file's distinct values.
+        Duplicate join keys are rejected up front since they would
+        otherwise multiply rows of the combined data.
+
+        Arguments:
+            all_data (pd.DataFrame):
+                dataframe containing combined data from the other input files
+            join_data (list[tuple]):
+                dataframe, join_on column and filename of each file to join
+
+        Returns:
+            dataframe containing the joined data
+
+        Raises:
+            InputConfigError:
+                "InvalidJoinColumn": the join_on column
+                                     doesn't match any other columns
+                "DuplicateJoinKey": the join_on column has duplicate values
+        """
+
+        for join_df, join_on, filename in join_data:
+            if join_on not in all_data.columns:
+                raise InputConfigError("InvalidJoinColumn", filename, join_on)
+
+            # make sure each key matches at most one row
+            duplicated = join_df[join_on].duplicated()
+            if duplicated.any():
+                duplicates = join_df[join_on][duplicated].unique().tolist()
+                raise InputConfigError("DuplicateJoinKey", filename,
+                                       join_on, str(duplicates[:5]))
+
+            with self.instrumentation.stage("join", input_file=filename,
+                                            rows_in=len(all_data)) as record:
+                # find the row of each key (-1 if it has no match), looking
+                # up only the distinct keys of categorical columns
+                join_index = pd.Index(join_df[join_on])
+                keys = all_data[join_on]
+                if isinstance(keys.dtype, pd.CategoricalDtype):
+                    positions = np.append(
+                        join_index.get_indexer(keys.cat.categories),
+                        -1)[keys.cat.codes.to_numpy()]
+                else:
+                    positions = join_index.get_indexer(keys)
+                has_missing = bool((positions == -1).any())
+
+                # take values of the other columns for each row, with text
+                # columns encoded as categories of the file's distinct values
+                new_columns = {}
+                for column in join_df.columns.drop(join_on):
+                    series = join_df[column]
+                    if series.dtype == object:
+                        series = series.astype("category")
+                    values = take(series.array
+                                  if isinstance(series.dtype, ExtensionDtype)
+                                  else series.to_numpy(),
+                                  positions, allow_fill=has_missing)
+                    # suffix columns that exist on both sides like merge
+                    if column in all_data.columns:
+                        all_data = all_data.rename(
+                                        columns={column: column + "_x"})
+                        column += "_y"
+                    new_columns[column] = values
+
+                # add the new columns without copying existing ones
+                all_data = pd.concat([all_data,
+                                      pd.DataFrame(new_columns,
+                                                   index=all_data.index)],
+                                     axis=1, copy=False)
+                record["rows_out"] = len(all_data)
+        return all_data
+
+    def get_file_key(self, input_file: dict) -> tuple | None:
+        """
+        Get the key parsed data of an input file is kept under
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            config, mtime and size of the input file or None if it cannot
+            be found
+        """
+
+        input_path = "input_files/" + input_file["filename"]
+        if not os.path.isfile(input_path):
+            return None
+
+        stat = os.stat(input_path)
+        return (json.dumps(input_file, sort_keys=True),
+                stat.st_mtime_ns, stat.st_size)
+
+    def get_cache_state(self, input_file: dict,
+                        fingerprint: str | None) -> tuple | None:
+        """
+        Get what a worker process needs of the cache to read an input file
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+            fingerprint (str | None):
+                fingerprint of the file, None if it isn't cached
+
+        Returns:
+            cache folder and manifest entries of the file, or None if the
+            file isn't cached
+        """
+
+        if not (self.cache and fingerprint):
+            return None
+        return (self.cache.cache_dir, self.cache.get_input_state(input_file))
+
+    def get_worker_result(self, future: Future) -> list[pd.DataFrame]:
+        """
+        Get the batches read by a worker process and write its records
+
+        Arguments:
+            future (Future):
+                future of read_input_batches_in_worker
+
+        Returns:
+            dataframes containing manipulated data from the input file
+        """
+
+        batches, lines = future.result()
+        self.instrumentation.merge(lines)
+        return batches
 
     def read_input_files(self) -> pd.DataFrame:
         """
         Get data from input files and manipulate based on config
 
+        Files are read by a pool of workers if there's more than one job,
+        but results are still handled in config order so the combined data
+        and the errors raised are the same as reading them one by one.
+        If keep_data is set, files that haven't changed since the last read
+        aren't read again.
+
         Returns:
             dataframe containing data from all input files
 
@@ -114,80 +645,140 @@ class InputHandler():
                                      doesn't match any other columns
         """
 
-        # read, manipulate and save data from each input file
+        # cache files that ask for it even if not caching all files
+        cached_files = [self.cache_all
+                        or ("cache" in input_file and input_file["cache"])
+                        for input_file in self.config]
+        if self.cache is None and any(cached_files):
+            self.cache = BuildCache()
+
+        # get fingerprints of input files to reuse cached data with
+        fingerprints = [self.cache.fingerprint_input_file(input_file)
+                        if cached else None
+                        for input_file, cached
+                        in zip(self.config, cached_files)]
+        if self.cache_all:
+            self.cache.data_fingerprint = (
+                None if None in fingerprints
+                else self.cache.fingerprint(fingerprints))
+
+        # only read files whose data isn't kept from a previous read
+        file_keys = [self.get_file_key(input_file) if self.keep_data
+                     else None for input_file in self.config]
+        read_files = [index for index, key in enumerate(file_keys)
+                      if key not in self.loaded_files]
+        read_configs = [self.config[index] for index in read_files]
+        read_fingerprints = [fingerprints[index] for index in read_files]
+
+        # read and manipulate data from each input file
+        executor = None
+        if self.jobs > 1 and len(read_files) > 1 and self.pool == "process":
+            # workers only get the configs of their files, not the handler
+            # (with the data it keeps), and send back their stage records
+            executor = ProcessPoolExecutor(min(self.jobs, len(read_files)))
+            futures = [executor.submit(read_input_batches_in_worker,
+                                       self.config_filename, input_file,
+                                       fingerprint, self.get_cache_state(
+                                           input_file, fingerprint),
+                                       self.instrumentation.buffered())
+                       for input_file, fingerprint
+                       in zip(read_configs, read_fingerprints)]
+            results = map(self.get_worker_result, futures)
+        elif self.jobs > 1 and len(read_files) > 1:
+            executor = ThreadPoolExecutor(min(self.jobs, len(read_files)))
+            results = executor.map(self.read_input_batches,
+                                   read_configs, read_fingerprints)
+        else:
+            results = map(self.read_input_batches,
+                          read_configs, read_fingerprints)
+
+        # save data from each input file in config order
         data = []
         join_data = []
-        for input_file in self.config:
-            # get file path and make sure it exists
-            input_path = "input_files/" + input_file["filename"]
-            if not os.path.isfile(input_path):
-                raise InputConfigError("InputFileNotFound",
-                                       input_file["filename"])
-
-            # get info of the columns from config
-            columns = []
-            new_columns = {}
-            renames = {}
-            for column in input_file["columns"]:
-                # either take from an existing column or use a custom value
-                if "from" in column:
-                    # for columns that already exist
-                    columns.append(column["from"])
-
-                    # for custom names
-                    if column["name"] != column["from"]:
-                        renames[column["from"]] = column["name"]
-                elif "value" in column:
-                    # for custom values
-                    new_columns[column["name"]] = column["value"]
-
-            # read data from input file
-            new_data = pd.read_csv(input_path)
-
-            # make sure specified columns exist and remove the rest
-            columns_not_found = [col for col in columns
-                                 if col not in new_data.columns]
-            if len(columns_not_found):
-                raise InputConfigError("ColumnNotFound",
-                                       input_file["filename"],
-                                       str(columns_not_found))
-            new_data = new_data[columns]
-
-            # rename columns
-            new_data.rename(columns=renames, inplace=True)
-
-            # convert date columns based on given format
-            for col in input_file["columns"]:
-                if "format" in col:
-                    try:
-                        new_data[col["name"]] = pd.to_datetime(
-                                                new_data[col["name"]],
-                                                format=col["format"])
-                    except ValueError as error:
-                        raise InputConfigError("InvalidFormat",
+        loaded_files = {}
+        try:
+            for input_file, key, fingerprint in zip(self.config, file_keys,
+                                                    fingerprints):
+                if key in self.loaded_files:
+                    batches = self.loaded_files[key]
+                else:
+                    batches = next(results)
+                if key is not None:
+                    loaded_files[key] = batches
+
+                # record how far the file was parsed to continue from later
+                if fingerprint:
+                    self.cache.save_append_state(input_file, fingerprint,
+                                                 sum(len(batch)
+                                                     for batch in batches))
+
+                # add data to appropriate array, batches of files to
+                # combine are only copied once by the concat below
+                if "join_on" in input_file:
+                    new_data = (batches[0] if len(batches) == 1
+                                else self.concat_input_data(batches))
+                    # make sure the column exists
+                    if input_file["join_on"] not in new_data.columns:
+                        raise InputConfigError("JoinColumnNotFound",
                                                input_file["filename"],
-                                               col["from"], str(error))
+                                               input_file["join_on"])
+                    join_data.append((new_data,
+                                      input_file["join_on"],
+                                      input_file["filename"]))
+                else:
+                    data.extend(batches)
+        finally:
+            # stop reading remaining files if an error was raised
+            if executor:
+                executor.shutdown(cancel_futures=True)
 
-            # add new columns with their values
-            new_data = new_data.assign(**new_columns)
+        # keep data of the files in the config only
+        self.loaded_files = loaded_files
 
-            # add data to appropriate array
-            if "join_on" in input_file:
-                # make sure the column exists
-                if input_file["join_on"] not in new_data.columns:
-                    raise InputConfigError("JoinColumnNotFound",
-                                           input_file["filename"],
-                                           input_file["join_on"])
-                join_data.append((new_data,
-                                  input_file["join_on"],
-                                  input_file["filename"]))
-            else:
-                data.append(new_data)
+        # save hashes of the input files for the next run
+        if self.cache:
+            self.cache.save_manifest()
 
         # combine and join data from all files to one dataframe
-        all_data = pd.concat(data)
-        for join in join_data:
-            if join[1] not in all_data.columns:
-                raise InputConfigError("InvalidJoinColumn", join[2], join[1])
-            all_data = all_data.merge(join[0], on=join[1], how="left")
-        return (all_data)
+        with self.instrumentation.stage(
+                "concat", rows_in=sum(len(new_data) for new_data in data),
+                batches=len(data)) as record:
+            all_data = self.concat_input_data(data)
+            record["rows_out"] = len(all_data)
+        return self.join_input_data(all_data, join_data)
+
+
+def read_input_batches_in_worker(config_filename: str, input_file: dict,
+                                 fingerprint: str | None,
+                                 cache_state: tuple | None,
+                                 instrumentation: Instrumentation) -> tuple:
+    """
+    Read an input file in a worker process
+
+    Arguments:
+        config_filename (str):
+            name of the input config file
+        input_file (dict):
+            config object of the input file
+        fingerprint (str | None):
+            fingerprint to load and save the parsed data under
+        cache_state (tuple | None):
+            cache folder and manifest entries of the file (see
+            InputHandler.get_cache_state), or None if it isn't cached
+        instrumentation (Instrumentation):
+            buffered instrumentation of the run
+
+    Returns:
+        dataframes containing manipulated data from the input file and the
+        lines of the stage records of reading it
+    """
+
+    cache = None
+    if cache_state is not None:
+        cache = BuildCache(cache_state[0])
+        cache.load_input_state(cache_state[1])
+
+    input_handler = InputHandler(config_filename, cache=cache,
+                                 instrumentation=instrumentation)
+    batches = input_handler.read_input_batches(input_file, fingerprint)
+    return batches, instrumentation.lines
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# environment variable that enables instrumentation like --instrument
+INSTRUMENT_ENV = "REFORMATTED_SHEETS_INSTRUMENT"
+
+
+def get_rss_mb() -> float | None:
+    """
+    Get the current resident memory of the process
+
+    Falls back to the peak resident memory where the current one can't be
+    read (anywhere without /proc)
+
+    Returns:
+        resident memory in MB or None if it can't be measured
+    """
+
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1 << 20), 1)
+    except (OSError, ValueError, IndexError):
+        pass
+
+    if resource is None:
+        return None
+
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10),
+                 1)
+
+
+class Instrumentation():
+    """
+    Record duration, row counts and memory of each stage as JSON lines
+
+    Methods:
+        stage(name: str, **fields) -> Iterator[dict]:
+            measure a stage and emit its record when it ends
+        emit(record: dict) -> None:
+            write a record as a JSON line
+        write(line: dict) -> None:
+            append a line to the output
+        buffered() -> Instrumentation:
+            get instrumentation of the same run that keeps its lines
+        merge(lines: list[dict]) -> None:
+            write the lines kept by buffered instrumentation
+
+    Attributes:
+        output_path (str | None):
+            file to append records to, "-" for stderr or None if disabled
+        run_id (str):
+            id shared by the records of a run
+        lines (list[dict] | None):
+            lines kept instead of written (by worker processes, which send
+            them back with their results), or None to write them
+    """
+
+    def __init__(self, output_path: str | None = None) -> None:
+        """
+        Save where records are written to
+
+        Arguments:
+            output_path (str | None):
+                file to append records to, "-" for stderr or None to disable
+        """
+
+        self.output_path = output_path
+        self.run_id = uuid.uuid4().hex
+        self.lines = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether records are being written"""
+
+        return bool(self.output_path)
+
+    @contextmanager
+    def stage(self, name: str, **fields) -> Iterator[dict]:
+        """
+        Measure a stage and emit its record when it ends
+
+        The record is yielded so row counts known only at the end of the
+        stage (e.g. "rows_out") can be added to it
+
+        Arguments:
+            name (str):
+                name of the stage
+            **fields:
+                extra fields of the record (e.g. input_file, rows_in)
+
+        Yields:
+            record of the stage
+        """
+
+        record = {"stage": name, **fields}
+        if not self.enabled:
+            yield record
+            return
+
+        rss_before = get_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as error:
+            record["error"] = type(error).__name__
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            record["rss_mb"] = get_rss_mb()
+            record["rss_delta_mb"] = (
+                round(record["rss_mb"] - rss_before, 1)
+                if record["rss_mb"] is not None and rss_before is not None
+                else None)
+            self.emit(record)
+
+    def emit(self, record: dict) -> None:
+        """
+        Write a record as a JSON line (or keep it if lines are kept)
+
+        Each line is written with a single append so records from worker
+        threads don't interleave
+
+        Arguments:
+            record (dict):
+                record to write
+        """
+
+        line = {"run_id": self.run_id, "pid": os.getpid(),
+                "timestamp": round(time.time(), 3), **record}
+        if self.lines is not None:
+            self.lines.append(line)
+        else:
+            self.write(line)
+
+    def write(self, line: dict) -> None:
+        """
+        Append a line to the output
+
+        Arguments:
+            line (dict):
+                record with the run, process and time it was emitted at
+        """
+
+        line = json.dumps(line, default=str) + "\n"
+        if self.output_path == "-":
+            sys.stderr.write(line)
+            sys.stderr.flush()
+        else:
+            with open(self.output_path, "a") as output_file:
+                output_file.write(line)
+
+    def buffered(self) -> "Instrumentation":
+        """
+        Get instrumentation of the same run that keeps its lines
+
+        Returns:
+            instrumentation writing to the same output with the same run id,
+            whose lines are kept until they're merged
+        """
+
+        instrumentation = Instrumentation(self.output_path)
+        instrumentation.run_id = self.run_id
+        instrumentation.lines = []
+        return instrumentation
+
+    def merge(self, lines: list[dict]) -> None:
+        """
+        Write the lines kept by buffered instrumentation
+
+        Arguments:
+            lines (list[dict]):
+                lines kept by the buffered instrumentation
+        """
+
+        for line in lines:
+            if self.lines is not None:
+                self.lines.append(line)
+            else:
+                self.write(line)
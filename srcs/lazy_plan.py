@@ -0,0 +1,376 @@
+import os
+import pandas as pd
+from datetime import datetime
+from .exceptions import InputConfigError
+from .input_handler import InputHandler
+from .output_handler import OutputHandler
+from .instrumentation import Instrumentation
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+
+class LazyPlan():
+    """
+    Compile the configs into a lazy polars query of the whole pipeline
+
+    The input files are scanned, projected, parsed, combined and joined as
+    one query, filtered to the ranges of the sheets and projected to the
+    columns they use. Polars pushes both into the scans, so columns no sheet
+    uses and rows outside every range are never parsed or joined.
+    The result is formatted into sheets by the output handler as usual.
+
+    Methods:
+        scan_input_file(input_file: dict) -> pl.LazyFrame:
+            scan an input file and select its columns based on config
+        join_input_data(all_data: pl.LazyFrame,
+                        join_data: list[tuple]) -> pl.LazyFrame:
+            join scans of input files with join_on to the combined scan
+        get_used_columns() -> set[str]:
+            get the columns of the data used by the sheets
+        get_row_filter(schema: dict) -> pl.Expr | None:
+            get the filter of rows within the range of any sheet
+        build() -> pl.LazyFrame:
+            compile the configs into a lazy query
+        find_data_error() -> None:
+            find which input file made the query fail
+        collect() -> pd.DataFrame:
+            run the query and get the data used by the sheets
+
+    Attributes:
+        input_handler (InputHandler):
+            input handler with its config read
+        output_handler (OutputHandler):
+            output handler with its config read
+        instrumentation (Instrumentation):
+            records duration, row counts and memory of each stage
+        dtypes (dict):
+            dtypes of the columns to apply once the data is collected
+        infer_rows (int | None):
+            number of rows to infer the types of columns from, or None to
+            infer them from whole files
+    """
+
+    def __init__(self, input_handler: InputHandler,
+                 output_handler: OutputHandler,
+                 instrumentation: Instrumentation | None = None) -> None:
+        """
+        Save the handlers whose configs are compiled
+
+        Arguments:
+            input_handler (InputHandler):
+                input handler with its config read
+            output_handler (OutputHandler):
+                output handler with its config read
+            instrumentation (Instrumentation | None):
+                records duration, row counts and memory of each stage
+
+        Raises:
+            InputConfigError:
+                "MissingDependency": polars isn't installed
+        """
+
+        if pl is None:
+            raise InputConfigError("MissingDependency",
+                                   input_handler.config_filename, "polars")
+
+        self.input_handler = input_handler
+        self.output_handler = output_handler
+        self.instrumentation = instrumentation or Instrumentation()
+        self.dtypes = {}
+        self.infer_rows = 10000
+
+    def scan_input_file(self, input_file: dict) -> "pl.LazyFrame":
+        """
+        Scan an input file and select its columns based on config
+
+        Date columns are read as text and parsed with their format, other
+        columns keep the types inferred from the first infer_rows rows
+
+        Arguments:
+            input_file (dict):
+                config object of the input file
+
+        Returns:
+            lazy scan of the file with the columns renamed and parsed
+
+        Raises:
+            InputConfigError:
+                "InputFileNotFound": the input file cannot be found
+                "ColumnNotFound": the specified columns cannot be found
+        """
+
+        # get file path and make sure it exists
+        input_path = "input_files/" + input_file["filename"]
+        if not os.path.isfile(input_path):
+            raise InputConfigError("InputFileNotFound",
+                                   input_file["filename"])
+
+        # make sure specified columns exist using only the header
+        date_columns = {column["from"]: pl.String
+                        for column in input_file["columns"]
+                        if "from" in column and "format" in column}
+        scan = pl.scan_csv(input_path, schema_overrides=date_columns,
+                           infer_schema_length=self.infer_rows)
+        header = scan.collect_schema().names()
+        columns_not_found = [col["from"] for col in input_file["columns"]
+                             if "from" in col and col["from"] not in header]
+        if len(columns_not_found):
+            raise InputConfigError("ColumnNotFound",
+                                   input_file["filename"],
+                                   str(columns_not_found))
+
+        # order the columns as specified, rename and parse them
+        columns = []
+        for column in input_file["columns"]:
+            if "from" in column:
+                expression = pl.col(column["from"])
+                if "format" in column:
+                    expression = expression.str.strptime(pl.Datetime("ns"),
+                                                         column["format"])
+            else:
+                # store text values once as a single category
+                expression = pl.lit(column["value"],
+                                    pl.Categorical
+                                    if isinstance(column["value"], str)
+                                    else None)
+            columns.append(expression.alias(column["name"]))
+
+            # dtypes are applied by pandas once the data is collected
+            if "dtype" in column and "format" not in column:
+                self.dtypes[column["name"]] = column["dtype"]
+
+        return scan.select(columns)
+
+    def join_input_data(self, all_data: "pl.LazyFrame",
+                        join_data: list[tuple]) -> "pl.LazyFrame":
+        """
+        Join scans of input files with join_on to the combined scan
+
+        Like InputHandler.join_input_data, each file is left joined on its
+        join_on column and columns that exist on both sides are suffixed
+
+        Arguments:
+            all_data (pl.LazyFrame):
+                lazy scan of the combined data from the other input files
+            join_data (list[tuple]):
+                lazy scan, join_on column and filename of each file to join
+
+        Returns:
+            lazy scan of the joined data
+
+        Raises:
+            InputConfigError:
+                "InvalidJoinColumn": the join_on column
+                                     doesn't match any other columns
+        """
+
+        for join_scan, join_on, filename in join_data:
+            schema = all_data.collect_schema()
+            if join_on not in schema:
+                raise InputConfigError("InvalidJoinColumn", filename, join_on)
+
+            # suffix columns that exist on both sides like merge
+            join_columns = join_scan.collect_schema().names()
+            overlap = [column for column in join_columns
+                       if column != join_on and column in schema]
+            all_data = all_data.rename({column: column + "_x"
+                                        for column in overlap})
+            join_scan = join_scan.select(
+                pl.col(join_on).cast(schema[join_on], strict=False),
+                *[pl.col(column).alias(column + "_y"
+                                       if column in overlap else column)
+                  for column in join_columns if column != join_on])
+
+            # duplicate keys would multiply rows, so they fail the query
+            all_data = all_data.join(join_scan, on=join_on, how="left",
+                                     validate="m:1", coalesce=True,
+                                     maintain_order="left")
+        return all_data
+
+    def get_used_columns(self) -> set[str]:
+        """
+        Get the columns of the data used by the sheets
+
+        Returns:
+            columns used in "from" or as the range of any sheet
+        """
+
+        columns = set()
+        for output_file in self.output_handler.config:
+            for sheet in output_file["sheets"]:
+                columns.update(self.output_handler.get_sheet_columns(sheet))
+                columns.add(sheet["range"]["column"])
+        return columns
+
+    def get_row_filter(self, schema: dict) -> "pl.Expr | None":
+        """
+        Get the filter of rows within the range of any sheet
+
+        Arguments:
+            schema (dict):
+                columns and types of the combined data
+
+        Returns:
+            filter expression or None if every row has to be kept (a range
+            column isn't a date column, which the output handler reports)
+        """
+
+        ranges = {}
+        for output_file in self.output_handler.config:
+            for sheet in output_file["sheets"]:
+                range_config = sheet["range"]
+                if not (range_config["column"] in schema
+                        and schema[range_config["column"]] == pl.Datetime):
+                    return None
+                ranges[(range_config["column"],
+                        tuple(range_config["begin"]),
+                        tuple(range_config["end"]))] = range_config
+
+        # keep rows from the beginning of the first day to the end date
+        return pl.any_horizontal(
+            pl.col(column).is_between(datetime(*begin[:3]),
+                                      datetime(*end[:3]))
+            for column, begin, end in ranges)
+
+    def build(self) -> "pl.LazyFrame":
+        """
+        Compile the configs into a lazy query
+
+        Returns:
+            lazy query of the data used by the sheets
+
+        Raises:
+            InputConfigError:
+                "InputFileNotFound": the input file cannot be found
+                "ColumnNotFound": the specified columns cannot be found
+                "JoinColumnNotFound": the join_on column cannot be found
+                "InvalidJoinColumn": the join_on column
+                                     doesn't match any other columns
+        """
+
+        # scan each input file
+        scans = []
+        join_data = []
+        for input_file in self.input_handler.config:
+            scan = self.scan_input_file(input_file)
+            if "join_on" in input_file:
+                # make sure the column exists
+                if input_file["join_on"] not in scan.collect_schema():
+                    raise InputConfigError("JoinColumnNotFound",
+                                           input_file["filename"],
+                                           input_file["join_on"])
+                join_data.append((scan, input_file["join_on"],
+                                  input_file["filename"]))
+            else:
+                scans.append(scan)
+
+        # combine the scans, adding missing columns like pd.concat
+        all_data = self.join_input_data(
+                        pl.concat(scans, how="diagonal_relaxed"), join_data)
+
+        # keep only the rows and columns used by the sheets
+        schema = all_data.collect_schema()
+        row_filter = self.get_row_filter(schema)
+        if row_filter is not None:
+            all_data = all_data.filter(row_filter)
+        used_columns = self.get_used_columns()
+        return all_data.select(column for column in schema.names()
+                               if column in used_columns)
+
+    def find_data_error(self) -> None:
+        """
+        Find which input file made the query fail
+
+        Only the date columns and join_on columns are scanned again, to
+        raise the same errors as reading the files with pandas
+
+        Raises:
+            InputConfigError:
+                "InvalidFormat": a column contains data that
+                                 doesn't match the specified format
+                "DuplicateJoinKey": the join_on column has duplicate values
+        """
+
+        for input_file in self.input_handler.config:
+            input_path = "input_files/" + input_file["filename"]
+            for column in input_file["columns"]:
+                if not ("from" in column and "format" in column):
+                    continue
+
+                # let pandas describe the first value that can't be parsed
+                values = (pl.scan_csv(input_path,
+                                      schema_overrides={column["from"]:
+                                                        pl.String})
+                          .select(pl.col(column["from"]))
+                          .filter(pl.col(column["from"]).is_not_null()
+                                  & pl.col(column["from"]).str.strptime(
+                                        pl.Datetime("ns"), column["format"],
+                                        strict=False).is_null())
+                          .head(1).collect().to_series().to_list())
+                try:
+                    pd.to_datetime(pd.Series(values), format=column["format"])
+                except ValueError as error:
+                    raise InputConfigError("InvalidFormat",
+                                           input_file["filename"],
+                                           column["from"], str(error))
+
+        for input_file in self.input_handler.config:
+            if "join_on" not in input_file:
+                continue
+            join_on = input_file["join_on"]
+            duplicates = (self.scan_input_file(input_file)
+                          .select(pl.col(join_on))
+                          .filter(pl.col(join_on).is_duplicated())
+                          .unique(maintain_order=True)
+                          .head(5).collect().to_series().to_list())
+            if duplicates:
+                raise InputConfigError("DuplicateJoinKey",
+                                       input_file["filename"], join_on,
+                                       str(duplicates))
+
+    def collect(self) -> pd.DataFrame:
+        """
+        Run the query and get the data used by the sheets
+
+        Returns:
+            dataframe with the rows within the range of any sheet and the
+            columns used by any sheet
+
+        Raises:
+            InputConfigError:
+                "InputFileNotFound": the input file cannot be found
+                "ColumnNotFound": the specified columns cannot be found
+                "InvalidFormat": a column contains data that
+                                 doesn't match the specified format
+                "JoinColumnNotFound": the join_on column cannot be found
+                "InvalidJoinColumn": the join_on column
+                                     doesn't match any other columns
+                "DuplicateJoinKey": the join_on column has duplicate values
+        """
+
+        with self.instrumentation.stage("plan"):
+            query = self.build()
+
+        with self.instrumentation.stage("collect") as record:
+            try:
+                data = query.collect()
+            except pl.exceptions.PolarsError:
+                self.find_data_error()
+
+                # a column may not have the type inferred from its first
+                # rows, so infer types from whole files before giving up
+                if self.infer_rows is None:
+                    raise
+                self.infer_rows = None
+                data = self.build().collect()
+
+            # convert to pandas for the output handler
+            data = data.to_pandas()
+            data = data.astype({name: dtype
+                                for name, dtype in self.dtypes.items()
+                                if name in data})
+            record["rows_out"] = len(data)
+        return data
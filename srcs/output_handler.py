@@ -1,9 +1,21 @@
 import os
 import json
-import pandas as pd
+import shutil
+import hashlib
+import tempfile
+import multiprocessing
 import numpy as np
-from datetime import datetime as dt
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pandas.api.types import union_categoricals
 from .exceptions import OutputConfigError
+from .config_reader import (read_output_config, get_pivot_columns,
+                            PARTITIONS)
+from .sheet_planner import SheetPlanner
+from .sheet_writers import (create_sheet_writer, get_header,
+                            MAX_SHEET_ROWS, MAX_SHEET_NAME)
+from .build_cache import BuildCache
+from .instrumentation import Instrumentation
 
 
 class OutputHandler():
@@ -12,37 +24,81 @@ class OutputHandler():
 
     Methods:
         read_config_file() -> None:
-            read and parse the config file
+            read and parse the config files
         generate_output_files(data_df: pd.DataFrame) -> None:
             format data based on config and generate output files
 
     Attributes:
         config (array of objects):
             config objects of the output files
-        config_filename (str):
-            name of the config file
+        config_filename (str | list[str]):
+            name of the config file, or names of config files whose output
+            files are generated from the same data
         current_output_file (object):
             config object of the output file that's being generated
         current_sheet (object):
             config object of the sheet that's being generated
         current_column (object):
             config object of the column that's being formatted
+        planner (SheetPlanner):
+            planner indexing the data by the date columns of the sheets
+        current_rows (np.ndarray):
+            positions of the rows of the sheet that's being generated
+        writer (str):
+            writer used for output files that don't specify one
+        cache (BuildCache | None):
+            cache to skip output files that are up to date with
+        instrumentation (Instrumentation):
+            records duration, row counts and memory of each stage
+        jobs (int):
+            number of worker processes to generate output files with
+        max_sheet_rows (int):
+            number of rows of an xlsx sheet above which it's split into parts
+        part_writers (dict):
+            writers of the continuation files of the output file that's
+            being generated, by part
+        store (SpillStore | None):
+            spilled data to generate sheets from a partition at a time,
+            instead of the data passed to generate_output_files
     """
 
-    def __init__(self, config_filename: str) -> None:
+    def __init__(self, config_filename: str | list[str],
+                 writer: str = "openpyxl",
+                 cache: BuildCache | None = None,
+                 instrumentation: Instrumentation | None = None,
+                 jobs: int = 1) -> None:
         """
-        Save the config filename
+        Save the config filename, default writer, cache, instrumentation
+        and number of workers
 
         Arguments:
-            config_filename (str):
-                name of the config file
+            config_filename (str | list[str]):
+                name of the config file or names of config files
+            writer (str):
+                writer used for output files that don't specify one
+            cache (BuildCache | None):
+                cache to skip output files that are up to date with
+            instrumentation (Instrumentation | None):
+                records duration, row counts and memory of each stage
+            jobs (int):
+                number of worker processes to generate output files with
         """
 
         self.config_filename = config_filename
+        self.writer = writer
+        self.jobs = jobs
+        self.cache = cache
+        self.instrumentation = instrumentation or Instrumentation()
+        self.planner = None
+        self.current_rows = None
+        self.max_sheet_rows = MAX_SHEET_ROWS
+        self.part_writers = {}
+        self.store = None
 
     def read_config_file(self) -> None:
         """
-        Read and parse the config file
+        Read and parse the config file (or files, whose output files
+        are combined in order)
 
         Raises:
             OutputConfigError:
@@ -53,113 +109,177 @@ class OutputHandler():
                 "MissingColumnInfo": the column section is empty
                 "InvalidColumnInfo": the column section contains invalid values
                 "MissingKey": the required keys are missing
+                "InvalidKey": an optional key has an invalid value
         """
 
-        # make sure config file exists
-        if not os.path.isfile("configs/" + self.config_filename):
-            raise OutputConfigError("ConfigFileNotFound", self.config_filename)
+        filenames = (self.config_filename
+                     if isinstance(self.config_filename, list)
+                     else [self.config_filename])
+        self.config = [output_file for filename in filenames
+                       for output_file in read_output_config(filename)]
 
-        # read and parse config
-        with open("configs/" + self.config_filename) as config_file:
-            try:
-                self.config = json.load(config_file)
-            except ValueError as error:
-                raise OutputConfigError("InvalidSyntax",
-                                        self.config_filename, str(error))
-
-        # handle single output file in config
-        if type(self.config) is dict:
-            self.config = [self.config]
-
-        # make sure config isn't empty
-        if not self.config:
-            raise OutputConfigError("MissingOutputFileInfo",
-                                    self.config_filename)
-
-        # make sure output files are valid
-        missing_keys = []
-        for output_file in self.config:
-            # make sure required keys exist in output file
-            missing_keys.extend([key for key in ["filename", "sheets"]
-                                 if key not in output_file])
-            if "sheets" in output_file:
-                # handle single sheet in output file
-                sheets = ([output_file["sheets"]]
-                          if type(output_file["sheets"]) is dict
-                          else output_file["sheets"])
-
-                # make sure sheets aren't empty
-                if not sheets:
-                    raise OutputConfigError("MissingSheetInfo",
-                                            self.config_filename)
-
-                # make sure sheets are valid
-                for sheet in sheets:
-                    # make sure required keys exist in sheet
-                    missing_keys.extend([key for key in
-                                         ["name", "title", "type",
-                                          "range", "columns"]
-                                         if key not in sheet])
-                    if "range" in sheet:
-                        # make sure range info isn't empty
-                        if not (type(sheet["range"]) is dict
-                                and sheet["range"]):
-                            raise OutputConfigError("MissingRangeInfo",
-                                                    self.config_filename)
-
-                        # make sure range info is valid
-                        try:
-                            assert "column" in sheet["range"]
-                            begin = sheet["range"]["begin"]
-                            end = sheet["range"]["end"]
-                            begin_dt = dt(begin[0], begin[1], begin[2])
-                            end_dt = dt(end[0], end[1], end[2])
-                            assert begin_dt <= end_dt
-                        except Exception:
-                            raise OutputConfigError("InvalidRangeInfo",
-                                                    self.config_filename)
-                    if "columns" in sheet:
-                        # make sure columns aren't empty
-                        if not (type(sheet["columns"]) is list
-                                and sheet["columns"]):
-                            raise OutputConfigError("MissingColumnInfo",
-                                                    self.config_filename)
-
-                        # make sure required keys exist in columns
-                        for column in sheet["columns"]:
-                            if type(column) is dict:
-                                if "name" not in column:
-                                    missing_keys.append("name")
-                                elif ("from" not in column
-                                      and "value" not in column):
-                                    missing_keys.append("from / value")
-                            else:
-                                raise OutputConfigError("InvalidColumnInfo",
-                                                        self.config_filename)
-
-        # raise exception if there are keys missing
-        if missing_keys:
-            raise OutputConfigError("MissingKey",
-                                    self.config_filename, str(missing_keys))
-
-    def generate_output_path(self, filename: str) -> str:
+    def get_pivot_spec(self, sheet: dict) -> tuple[dict, list, list]:
+        """
+        Get what the planner groups and aggregates for a pivot
+
+        Arguments:
+            sheet (dict):
+                config object of the pivot
+
+        Returns:
+            range config, group keys (column and date format) and values
+            (column and aggregation) of the pivot
+        """
+
+        keys, values = get_pivot_columns(sheet["columns"])
+        return (sheet["range"],
+                [(col["from"], col["format"] if "format" in col else None)
+                 for col in keys],
+                [(col["from"],
+                  col["aggregate"] if "aggregate" in col else "sum")
+                 for col in values])
+
+    def generate_output_path(self, filename: str,
+                             output_format: str = "xlsx") -> str:
         """
         Generate full path of the output file based on arguments
 
         Arguments:
             filename (str):
                 name of the output file
+            output_format (str):
+                xlsx|csv|parquet|feather
 
         Returns:
-            full path of the output file
+            full path of the output file (or folder of the files of each
+            sheet if it isn't xlsx)
         """
 
+        if output_format != "xlsx":
+            return f'output_files/{filename}'
         return f'output_files/{filename}.xlsx'
 
+    def get_output_format(self, output_file: dict) -> str:
+        """
+        Get the format of an output file
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+
+        Returns:
+            xlsx|csv|parquet|feather
+        """
+
+        return output_file["format"] if "format" in output_file else "xlsx"
+
+    def get_output_file_path(self, output_file: dict) -> str:
+        """
+        Get full path of an output file in its format
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+
+        Returns:
+            full path of the output file (or folder)
+        """
+
+        return self.generate_output_path(output_file["filename"],
+                                         self.get_output_format(output_file))
+
+    def get_sheet_columns(self, sheet: dict) -> list[str]:
+        """
+        Get the columns of the data a sheet takes from
+
+        Arguments:
+            sheet (dict):
+                config object of the sheet
+
+        Returns:
+            distinct columns used in "from" in order
+        """
+
+        return list(dict.fromkeys(column["from"]
+                                  for column in sheet["columns"]
+                                  if "from" in column))
+
+    def get_column_uses(self, sheet: dict,
+                        data_df: pd.DataFrame) -> list[tuple]:
+        """
+        Get the columns a sheet filters and formats for the planner
+
+        Arguments:
+            sheet (dict):
+                config object of the sheet
+            data_df (pd.DataFrame):
+                dataframe containing data to generate output from
+
+        Returns:
+            range config, column and date format (or None) of each use
+        """
+
+        # every column is filtered once per sheet
+        uses = [(sheet["range"], column, None)
+                for column in self.get_sheet_columns(sheet)]
+
+        # and date columns are formatted once per column of the sheet
+        uses.extend((sheet["range"], column["from"], column["format"])
+                    for column in sheet["columns"]
+                    if "from" in column and "format" in column
+                    and column["from"] in data_df
+                    and pd.api.types.is_datetime64_dtype(
+                                            data_df[column["from"]]))
+        return uses
+
+    def get_output_values(self, sheet_df: pd.DataFrame) -> list[tuple]:
+        """
+        Get the custom values of the current sheet and where they go
+
+        Custom values aren't part of formatted sheets, the writer adds them
+        to each chunk of rows it writes instead of repeating them per row
+
+        Arguments:
+            sheet_df (pd.DataFrame):
+                formatted dataframe of the current sheet
+
+        Returns:
+            position, name and value of each column with a custom value
+        """
+
+        values = [(position, column["name"], column["value"])
+                  for position, column
+                  in enumerate(self.current_sheet["columns"])
+                  if "from" not in column and "value" in column]
+
+        # spread pivots have their own columns, so add values after them
+        if "spread" in self.current_sheet:
+            values = [(len(sheet_df.columns) + index, name, value)
+                      for index, (_, name, value) in enumerate(values)]
+
+        return values
+
+    def plan_dataframe(self, dataframe: pd.DataFrame) -> None:
+        """
+        Create a planner for the data unless it's already planned
+
+        Arguments:
+            dataframe (pd.DataFrame):
+                dataframe containing data to generate sheets from
+        """
+
+        if self.planner is None or self.planner.data_df is not dataframe:
+            self.planner = SheetPlanner(dataframe)
+
     def filter_dataframe(self, dataframe: pd.DataFrame) -> pd.DataFrame:
         """
         Filter dataframe to a date range based on config
 
+        Each date column is sorted once by the planner and every sheet's
+        range is then sliced from it, instead of scanning all rows per sheet.
+        Only the columns used by the sheet are kept, and columns already
+        filtered to the same range for another sheet are reused.
+
         Arguments:
             dataframe (pd.DataFrame):
                 dataframe containing data to filter
@@ -168,26 +288,25 @@ class OutputHandler():
             dataframe filtered to a date range
         """
 
-        # get config object of range
-        range_config = self.current_sheet["range"]
-
-        # convert range to timestamps
-        range_begin = range_config["begin"]
-        range_end = range_config["end"]
-        begin_ts = pd.Timestamp(range_begin[0], range_begin[1], range_begin[2])
-        end_ts = pd.Timestamp(range_end[0], range_end[1], range_end[2])
+        self.plan_dataframe(dataframe)
 
-        # filter and return dataframe
-        return dataframe[(dataframe[range_config["column"]] >= begin_ts)
-                         & (dataframe[range_config["column"]] <= end_ts)]
+        # save positions of the rows to format columns with
+        self.current_rows = self.planner.get_range_rows(
+                                            self.current_sheet["range"])
+        return self.planner.filter_dataframe(
+                    self.current_sheet["range"],
+                    self.get_sheet_columns(self.current_sheet))
 
-    def format_output_column(self, column_series: pd.Series):
+    def format_output_column(self, column_series: pd.Series,
+                             rows: np.ndarray | None = None) -> pd.Series:
         """
         Format series for a single column in a sheet based on config
 
         Arguments:
             column_series (pd.Series):
                 series containing column to format
+            rows (np.ndarray | None):
+                positions of the rows in the planned data, if known
 
         Returns:
             formatted series for a single column
@@ -195,51 +314,694 @@ class OutputHandler():
 
         # handle formatting based on the dtype
         if "format" in self.current_column:
-            if np.issubdtype(column_series.dtype, np.datetime64):
-                # convert date columns based on format
+            if pd.api.types.is_datetime64_dtype(column_series):
+                # convert date columns based on format, formatting each
+                # distinct date once and reusing the result across sheets
+                # if the rows are known
+                if rows is not None:
+                    return self.planner.get_column(
+                                self.current_sheet["range"],
+                                self.current_column["from"],
+                                self.current_column["format"])
                 return column_series.dt.strftime(
                                         self.current_column["format"])
 
         return column_series
 
-    def format_output_sheet(self, data_df: pd.DataFrame) -> pd.DataFrame:
+    def format_output_sheet(self, data_df: pd.DataFrame,
+                            rows: np.ndarray | None = None) -> pd.DataFrame:
         """
         Format data into a dataframe for a single sheet based on config
 
         Arguments:
             data_df (pd.DataFrame):
                 dataframe containing data to format
+            rows (np.ndarray | None):
+                positions of the rows in the planned data, if known
 
         Returns:
-            formatted dataframe for a single sheet
+            formatted dataframe for a single sheet, without the columns
+            with custom values (see get_output_values)
         """
 
         # format and save each column of the current sheet
-        sheet_df = pd.DataFrame()
+        sheet_columns = {}
         for column in self.current_sheet["columns"]:
             # save config object
             self.current_column = column
 
-            # either take from a column or use a custom value
+            # take from a column, custom values are added by the writer
             if "from" in column:
-                sheet_df[column["name"]] = self.format_output_column(
-                                                data_df[column["from"]])
-            elif "value" in column:
-                sheet_df[column["name"]] = column["value"]
+                sheet_columns[column["name"]] = self.format_output_column(
+                                                data_df[column["from"]], rows)
+
+        # share the formatted columns instead of copying them
+        return pd.DataFrame(sheet_columns, index=data_df.index, copy=False)
+
+    def format_output_pivot(self, aggregated: pd.DataFrame | None = None
+                            ) -> pd.DataFrame:
+        """
+        Aggregate data into a pivot for a single sheet based on config
+
+        Rows are grouped by the columns of type column (dates bucketed by
+        their format) and columns of type value are aggregated per group.
+        If the sheet has a "spread" column, its labels become columns.
+
+        Arguments:
+            aggregated (pd.DataFrame | None):
+                aggregated data (see SheetPlanner.aggregate), aggregated by
+                the planner if None
+
+        Returns:
+            formatted dataframe for a single pivot, without the columns
+            with custom values (see get_output_values)
+        """
+
+        keys, values = get_pivot_columns(self.current_sheet["columns"])
+        if aggregated is None:
+            aggregated = self.planner.aggregate(
+                                *self.get_pivot_spec(self.current_sheet))
+
+        # name group keys and aggregated values after their columns
+        sheet_df = pd.DataFrame({col["name"]:
+                                 aggregated.index.get_level_values(index)
+                                 for index, col in enumerate(keys)})
+        for col in values:
+            aggregation = col["aggregate"] if "aggregate" in col else "sum"
+            sheet_df[col["name"]] = aggregated[(col["from"], aggregation)
+                                               ].to_numpy()
+
+        if "spread" in self.current_sheet:
+            # turn the labels of the spread column into columns
+            spread = self.current_sheet["spread"]
+            index = [col["name"] for col in keys if col["name"] != spread]
+            value_names = [col["name"] for col in values]
+            if index:
+                sheet_df = (sheet_df.set_index(index + [spread])[value_names]
+                            .unstack(spread).reset_index())
+            else:
+                sheet_df = (sheet_df.set_index(spread)[value_names]
+                            .unstack().to_frame().T)
+
+            # name spread columns by label, prefixed by value if several
+            sheet_df.columns = [
+                (name if label == "" else
+                 label if len(value_names) == 1 else f"{name} {label}")
+                for name, label in sheet_df.columns]
+        else:
+            sheet_df = sheet_df[[col["name"]
+                                 for col in self.current_sheet["columns"]
+                                 if col["name"] in sheet_df]]
 
         return sheet_df
 
-    def generate_output_files(self, data_df: pd.DataFrame) -> None:
+    def write_output_sheet(self, sheet_writer,
+                           data_df: pd.DataFrame) -> None:
+        """
+        Filter, format and write data for a single sheet based on config
+
+        Arguments:
+            sheet_writer:
+                writer of the output file (see sheet_writers)
+            data_df (pd.DataFrame):
+                dataframe containing data to generate output from
+        """
+
+        # spilled data is generated from a partition at a time instead
+        if self.store is not None:
+            self.write_spilled_sheet(sheet_writer)
+            return
+
+        stage_fields = {"output_file": self.current_output_file["filename"],
+                        "sheet": self.current_sheet["name"]}
+
+        if self.current_sheet["type"] == "pivot":
+            # aggregate data within the range of the sheet
+            with self.instrumentation.stage("pivot", rows_in=len(data_df),
+                                            **stage_fields) as record:
+                self.plan_dataframe(data_df)
+                sheet_df = self.format_output_pivot()
+                record["rows_out"] = len(sheet_df)
+
+            # write to output file
+            with self.instrumentation.stage("write", rows_in=len(sheet_df),
+                                            **stage_fields) as record:
+                record["parts"] = self.write_sheet_parts(sheet_writer,
+                                                         sheet_df)
+            return
+
+        # filter data to the range of the sheet
+        with self.instrumentation.stage("filter", rows_in=len(data_df),
+                                        **stage_fields) as record:
+            filtered_df = self.filter_dataframe(data_df)
+            record["rows_out"] = len(filtered_df)
+
+        # get formatted dataframe
+        with self.instrumentation.stage("format", rows_in=len(filtered_df),
+                                        **stage_fields) as record:
+            sheet_df = self.format_output_sheet(filtered_df,
+                                                self.current_rows)
+            record["rows_out"] = len(sheet_df)
+
+        # write to output file
+        with self.instrumentation.stage("write", rows_in=len(sheet_df),
+                                        **stage_fields) as record:
+            if "partition" in self.current_output_file:
+                record["partitions"] = self.write_partitions(sheet_writer,
+                                                             sheet_df)
+            else:
+                record["parts"] = self.write_sheet_parts(sheet_writer,
+                                                         sheet_df)
+
+    def get_part_name(self, name: str, part: int) -> str:
+        """
+        Get the name of a part of a sheet or output file
+
+        Arguments:
+            name (str):
+                name of the sheet or output file
+            part (int):
+                position of the part (the first part keeps the name)
+
+        Returns:
+            name numbered after the part (e.g. "sheet (2)"), with sheet
+            names shortened to fit in an xlsx sheet name
+        """
+
+        if part == 0:
+            return name
+        suffix = f" ({part + 1})"
+        return name[:MAX_SHEET_NAME - len(suffix)] + suffix
+
+    def get_part_writer(self, part: int):
+        """
+        Get the writer of a continuation file of the current output file
+
+        Continuation files are opened the first time a sheet has a part
+        for them, with the writer of the output file
+
+        Arguments:
+            part (int):
+                position of the part
+
+        Returns:
+            writer of the continuation file (see sheet_writers)
+        """
+
+        if part not in self.part_writers:
+            output_file = self.current_output_file
+            self.part_writers[part] = create_sheet_writer(
+                self.get_output_writer(output_file),
+                self.generate_output_path(
+                    self.get_part_name(output_file["filename"], part)))
+        return self.part_writers[part]
+
+    def write_sheet_parts(self, sheet_writer, sheet_df: pd.DataFrame) -> int:
+        """
+        Write a formatted sheet, split into parts if it's too large for xlsx
+
+        The row count of the formatted sheet decides the number of parts.
+        Each part is a slice of the sheet written like a whole sheet, so
+        streaming writers only hold a chunk of rows at a time. Parts go to
+        numbered continuation sheets, or to the same sheet of numbered
+        continuation files if the output file splits into files.
+
+        Arguments:
+            sheet_writer:
+                writer of the output file (see sheet_writers)
+            sheet_df (pd.DataFrame):
+                formatted dataframe of the current sheet
+
+        Returns:
+            number of parts written
+        """
+
+        name = self.current_sheet["name"]
+        values = self.get_output_values(sheet_df)
+        if (self.get_output_format(self.current_output_file) != "xlsx"
+                or len(sheet_df) <= self.max_sheet_rows):
+            sheet_writer.write_sheet(name, sheet_df, values)
+            return 1
+
+        split = (self.current_output_file["split"]
+                 if "split" in self.current_output_file else "sheets")
+        parts = range(0, len(sheet_df), self.max_sheet_rows)
+        for part, begin in enumerate(parts):
+            part_df = sheet_df.iloc[begin:begin + self.max_sheet_rows]
+            if split == "files" and part:
+                self.get_part_writer(part).write_sheet(name, part_df, values)
+            else:
+                sheet_writer.write_sheet(self.get_part_name(name, part),
+                                         part_df, values)
+        return len(parts)
+
+    def write_partitions(self, sheet_writer, sheet_df: pd.DataFrame) -> int:
+        """
+        Write a formatted sheet to a file per partition of its range column
+
+        Rows are labeled by their date in the range column (e.g. "2023-01"
+        for months, each distinct date formatted once by the planner) and
+        the rows of each label are written in order of the labels
+
+        Arguments:
+            sheet_writer:
+                writer of the output file (see TableSheetWriter)
+            sheet_df (pd.DataFrame):
+                formatted dataframe of the current sheet
+
+        Returns:
+            number of partitions written
+        """
+
+        labels = self.planner.format_dates(
+                    self.current_sheet["range"]["column"],
+                    PARTITIONS[self.current_output_file["partition"]],
+                    self.current_rows)
+
+        # group positions of the rows by label with a single stable sort
+        order = np.argsort(labels.codes, kind="stable")
+        counts = np.bincount(labels.codes, minlength=len(labels.categories))
+        ends = np.cumsum(counts)
+
+        values = self.get_output_values(sheet_df)
+        for code, label in enumerate(labels.categories):
+            if counts[code]:
+                rows = order[ends[code] - counts[code]:ends[code]]
+                sheet_writer.write_sheet(self.current_sheet["name"],
+                                         sheet_df.iloc[rows], values,
+                                         partition=label)
+        return int(np.count_nonzero(counts))
+
+    def aggregate_spilled_pivot(self) -> pd.DataFrame:
+        """
+        Aggregate the partitions of spilled data for the current pivot
+
+        Each partition within the range is aggregated by a planner of its
+        own, then the partial results are combined: sums and counts are
+        summed, minimums and maximums are taken again, and means are
+        combined sums over combined counts. Labels of date keys keep the
+        order of their first dates across partitions.
+
+        Returns:
+            aggregated data like SheetPlanner.aggregate
+        """
+
+        range_config, keys, values = self.get_pivot_spec(self.current_sheet)
+        columns = list(dict.fromkeys([range_config["column"]]
+                                     + [column for column, _ in keys]
+                                     + [column for column, _ in values]))
+
+        # means are combined from partial sums and counts
+        partial_values = sorted({(column, aggregation)
+                                 for column, aggregation in values
+                                 if aggregation != "mean"}
+                                | {(column, aggregation)
+                                   for column, mean in values
+                                   if mean == "mean"
+                                   for aggregation in ["sum", "count"]})
+
+        partials = []
+        for label, data_df in self.store.iter_partitions(range_config,
+                                                         columns):
+            partials.append(SheetPlanner(data_df).aggregate(
+                                range_config, keys, partial_values))
+
+        # give categorical keys the same categories in every partial result
+        key_columns = [f"key_{index}" for index in range(len(keys))]
+        partials = [partial.reset_index() for partial in partials]
+        for key_column in key_columns:
+            series = [partial[key_column] for partial in partials]
+            if all(isinstance(col.dtype, pd.CategoricalDtype)
+                   for col in series):
+                categories = union_categoricals(series).categories
+                for partial in partials:
+                    partial[key_column] = (partial[key_column].cat
+                                           .set_categories(categories))
+
+        # combine the partial results of each group
+        aggregated = pd.concat(partials, ignore_index=True).groupby(
+                        key_columns, observed=True, sort=True).agg(
+                            {(column, aggregation):
+                             "sum" if aggregation == "count" else aggregation
+                             for column, aggregation in partial_values})
+        aggregated.columns = pd.MultiIndex.from_tuples(aggregated.columns)
+        for column, aggregation in values:
+            if aggregation == "mean":
+                aggregated[(column, "mean")] = (aggregated[(column, "sum")]
+                                                / aggregated[(column,
+                                                              "count")])
+        return aggregated
+
+    def write_rows_in_parts(self, sheet_df: pd.DataFrame,
+                            sheet_writer, state: dict) -> None:
+        """
+        Append formatted rows to the current sheet of spilled data
+
+        Like write_sheet_parts, a new part is started once the current one
+        is full, but rows arrive a partition at a time so the part being
+        written is kept in state between calls
+
+        Arguments:
+            sheet_df (pd.DataFrame):
+                formatted rows of a partition
+            sheet_writer:
+                writer of the output file (see sheet_writers)
+            state (dict):
+                position, row count and writer of the part being written
+                (the writer is None before the first rows)
+        """
+
+        name = self.current_sheet["name"]
+        values = self.get_output_values(sheet_df)
+        max_rows = (self.max_sheet_rows
+                    if self.get_output_format(self.current_output_file)
+                    == "xlsx" else None)
+        split_files = ("split" in self.current_output_file
+                       and self.current_output_file["split"] == "files")
+
+        begin = 0
+        while state["writer"] is None or begin < len(sheet_df):
+            # start the first part, or the next one once it's full
+            if state["writer"] is None or state["rows"] == max_rows:
+                if state["writer"] is not None:
+                    state["writer"].close_sheet()
+                    state["part"] += 1
+                if split_files and state["part"]:
+                    state["writer"] = self.get_part_writer(state["part"])
+                else:
+                    state["writer"] = sheet_writer
+                state["writer"].open_sheet(
+                    name if split_files
+                    else self.get_part_name(name, state["part"]),
+                    get_header(sheet_df, values))
+                state["rows"] = 0
+
+            count = len(sheet_df) - begin
+            if max_rows is not None:
+                count = min(count, max_rows - state["rows"])
+            state["writer"].write_rows(sheet_df.iloc[begin:begin + count],
+                                       values)
+            state["rows"] += count
+            begin += count
+
+    def write_spilled_sheet(self, sheet_writer) -> None:
+        """
+        Filter, format and write a sheet of spilled data
+
+        Only the partitions within the range of the sheet are read, with
+        the columns it uses, and rows are filtered, formatted and written a
+        block at a time. Rows are written in the order they were read, the
+        partitions being merged on their positions (see SpillStore.iter_rows),
+        except in files per partition, which are written a partition at a
+        time. Pivots are aggregated per partition and combined.
+
+        Arguments:
+            sheet_writer:
+                writer of the output file (see sheet_writers)
+        """
+
+        stage_fields = {"output_file": self.current_output_file["filename"],
+                        "sheet": self.current_sheet["name"]}
+        range_config = self.current_sheet["range"]
+
+        if self.current_sheet["type"] == "pivot":
+            with self.instrumentation.stage("pivot",
+                                            **stage_fields) as record:
+                sheet_df = self.format_output_pivot(
+                                            self.aggregate_spilled_pivot())
+                record["rows_out"] = len(sheet_df)
+            with self.instrumentation.stage("write", rows_in=len(sheet_df),
+                                            **stage_fields) as record:
+                record["parts"] = self.write_sheet_parts(sheet_writer,
+                                                         sheet_df)
+            return
+
+        columns = list(dict.fromkeys(
+                    [range_config["column"]]
+                    + self.get_sheet_columns(self.current_sheet)))
+        state = {"part": 0, "rows": 0, "writer": None}
+        if "partition" in self.current_output_file:
+            blocks = self.store.iter_partitions(range_config, columns)
+        else:
+            blocks = ((None, data_df) for data_df
+                      in self.store.iter_rows(range_config, columns))
+        for label, data_df in blocks:
+            if label is not None:
+                stage_fields["partition"] = label
+
+            # filter and format the partition with a planner of its own
+            with self.instrumentation.stage("filter", rows_in=len(data_df),
+                                            **stage_fields) as record:
+                self.planner = None
+                filtered_df = self.filter_dataframe(data_df)
+                record["rows_out"] = len(filtered_df)
+            with self.instrumentation.stage("format",
+                                            rows_in=len(filtered_df),
+                                            **stage_fields) as record:
+                sheet_df = self.format_output_sheet(filtered_df,
+                                                    self.current_rows)
+                record["rows_out"] = len(sheet_df)
+
+            # write to output file
+            with self.instrumentation.stage("write", rows_in=len(sheet_df),
+                                            **stage_fields) as record:
+                if "partition" in self.current_output_file:
+                    record["partitions"] = self.write_partitions(
+                                                sheet_writer, sheet_df)
+                else:
+                    self.write_rows_in_parts(sheet_df, sheet_writer, state)
+
+        # finish the last part
+        if state["writer"] is not None:
+            state["writer"].close_sheet()
+        self.planner = None
+
+    def plan_output_files(self, data_df: pd.DataFrame,
+                          output_files: list) -> None:
+        """
+        Plan the sheets of output files with the planner
+
+        Ranges and columns shared by sheets are then filtered and formatted
+        once, and pivots sharing a range and group keys are aggregated
+        together
+
+        Arguments:
+            data_df (pd.DataFrame):
+                dataframe containing data to generate output from
+            output_files (list):
+                config objects of the output files to plan
+        """
+
+        self.plan_dataframe(data_df)
+        sheets = [sheet for output_file in output_files
+                  for sheet in output_file["sheets"]]
+        self.planner.plan_columns([use for sheet in sheets
+                                   if sheet["type"] != "pivot"
+                                   for use in self.get_column_uses(sheet,
+                                                                   data_df)])
+        self.planner.plan_pivots([self.get_pivot_spec(sheet)
+                                  for sheet in sheets
+                                  if sheet["type"] == "pivot"])
+
+    def check_output_file(self, output_file: dict,
+                          data_df: pd.DataFrame) -> None:
+        """
+        Make sure the columns of each sheet of an output file are valid
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+            data_df (pd.DataFrame):
+                dataframe containing data to generate output from
+
+        Raises:
+            OutputConfigError:
+                "ColumnNotFound": the specified columns cannot be found
+                "DateColumnNotFound": the range column cannot be found
+                "InvalidDateColumn": the range column doesn't have a date type
+        """
+
+        for sheet in output_file["sheets"]:
+            # make sure specified columns exist in the data
+            columns_not_found = [col["from"]
+                                 for col in sheet["columns"]
+                                 if "from" in col
+                                 and col["from"] not in data_df]
+            if len(columns_not_found):
+                raise OutputConfigError("ColumnNotFound",
+                                        output_file["filename"],
+                                        sheet["name"],
+                                        str(columns_not_found))
+
+            # make sure specified date column exists and has a date type
+            date_col = sheet["range"]["column"]
+            if date_col not in data_df:
+                raise OutputConfigError("DateColumnNotFound",
+                                        output_file["filename"],
+                                        sheet["name"],
+                                        date_col)
+            if not pd.api.types.is_datetime64_dtype(data_df[date_col]):
+                raise OutputConfigError("InvalidDateColumn",
+                                        output_file["filename"],
+                                        sheet["name"],
+                                        date_col)
+
+    def get_output_writer(self, output_file: dict) -> str:
+        """
+        Get the writer of an output file
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+
+        Returns:
+            name of the writer (or the format if it isn't xlsx)
+        """
+
+        if self.get_output_format(output_file) != "xlsx":
+            return self.get_output_format(output_file)
+        return (output_file["writer"] if "writer" in output_file
+                else self.writer)
+
+    def check_output_cache(self, output_file: dict) -> tuple[str | None,
+                                                             bool]:
+        """
+        Check if an output file's data and config haven't changed
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+
+        Returns:
+            fingerprint of the output file (None without a cache) and
+            whether the output file is up to date and can be skipped
+        """
+
+        if not self.cache:
+            return None, False
+
+        output_path = self.get_output_file_path(output_file)
+        writer = self.get_output_writer(output_file)
+        fingerprint = self.cache.fingerprint_output_file(output_file, writer)
+        skipped = self.cache.is_output_current(output_path, fingerprint)
+
+        # record skipped output files like generated ones
+        if skipped:
+            with self.instrumentation.stage(
+                    "output_file", output_file=output_file["filename"],
+                    writer=writer, skipped=True):
+                pass
+
+        return fingerprint, skipped
+
+    def fingerprint_output_data(self, output_file: dict,
+                                data_df: pd.DataFrame) -> str:
+        """
+        Get a fingerprint of an output file's config and the data it uses
+
+        Only the rows within the range of each sheet and the columns it
+        takes from are hashed, so changes to other data don't change it
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+            data_df (pd.DataFrame):
+                dataframe containing data to generate output from
+
+        Returns:
+            sha256 hash of the config and data of the output file
+        """
+
+        self.plan_dataframe(data_df)
+        digest = hashlib.sha256(json.dumps(
+                    [output_file, self.get_output_writer(output_file)],
+                    sort_keys=True, default=str).encode())
+
+        for sheet in output_file["sheets"]:
+            # invalid columns are reported when generating
+            date_col = sheet["range"]["column"]
+            if not (date_col in data_df and
+                    pd.api.types.is_datetime64_dtype(data_df[date_col])):
+                continue
+            rows = self.planner.get_range_rows(sheet["range"])
+            for column in self.get_sheet_columns(sheet):
+                if column in data_df:
+                    digest.update(pd.util.hash_pandas_object(
+                                    data_df[column].take(rows),
+                                    index=False).to_numpy().tobytes())
+
+        return digest.hexdigest()
+
+    def generate_output_file(self, output_file: dict,
+                             data_df: pd.DataFrame) -> None:
+        """
+        Format data and write each sheet of an output file
+
+        Arguments:
+            output_file (dict):
+                config object of the output file
+            data_df (pd.DataFrame):
+                dataframe containing data to generate output from
+
+        Raises:
+            OutputConfigError:
+                "MissingDependency": the writer isn't installed
+        """
+
+        # save config object
+        self.current_output_file = output_file
+
+        # get path and writer of the output file
+        output_path = self.get_output_file_path(output_file)
+        writer = self.get_output_writer(output_file)
+
+        with self.instrumentation.stage(
+                "output_file", output_file=output_file["filename"],
+                writer=writer) as record:
+            if self.cache:
+                record["skipped"] = False
+
+            # open file for writing with the chosen writer
+            try:
+                sheet_writer = create_sheet_writer(writer, output_path)
+            except ImportError as error:
+                raise OutputConfigError("MissingDependency",
+                                        output_file["filename"],
+                                        error.name or writer)
+
+            self.part_writers = {}
+            try:
+                with sheet_writer:
+                    # format data and write to output file for each sheet
+                    for sheet in output_file["sheets"]:
+                        # save config object
+                        self.current_sheet = sheet
+                        self.write_output_sheet(sheet_writer, data_df)
+            finally:
+                # close continuation files of sheets split into files
+                for part_writer in self.part_writers.values():
+                    part_writer.close()
+                self.part_writers = {}
+
+    def generate_output_files(self, data_df: pd.DataFrame,
+                              output_files: list | None = None) -> None:
         """
         Format data based on config and generate output files
 
         Arguments:
             data_df (pd.DataFrame):
                 dataframe containing data to generate output from
+            output_files (list | None):
+                config objects of the output files to generate,
+                all of them if None
 
         Raises:
             OutputConfigError:
                 "ColumnNotFound": the specified columns cannot be found
+                "DateColumnNotFound": the range column cannot be found
+                "InvalidDateColumn": the range column doesn't have a date type
+                "MissingDependency": the writer isn't installed
+                "OutputFilesFailed": output files failed in worker processes
         """
 
         # print(data_df)
@@ -248,50 +1010,178 @@ class OutputHandler():
         if not os.path.isdir("output_files"):
             os.mkdir("output_files")
 
+        if output_files is None:
+            output_files = self.config
+
+        if self.store is not None:
+            # sheets of spilled data read the partitions they use, so only
+            # the columns of the data are needed to check output files
+            data_df = self.store.get_empty_frame()
+        elif self.jobs > 1 and len(output_files) > 1:
+            # generate independent output files in worker processes
+            self.generate_output_files_in_workers(data_df, output_files)
+            return
+        else:
+            self.plan_output_files(data_df, output_files)
+
         # format data and generate output for each output file
-        for output_file in self.config:
-            # save config object
-            self.current_output_file = output_file
-
-            # make sure specified columns of each sheet are valid
-            for sheet in output_file["sheets"]:
-                # make sure specified columns exist in the data
-                columns_not_found = [col["from"]
-                                     for col in sheet["columns"]
-                                     if "from" in col
-                                     and col["from"] not in data_df]
-                if len(columns_not_found):
-                    raise OutputConfigError("ColumnNotFound",
-                                            output_file["filename"],
-                                            sheet["name"],
-                                            str(columns_not_found))
-
-                # make sure specified date column exists and has a date type
-                date_col = sheet["range"]["column"]
-                if date_col not in data_df:
-                    raise OutputConfigError("DateColumnNotFound",
-                                            output_file["filename"],
-                                            sheet["name"],
-                                            date_col)
-                if not np.issubdtype(data_df[date_col].dtype, np.datetime64):
-                    raise OutputConfigError("InvalidDateColumn",
-                                            output_file["filename"],
-                                            sheet["name"],
-                                            date_col)
-
-            # get path and open file for writing
-            output_path = self.generate_output_path(output_file["filename"])
-            with pd.ExcelWriter(output_path) as writer:
-                # format data and write to output file for each sheet
-                for sheet in output_file["sheets"]:
-                    # save config object
-                    self.current_sheet = sheet
-
-                    # get formatted dataframe
-                    sheet_df = self.format_output_sheet(
-                                    self.filter_dataframe(data_df))
-
-                    # write to output file
-                    sheet_df.to_excel(writer,
-                                      sheet_name=sheet["name"],
-                                      index=False)
+        for output_file in output_files:
+            self.check_output_file(output_file, data_df)
+
+            # skip output file if its data and config haven't changed
+            fingerprint, skipped = self.check_output_cache(output_file)
+            if skipped:
+                continue
+
+            self.generate_output_file(output_file, data_df)
+
+            # record what the output file was generated from
+            if self.cache:
+                self.cache.save_output(
+                    self.get_output_file_path(output_file), fingerprint)
+
+    def generate_output_files_in_workers(self, data_df: pd.DataFrame,
+                                         output_files: list) -> None:
+        """
+        Generate output files in parallel worker processes
+
+        Where processes are forked, workers inherit the data from this
+        process without copying it. Elsewhere the data is written once to
+        a memory-mapped arrow file which every worker maps, rather than
+        being pickled for each output file. Workers are only sent the
+        config and writer settings (not this handler, whose planner may
+        hold the data) and build a handler of their own, which plans the
+        sheets of the output files it generates.
+
+        Output files are checked and skipped (if cached) up front, and
+        errors of every output file are collected and raised together once
+        all of them are done.
+
+        Arguments:
+            data_df (pd.DataFrame):
+                dataframe containing data to generate output from
+            output_files (list):
+                config objects of the output files to generate
+
+        Raises:
+            OutputConfigError:
+                "OutputFilesFailed": some output files couldn't be generated
+        """
+
+        errors = []
+        futures = []
+
+        # share data with workers without pickling it for each task
+        fork = multiprocessing.get_start_method() == "fork"
+        shared_dir = None if fork else tempfile.mkdtemp(
+                                        prefix="reformatted_sheets_")
+        settings = (self.config, self.writer, self.max_sheet_rows,
+                    self.instrumentation)
+        try:
+            if fork:
+                initargs = (settings, data_df, None)
+            else:
+                BuildCache(shared_dir).save_data("shared", data_df)
+                initargs = (settings, None, shared_dir)
+
+            with ProcessPoolExecutor(self.jobs,
+                                     initializer=init_output_worker,
+                                     initargs=initargs) as executor:
+                for index, output_file in enumerate(self.config):
+                    if output_file not in output_files:
+                        continue
+
+                    # check output files here so errors don't wait for
+                    # a worker
+                    try:
+                        self.check_output_file(output_file, data_df)
+                    except OutputConfigError as error:
+                        errors.append((output_file["filename"], error))
+                        continue
+
+                    # skip output file if its data and config haven't changed
+                    fingerprint, skipped = self.check_output_cache(
+                                                            output_file)
+                    if not skipped:
+                        futures.append((output_file, fingerprint,
+                                        executor.submit(
+                                            generate_output_file_in_worker,
+                                            index)))
+
+                # collect results in config order
+                for output_file, fingerprint, future in futures:
+                    try:
+                        future.result()
+                    except Exception as error:
+                        errors.append((output_file["filename"], error))
+                        continue
+
+                    # record what the output file was generated from
+                    if self.cache:
+                        self.cache.save_output(
+                            self.get_output_file_path(output_file),
+                            fingerprint)
+        finally:
+            if shared_dir:
+                shutil.rmtree(shared_dir, ignore_errors=True)
+
+        # report every output file that failed
+        if errors:
+            raise OutputConfigError(
+                "OutputFilesFailed", str(len(errors)),
+                str(len(output_files)),
+                "\n".join(f'"{filename}": ' + (
+                    str(error) if isinstance(error, OutputConfigError)
+                    else f"{type(error).__name__}: {error}")
+                    for filename, error in errors))
+
+
+# output handler and data of a worker process
+worker_state = {}
+
+
+def init_output_worker(settings: tuple, data_df: pd.DataFrame | None,
+                       shared_dir: str | None) -> None:
+    """
+    Create the output handler and load the data of a worker process
+
+    Arguments:
+        settings (tuple):
+            config objects of the output files, default writer, rows of a
+            sheet above which it's split and instrumentation of the parent
+            process's handler
+        data_df (pd.DataFrame | None):
+            dataframe inherited from the parent process, if forked
+        shared_dir (str | None):
+            folder of the memory-mapped data otherwise
+    """
+
+    if data_df is None:
+        data_df = BuildCache(shared_dir).load_data("shared")
+
+    # the parent process records what output files were generated from,
+    # so the handler has no cache
+    config, writer, max_sheet_rows, instrumentation = settings
+    output_handler = OutputHandler([], writer,
+                                   instrumentation=instrumentation)
+    output_handler.config = config
+    output_handler.max_sheet_rows = max_sheet_rows
+    worker_state["output_handler"] = output_handler
+    worker_state["data_df"] = data_df
+
+
+def generate_output_file_in_worker(index: int) -> None:
+    """
+    Generate an output file in a worker process
+
+    Arguments:
+        index (int):
+            position of the output file in the config
+    """
+
+    output_handler = worker_state["output_handler"]
+    data_df = worker_state["data_df"]
+    output_file = output_handler.config[index]
+
+    output_handler.plan_output_files(data_df, [output_file])
+    output_handler.generate_output_file(output_file, data_df)
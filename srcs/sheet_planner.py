@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+
+
+class SheetPlanner():
+    """
+    Index data by date columns once so sheets can be sliced by range
+
+    Range filters and column transforms are done once and shared by every
+    sheet using them. Planned columns are released after their last use.
+
+    Methods:
+        index_column(column: str) -> tuple[np.ndarray, np.ndarray]:
+            sort a date column once and save its order and sorted values
+        get_range_rows(range_config: dict) -> np.ndarray:
+            get positions of the rows within a date range
+        plan_columns(uses: list[tuple[dict, str, str | None]]) -> None:
+            count the uses of each column of each range by the sheets
+        get_column(range_config: dict, column: str,
+                   date_format: str | None = None) -> pd.Series:
+            get a column filtered to a date range, formatted if given one
+        filter_dataframe(range_config: dict,
+                         columns: list[str] | None = None) -> pd.DataFrame:
+            filter data to a date range
+        format_dates(column: str, date_format: str,
+                     rows: np.ndarray) -> pd.Categorical:
+            format rows of a date column, formatting each date only once
+        plan_pivots(pivots: list[tuple[dict, list, list]]) -> None:
+            collect the aggregations of pivots sharing a range and group keys
+        aggregate(range_config: dict, keys: list[tuple[str, str | None]],
+                  values: list[tuple[str, str]]) -> pd.DataFrame:
+            group the rows within a date range and aggregate their values
+
+    Attributes:
+        data_df (pd.DataFrame):
+            dataframe containing data to generate sheets from
+        range_indexes (dict):
+            order and sorted values of each indexed date column
+        range_rows (dict):
+            positions of the rows within each date range
+        column_uses (dict):
+            remaining uses of each column of each range
+        filtered_columns (dict):
+            columns of each range that will be used again
+        date_codes (dict):
+            codes and distinct dates of each factorized date column
+        formatted_dates (dict):
+            codes and labels of the distinct dates of a column in a format
+        pivot_plans (dict):
+            aggregations needed by the pivots of each range and group keys
+        pivot_results (dict):
+            aggregated data of each range and group keys
+    """
+
+    def __init__(self, data_df: pd.DataFrame) -> None:
+        """
+        Save the data to plan sheets from
+
+        Arguments:
+            data_df (pd.DataFrame):
+                dataframe containing data to generate sheets from
+        """
+
+        self.data_df = data_df
+        self.range_indexes = {}
+        self.range_rows = {}
+        self.column_uses = {}
+        self.filtered_columns = {}
+        self.date_codes = {}
+        self.formatted_dates = {}
+        self.pivot_plans = {}
+        self.pivot_results = {}
+
+    def index_column(self, column: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sort a date column once and save its order and sorted values
+
+        Arguments:
+            column (str):
+                name of the date column
+
+        Returns:
+            positions of the rows in sorted order and the sorted values
+        """
+
+        # sort only the first time a column is used by a sheet
+        if column not in self.range_indexes:
+            values = self.data_df[column].to_numpy()
+            order = np.argsort(values, kind="stable")
+            self.range_indexes[column] = (order, values[order])
+
+        return self.range_indexes[column]
+
+    def get_range_key(self, range_config: dict) -> tuple:
+        """
+        Get the key of a date range
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+
+        Returns:
+            hashable key of the range
+        """
+
+        return (range_config["column"], tuple(range_config["begin"]),
+                tuple(range_config["end"]))
+
+    def get_range_rows(self, range_config: dict) -> np.ndarray:
+        """
+        Get positions of the rows within a date range
+
+        Rows are only searched for the first time a range is used
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+
+        Returns:
+            positions of the rows within the range in their original order
+        """
+
+        range_key = self.get_range_key(range_config)
+        if range_key in self.range_rows:
+            return self.range_rows[range_key]
+
+        # convert range to timestamps
+        range_begin = range_config["begin"]
+        range_end = range_config["end"]
+        begin_ts = pd.Timestamp(range_begin[0], range_begin[1], range_begin[2])
+        end_ts = pd.Timestamp(range_end[0], range_end[1], range_end[2])
+
+        # find the range in the sorted values (missing dates are sorted last)
+        order, sorted_values = self.index_column(range_config["column"])
+        begin = sorted_values.searchsorted(begin_ts.to_datetime64(), "left")
+        end = sorted_values.searchsorted(end_ts.to_datetime64(), "right")
+
+        # keep rows in the order they were read
+        self.range_rows[range_key] = np.sort(order[begin:end])
+        return self.range_rows[range_key]
+
+    def plan_columns(self, uses: list[tuple[dict, str, str | None]]) -> None:
+        """
+        Count the uses of each column of each range by the sheets
+
+        Columns used more than once are kept after they're first filtered
+        (and formatted) until their last use
+
+        Arguments:
+            uses (list[tuple[dict, str, str | None]]):
+                range config, column and date format (or None) of each use
+        """
+
+        for range_config, column, date_format in uses:
+            key = (self.get_range_key(range_config), column, date_format)
+            self.column_uses[key] = self.column_uses.get(key, 0) + 1
+
+    def get_column(self, range_config: dict, column: str,
+                   date_format: str | None = None) -> pd.Series:
+        """
+        Get a column filtered to a date range, formatted if given one
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+            column (str):
+                name of the column
+            date_format (str | None):
+                strftime format of a date column
+
+        Returns:
+            series of the column within the range (shared by every use, so
+            it must not be modified)
+        """
+
+        key = (self.get_range_key(range_config), column, date_format)
+        if key in self.filtered_columns:
+            column_series = self.filtered_columns[key]
+        else:
+            rows = self.get_range_rows(range_config)
+            if date_format is None:
+                column_series = (self.data_df[column].take(rows)
+                                 .reset_index(drop=True))
+            else:
+                column_series = pd.Series(
+                    self.format_dates(column, date_format, rows), name=column)
+
+        # keep the column only while it has uses left
+        self.column_uses[key] = self.column_uses.get(key, 0) - 1
+        if self.column_uses[key] > 0:
+            self.filtered_columns[key] = column_series
+        else:
+            self.filtered_columns.pop(key, None)
+            self.column_uses.pop(key)
+
+        return column_series
+
+    def filter_dataframe(self, range_config: dict,
+                         columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        Filter data to a date range
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+            columns (list[str] | None):
+                columns to keep, all of them if None
+
+        Returns:
+            dataframe filtered to the date range
+        """
+
+        if columns is None:
+            return self.data_df.take(self.get_range_rows(range_config))
+
+        return pd.DataFrame({column: self.get_column(range_config, column)
+                             for column in columns},
+                            index=pd.RangeIndex(len(self.get_range_rows(
+                                                        range_config))),
+                            copy=False)
+
+    def format_dates(self, column: str, date_format: str,
+                     rows: np.ndarray) -> pd.Categorical:
+        """
+        Format rows of a date column, formatting each date only once
+
+        The column is factorized once and only its distinct dates are
+        formatted (once per format), then the labels are mapped back to the
+        rows through their codes. Results are kept for every sheet using the
+        same column and format. Labels are ordered by the first date they
+        appear on, so sorting by them keeps months, weekdays etc. in order.
+
+        Arguments:
+            column (str):
+                name of the date column
+            date_format (str):
+                strftime format of the labels
+            rows (np.ndarray):
+                positions of the rows to format
+
+        Returns:
+            categorical of the formatted rows (missing dates stay missing)
+        """
+
+        # factorize the column the first time it's formatted
+        if column not in self.date_codes:
+            self.date_codes[column] = pd.factorize(self.data_df[column],
+                                                   sort=True)
+        codes, dates = self.date_codes[column]
+
+        # format distinct dates the first time the format is used
+        key = (column, date_format)
+        if key not in self.formatted_dates:
+            self.formatted_dates[key] = pd.factorize(
+                                            dates.strftime(date_format))
+        label_codes, labels = self.formatted_dates[key]
+
+        # map codes of the rows to codes of their labels
+        row_codes = codes[rows]
+        result_codes = np.full(len(row_codes), -1, dtype=label_codes.dtype)
+        found = row_codes >= 0
+        result_codes[found] = label_codes[row_codes[found]]
+
+        return pd.Categorical.from_codes(result_codes, labels)
+
+    def get_pivot_key(self, range_config: dict,
+                      keys: list[tuple[str, str | None]]) -> tuple:
+        """
+        Get the key of the aggregations of a range and group keys
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+            keys (list[tuple[str, str | None]]):
+                columns to group by and the date format to bucket them by
+
+        Returns:
+            hashable key of the range and group keys
+        """
+
+        return (self.get_range_key(range_config), tuple(keys))
+
+    def plan_pivots(self, pivots: list[tuple[dict, list, list]]) -> None:
+        """
+        Collect the aggregations of pivots sharing a range and group keys
+
+        Pivots over the same range and group keys are then aggregated in a
+        single group-by pass, whichever of them is generated first
+
+        Arguments:
+            pivots (list[tuple[dict, list, list]]):
+                range config, group keys and values of each pivot
+        """
+
+        for range_config, keys, values in pivots:
+            plan_key = self.get_pivot_key(range_config, keys)
+            self.pivot_plans.setdefault(plan_key, set()).update(values)
+
+    def aggregate(self, range_config: dict,
+                  keys: list[tuple[str, str | None]],
+                  values: list[tuple[str, str]]) -> pd.DataFrame:
+        """
+        Group the rows within a date range and aggregate their values
+
+        Rows are grouped once on integer codes (date keys are bucketed by
+        their formatted labels) and every aggregation planned for the same
+        range and group keys is computed in that pass. Rows with a missing
+        group key are left out.
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+            keys (list[tuple[str, str | None]]):
+                columns to group by and the date format to bucket them by
+            values (list[tuple[str, str]]):
+                columns to aggregate and their aggregation
+
+        Returns:
+            aggregated data indexed by the group keys (levels named
+            "key_0", "key_1", ...) with a column for each column and
+            aggregation
+        """
+
+        plan_key = self.get_pivot_key(range_config, keys)
+        if plan_key not in self.pivot_results:
+            rows = self.get_range_rows(range_config)
+
+            # bucket date keys by their labels and take other keys as is
+            key_series = []
+            for index, (column, date_format) in enumerate(keys):
+                if (date_format is not None
+                        and pd.api.types.is_datetime64_dtype(
+                                                self.data_df[column])):
+                    key_values = pd.Series(self.format_dates(column,
+                                                             date_format,
+                                                             rows))
+                else:
+                    key_values = (self.data_df[column].take(rows)
+                                  .reset_index(drop=True))
+                key_series.append(key_values.rename(f"key_{index}"))
+
+            # aggregate every planned value of the range and keys at once
+            aggregations = {}
+            for column, aggregation in sorted(
+                    self.pivot_plans.get(plan_key, set()) | set(values)):
+                aggregations.setdefault(column, []).append(aggregation)
+            values_df = pd.DataFrame({column: self.data_df[column].take(rows)
+                                      .reset_index(drop=True)
+                                      for column in aggregations})
+            self.pivot_results[plan_key] = (
+                values_df.groupby(key_series, observed=True, sort=True)
+                .agg(aggregations))
+
+        return self.pivot_results[plan_key]
@@ -1,5 +1,9 @@
+import pandas as pd
 from .input_handler import InputHandler
 from .output_handler import OutputHandler
+from .build_cache import BuildCache
+from .config_reader import check_config_columns
+from .instrumentation import Instrumentation
 
 
 class SheetReformatter():
@@ -8,8 +12,14 @@ class SheetReformatter():
 
     Methods:
         handle_input() -> None:
-            read config file and get data from input_handler
-        handle_output() -> None:
+            read config files and get data from input_handler
+        fingerprint_input_files() -> None:
+            fingerprint the input files so unchanged output files are skipped
+        run_lazy_plan() -> pd.DataFrame:
+            get only the data used by the sheets with a lazy polars query
+        spill_input_data() -> SpillStore:
+            spill the combined data to disk partitioned by month
+        handle_output(output_files: list | None = None) -> None:
             read config file and format data into sheets
 
     Attributes:
@@ -17,32 +27,167 @@ class SheetReformatter():
             instance of the InputHandler class
         output_handler (OutputHandler):
             instance of the OutputHandler class
-        data (pd.DataFrame):
-            data from input files
+        engine (str):
+            engine to run the pipeline with, "pandas" or "polars"
+        cache (BuildCache | None):
+            cache shared by both handlers to skip unchanged work
+        instrumentation (Instrumentation):
+            records duration, row counts and memory of each stage
+        spill_dir (str | None):
+            folder to spill the combined data to or None to keep it in memory
+        data (pd.DataFrame | None):
+            data from input files (None if spilled)
+        store (SpillStore | None):
+            data from input files spilled to disk
     """
 
-    def __init__(self, input_config: str, output_config: str) -> None:
+    def __init__(self, input_config: str, output_config: str | list[str],
+                 jobs: int = 1, pool: str = "thread",
+                 writer: str = "openpyxl", cache: bool = False,
+                 instrument: str | None = None,
+                 output_jobs: int = 1, engine: str = "pandas",
+                 spill_dir: str | None = None) -> None:
         """
         Set up handlers for input and output
 
         Arguments:
             input_config (str):
                 name of the input config file
-            output_config (str):
-                name of the output config file
+            output_config (str | list[str]):
+                name of the output config file, or names of output config
+                files to generate from the same data
+            jobs (int):
+                number of workers to read input files with
+            pool (str):
+                type of workers to use, either "thread" or "process"
+            writer (str):
+                writer used for output files that don't specify one
+            cache (bool):
+                whether to reuse results of previous runs from "cache"
+            instrument (str | None):
+                file to append stage records to, "-" for stderr
+                or None to disable instrumentation
+            output_jobs (int):
+                number of worker processes to generate output files with
+            engine (str):
+                engine to run the pipeline with, "pandas" or "polars"
+                (compiles the configs into a lazy query)
+            spill_dir (str | None):
+                folder to spill the combined data to, so sheets are
+                generated a partition at a time, or None to keep it in
+                memory
         """
 
-        self.input_handler = InputHandler(input_config)
-        self.output_handler = OutputHandler(output_config)
+        self.engine = engine
+        self.spill_dir = spill_dir
+        self.data = None
+        self.store = None
+        self.cache = BuildCache() if cache else None
+        self.instrumentation = Instrumentation(instrument)
+        self.input_handler = InputHandler(input_config, jobs, pool,
+                                          self.cache, self.instrumentation)
+        self.output_handler = OutputHandler(output_config, writer,
+                                            self.cache, self.instrumentation,
+                                            output_jobs)
 
     def handle_input(self) -> None:
-        """Get data from input_handler"""
+        """
+        Get data from input_handler
+
+        Both configs are read first and the columns they use are checked
+        against the headers of the input files, so mistakes are reported
+        before any data is read
+        """
+
+        with self.instrumentation.stage("handle_input") as record:
+            self.input_handler.read_config_file()
+            self.output_handler.read_config_file()
+
+            # check the columns both configs use before reading any data
+            with self.instrumentation.stage("schema"):
+                check_config_columns(self.input_handler.config,
+                                     self.output_handler.config)
+
+            if self.spill_dir:
+                self.store = self.spill_input_data()
+                record["rows_out"] = self.store.row_count
+                return
+
+            if self.engine == "polars":
+                self.data = self.run_lazy_plan()
+            else:
+                self.data = self.input_handler.read_input_files()
+            record["rows_out"] = len(self.data)
+
+    def fingerprint_input_files(self) -> None:
+        """Fingerprint the input files so unchanged output files are skipped"""
+
+        if self.cache:
+            fingerprints = [self.cache.fingerprint_input_file(input_file)
+                            for input_file in self.input_handler.config]
+            self.cache.data_fingerprint = (
+                None if None in fingerprints
+                else self.cache.fingerprint(fingerprints))
+
+    def run_lazy_plan(self) -> pd.DataFrame:
+        """
+        Get only the data used by the sheets with a lazy polars query
+
+        Returns:
+            dataframe with the rows and columns used by any sheet
+        """
+
+        from .lazy_plan import LazyPlan
 
-        self.input_handler.read_config_file()
-        self.data = self.input_handler.read_input_files()
+        # the sheets decide which rows and columns are read
+        plan = LazyPlan(self.input_handler, self.output_handler,
+                        self.instrumentation)
+
+        self.fingerprint_input_files()
+        return plan.collect()
+
+    def spill_input_data(self) -> "SpillStore":
+        """
+        Spill the combined data to disk partitioned by month
+
+        With the cache, data spilled from the same input files by a
+        previous run is reused
+
+        Returns:
+            store of the spilled data, which the output handler generates
+            sheets from
+        """
+
+        from .spill_store import SpillStore
+
+        store = SpillStore(self.spill_dir, self.input_handler,
+                           self.output_handler, self.instrumentation)
+        self.fingerprint_input_files()
+        store.spill(self.cache.data_fingerprint if self.cache else None)
+        self.output_handler.store = store
+
+        # save hashes of the input files for the next run
+        if self.cache:
+            self.cache.save_manifest()
+        return store
+
+    def handle_output(self, output_files: list | None = None) -> None:
+        """
+        Format data into sheets
+
+        Arguments:
+            output_files (list | None):
+                config objects of the output files to generate,
+                all of them if None
+        """
 
-    def handle_output(self) -> None:
-        """Format data into sheets"""
+        with self.instrumentation.stage(
+                "handle_output", rows_in=(self.store.row_count if self.store
+                                          else len(self.data))):
+            self.output_handler.read_config_file()
+            self.output_handler.generate_output_files(self.data,
+                                                      output_files)
 
-        self.output_handler.read_config_file()
-        self.output_handler.generate_output_files(self.data)
+        # save hashes and fingerprints for the next run
+        if self.cache:
+            self.cache.save_manifest()
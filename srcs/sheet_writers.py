@@ -0,0 +1,997 @@
+import os
+import re
+import json
+import math
+import zipfile
+import numpy as np
+import pandas as pd
+from xml.sax.saxutils import escape, quoteattr
+
+# number of rows converted and written at a time
+WRITE_CHUNKSIZE = 10000
+
+# number of rows that fit in an xlsx sheet below its header
+MAX_SHEET_ROWS = 1048575
+
+# number of characters allowed in the name of an xlsx sheet
+MAX_SHEET_NAME = 31
+
+# file listing the files a table writer wrote to its output folder
+WRITTEN_FILE = ".written.json"
+
+# control characters that aren't allowed in xml (removed like openpyxl)
+ILLEGAL_CHARACTERS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def escape_text(value) -> str:
+    """
+    Escape a value as xml text, removing characters xml doesn't allow
+
+    Arguments:
+        value:
+            value to write as text
+
+    Returns:
+        escaped text of the value
+    """
+
+    return escape(ILLEGAL_CHARACTERS.sub("", str(value)))
+
+
+def get_column_values(column_series: pd.Series) -> list:
+    """
+    Convert a column to python values with None for missing values
+
+    Infinite numbers are missing values too, as xlsx cells can't hold them
+
+    Arguments:
+        column_series (pd.Series):
+            series containing the column to convert
+
+    Returns:
+        list of python values of the column
+    """
+
+    # categories are converted once and repeated through their codes
+    if isinstance(column_series.dtype, pd.CategoricalDtype):
+        categories = get_column_values(
+                        pd.Series(column_series.cat.categories)) + [None]
+        return [categories[code] for code in column_series.cat.codes.tolist()]
+
+    return [None if pd.isna(value) or (isinstance(value, float)
+                                       and not math.isfinite(value))
+            else value for value in column_series.astype(object).tolist()]
+
+
+def insert_values(sheet_df: pd.DataFrame,
+                  values: list[tuple] | None) -> pd.DataFrame:
+    """
+    Insert columns with custom values into rows of a sheet
+
+    Arguments:
+        sheet_df (pd.DataFrame):
+            dataframe containing rows of the sheet
+        values (list[tuple] | None):
+            position, name and value of each column with a custom value
+
+    Returns:
+        dataframe with the custom values repeated for each row
+    """
+
+    if not values:
+        return sheet_df
+
+    # insert in order of position so each lands where it was configured
+    sheet_df = sheet_df.copy(deep=False)
+    for position, name, value in sorted(values, key=lambda item: item[0]):
+        sheet_df.insert(position, name, value, allow_duplicates=True)
+    return sheet_df
+
+
+def remove_infinite(sheet_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace infinite numbers of a sheet with missing values
+
+    xlsx cells can't hold infinite numbers, so every writer leaves them
+    empty like missing ones (pandas would write them as text instead)
+
+    Arguments:
+        sheet_df (pd.DataFrame):
+            dataframe containing rows of the sheet
+
+    Returns:
+        dataframe without infinite numbers (the same one if it has none)
+    """
+
+    # only float columns can hold them, and only those with any are copied
+    infinite = [index for index, dtype in enumerate(sheet_df.dtypes)
+                if pd.api.types.is_float_dtype(dtype)
+                and np.isinf(sheet_df.iloc[:, index].to_numpy(
+                    dtype="float64", na_value=np.nan)).any()]
+    if not infinite:
+        return sheet_df
+
+    sheet_df = sheet_df.copy(deep=False)
+    for index in infinite:
+        column_series = sheet_df.iloc[:, index]
+        sheet_df.isetitem(index, column_series.mask(np.isinf(
+            column_series.to_numpy(dtype="float64", na_value=np.nan))))
+    return sheet_df
+
+
+def get_header(sheet_df: pd.DataFrame, values: list[tuple] | None) -> list:
+    """
+    Get the header of a sheet including columns with custom values
+
+    Arguments:
+        sheet_df (pd.DataFrame):
+            dataframe containing rows of the sheet
+        values (list[tuple] | None):
+            position, name and value of each column with a custom value
+
+    Returns:
+        names of the columns of the sheet
+    """
+
+    return list(insert_values(sheet_df.iloc[:0], values).columns)
+
+
+def create_sheet_writer(writer: str, output_path: str):
+    """
+    Create a sheet writer based on its name
+
+    Arguments:
+        writer (str):
+            name of the writer (or format of output files that aren't xlsx)
+        output_path (str):
+            full path of the output file
+
+    Returns:
+        instance of the corresponding writer class
+    """
+
+    if writer == "xlsxwriter":
+        return XlsxWriterSheetWriter(output_path)
+    if writer == "stream":
+        return StreamingSheetWriter(output_path)
+    if writer in ["csv", "parquet", "feather"]:
+        return TableSheetWriter(output_path, writer)
+    return PandasSheetWriter(output_path)
+
+
+class PandasSheetWriter():
+    """
+    Write sheets with pd.ExcelWriter (default openpyxl engine)
+
+    Methods:
+        open_sheet(name: str, columns: list[str]) -> None:
+            start a new sheet and write its header
+        write_rows(sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+            write rows to the current sheet
+        close_sheet() -> None:
+            finish the current sheet
+        write_sheet(name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None) -> None:
+            write a whole sheet
+        close() -> None:
+            save and close the output file
+
+    Attributes:
+        writer (pd.ExcelWriter):
+            writer of the output file
+        sheet_name (str):
+            name of the sheet that's being written
+        row_count (int):
+            number of rows written to the current sheet including the header
+    """
+
+    def __init__(self, output_path: str) -> None:
+        """
+        Open the output file for writing
+
+        Arguments:
+            output_path (str):
+                full path of the output file
+        """
+
+        self.writer = pd.ExcelWriter(output_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def open_sheet(self, name: str, columns: list[str]) -> None:
+        """
+        Start a new sheet and write its header
+
+        Arguments:
+            name (str):
+                name of the sheet
+            columns (list[str]):
+                names of the columns
+        """
+
+        self.sheet_name = name
+        pd.DataFrame(columns=columns).to_excel(self.writer,
+                                               sheet_name=name,
+                                               index=False)
+        self.row_count = 1
+
+    def write_rows(self, sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+        """
+        Write rows to the current sheet
+
+        Arguments:
+            sheet_df (pd.DataFrame):
+                dataframe containing rows to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+        """
+
+        insert_values(remove_infinite(sheet_df), values).to_excel(
+            self.writer, sheet_name=self.sheet_name,
+            startrow=self.row_count, header=False, index=False)
+        self.row_count += len(sheet_df)
+
+    def close_sheet(self) -> None:
+        """Finish the current sheet"""
+
+        self.sheet_name = None
+
+    def write_sheet(self, name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None) -> None:
+        """
+        Write a whole sheet
+
+        Arguments:
+            name (str):
+                name of the sheet
+            sheet_df (pd.DataFrame):
+                dataframe containing the sheet to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+        """
+
+        insert_values(remove_infinite(sheet_df), values).to_excel(
+            self.writer, sheet_name=name, index=False)
+
+    def close(self) -> None:
+        """Save and close the output file"""
+
+        self.writer.close()
+
+
+class XlsxWriterSheetWriter():
+    """
+    Write sheets row by row with xlsxwriter in constant memory mode
+
+    Each row is flushed to disk once the next one is written, so memory
+    stays flat regardless of the size of the sheet
+
+    Methods:
+        open_sheet(name: str, columns: list[str]) -> None:
+            start a new sheet and write its header
+        write_rows(sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+            write rows to the current sheet
+        close_sheet() -> None:
+            finish the current sheet
+        write_sheet(name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None) -> None:
+            write a whole sheet
+        close() -> None:
+            save and close the output file
+
+    Attributes:
+        workbook (xlsxwriter.Workbook):
+            workbook of the output file
+        worksheet (xlsxwriter.worksheet.Worksheet):
+            sheet that's being written
+        header_format (xlsxwriter.format.Format):
+            format of header cells
+        date_format (xlsxwriter.format.Format):
+            format of date cells
+        row_count (int):
+            number of rows written to the current sheet including the header
+    """
+
+    def __init__(self, output_path: str) -> None:
+        """
+        Open the output file for writing
+
+        Arguments:
+            output_path (str):
+                full path of the output file
+        """
+
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(output_path,
+                                            {"constant_memory": True})
+        self.header_format = self.workbook.add_format(
+                                {"bold": True, "border": 1,
+                                 "align": "center", "valign": "top"})
+        self.date_format = self.workbook.add_format(
+                                {"num_format": "yyyy-mm-dd hh:mm:ss"})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def open_sheet(self, name: str, columns: list[str]) -> None:
+        """
+        Start a new sheet and write its header
+
+        Arguments:
+            name (str):
+                name of the sheet
+            columns (list[str]):
+                names of the columns
+        """
+
+        self.worksheet = self.workbook.add_worksheet(name)
+        self.worksheet.write_row(0, 0, columns, self.header_format)
+        self.row_count = 1
+
+    def write_rows(self, sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+        """
+        Write rows to the current sheet
+
+        Arguments:
+            sheet_df (pd.DataFrame):
+                dataframe containing rows to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+        """
+
+        # get formats of each column so dates are displayed as dates
+        formats = [self.date_format
+                   if pd.api.types.is_datetime64_dtype(dtype) else None
+                   for dtype in insert_values(sheet_df.iloc[:0],
+                                              values).dtypes]
+
+        # write rows a chunk at a time
+        for begin in range(0, len(sheet_df), WRITE_CHUNKSIZE):
+            chunk = insert_values(sheet_df.iloc[begin:begin + WRITE_CHUNKSIZE],
+                                  values)
+            columns = [get_column_values(chunk[column]) for column in chunk]
+            for row in zip(*columns):
+                for col, (value, cell_format) in enumerate(zip(row, formats)):
+                    if value is not None:
+                        self.worksheet.write(self.row_count, col,
+                                             value, cell_format)
+                self.row_count += 1
+
+    def close_sheet(self) -> None:
+        """Finish the current sheet"""
+
+        self.worksheet = None
+
+    def write_sheet(self, name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None) -> None:
+        """
+        Write a whole sheet
+
+        Arguments:
+            name (str):
+                name of the sheet
+            sheet_df (pd.DataFrame):
+                dataframe containing the sheet to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+        """
+
+        self.open_sheet(name, get_header(sheet_df, values))
+        self.write_rows(sheet_df, values)
+        self.close_sheet()
+
+    def close(self) -> None:
+        """Save and close the output file"""
+
+        self.workbook.close()
+
+
+class StreamingSheetWriter():
+    """
+    Write sheets by streaming SpreadsheetML straight into the xlsx archive
+
+    Rows are serialized a chunk at a time and compressed as they are
+    written, so nothing but the current chunk is held in memory
+
+    Methods:
+        open_sheet(name: str, columns: list[str]) -> None:
+            start a new sheet and write its header
+        write_rows(sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+            write rows to the current sheet
+        close_sheet() -> None:
+            finish the current sheet
+        write_sheet(name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None) -> None:
+            write a whole sheet
+        close() -> None:
+            write the workbook parts and close the output file
+
+    Attributes:
+        archive (zipfile.ZipFile):
+            archive of the output file
+        sheet_file (file object):
+            stream of the sheet that's being written
+        sheet_names (list[str]):
+            names of the sheets written so far
+    """
+
+    # style indexes in styles.xml
+    HEADER_STYLE = 1
+    DATE_STYLE = 2
+
+    # excel stores dates as days since this date
+    EXCEL_EPOCH = np.datetime64("1899-12-30", "ns")
+
+    def __init__(self, output_path: str) -> None:
+        """
+        Open the output file for writing
+
+        Arguments:
+            output_path (str):
+                full path of the output file
+        """
+
+        self.archive = zipfile.ZipFile(output_path, "w",
+                                       zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.sheet_file = None
+        self.sheet_names = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def format_cells(self, column_series: pd.Series) -> list[str]:
+        """
+        Serialize a column to cell elements
+
+        Arguments:
+            column_series (pd.Series):
+                series containing the column to serialize
+
+        Returns:
+            list of cell elements of the column
+        """
+
+        dtype = column_series.dtype
+
+        # categories are serialized once and repeated through their codes
+        if isinstance(dtype, pd.CategoricalDtype):
+            cells = self.format_cells(pd.Series(dtype.categories)) + ["<c/>"]
+            return [cells[code] for code in column_series.cat.codes.tolist()]
+
+        # other extension dtypes (categoricals, nullable types) are handled
+        # value by value
+        if not isinstance(dtype, np.dtype):
+            return [self.format_cell(value)
+                    for value in column_series.astype(object).tolist()]
+
+        # dates are stored as fractional days with a date style
+        if np.issubdtype(dtype, np.datetime64):
+            values = column_series.to_numpy(dtype="datetime64[ns]")
+            days = ((values - self.EXCEL_EPOCH)
+                    / np.timedelta64(1, "D")).tolist()
+            return [f'<c s="{self.DATE_STYLE}"><v>{day!r}</v></c>'
+                    if day == day else "<c/>" for day in days]
+
+        # booleans are stored as 1 or 0
+        if np.issubdtype(dtype, np.bool_):
+            return [f'<c t="b"><v>{int(value)}</v></c>'
+                    for value in column_series.tolist()]
+
+        # numbers are stored as is, skipping missing and infinite ones
+        if np.issubdtype(dtype, np.number):
+            return [f"<c><v>{value!r}</v></c>" if math.isfinite(value)
+                    else "<c/>" for value in column_series.tolist()]
+
+        # strings and mixed objects are handled value by value
+        return [self.format_cell(value)
+                for value in column_series.astype(object).tolist()]
+
+    def format_cell(self, value) -> str:
+        """
+        Serialize a single value to a cell element
+
+        Arguments:
+            value:
+                value of the cell
+
+        Returns:
+            cell element of the value
+        """
+
+        if pd.isna(value):
+            return "<c/>"
+        if isinstance(value, bool):
+            return f'<c t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, np.integer)):
+            return f"<c><v>{int(value)}</v></c>"
+        if isinstance(value, (float, np.floating)):
+            return (f"<c><v>{float(value)!r}</v></c>"
+                    if math.isfinite(value) else "<c/>")
+        if isinstance(value, pd.Timestamp):
+            day = ((value.to_datetime64() - self.EXCEL_EPOCH)
+                   / np.timedelta64(1, "D"))
+            return f'<c s="{self.DATE_STYLE}"><v>{day!r}</v></c>'
+        return ('<c t="inlineStr"><is><t xml:space="preserve">'
+                f"{escape_text(value)}</t></is></c>")
+
+    def open_sheet(self, name: str, columns: list[str]) -> None:
+        """
+        Start a new sheet and write its header
+
+        Arguments:
+            name (str):
+                name of the sheet
+            columns (list[str]):
+                names of the columns
+        """
+
+        self.sheet_names.append(ILLEGAL_CHARACTERS.sub("", name))
+        self.sheet_file = self.archive.open(
+                            f"xl/worksheets/sheet{len(self.sheet_names)}.xml",
+                            "w", force_zip64=True)
+
+        # write start of the sheet and the header row
+        header = "".join(f'<c s="{self.HEADER_STYLE}" t="inlineStr"><is><t>'
+                         f"{escape_text(column)}</t></is></c>"
+                         for column in columns)
+        self.sheet_file.write(
+            ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+             '<worksheet xmlns="http://schemas.openxmlformats.org/'
+             'spreadsheetml/2006/main"><sheetData>'
+             f"<row>{header}</row>").encode())
+
+    def write_rows(self, sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+        """
+        Write rows to the current sheet
+
+        Arguments:
+            sheet_df (pd.DataFrame):
+                dataframe containing rows to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+        """
+
+        for begin in range(0, len(sheet_df), WRITE_CHUNKSIZE):
+            chunk = insert_values(sheet_df.iloc[begin:begin + WRITE_CHUNKSIZE],
+                                  values)
+            columns = [self.format_cells(chunk[column]) for column in chunk]
+            self.sheet_file.write("".join(f"<row>{''.join(cells)}</row>"
+                                          for cells in zip(*columns)
+                                          ).encode())
+
+    def close_sheet(self) -> None:
+        """Finish the current sheet"""
+
+        self.sheet_file.write(b"</sheetData></worksheet>")
+        self.sheet_file.close()
+        self.sheet_file = None
+
+    def write_sheet(self, name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None) -> None:
+        """
+        Write a whole sheet
+
+        Arguments:
+            name (str):
+                name of the sheet
+            sheet_df (pd.DataFrame):
+                dataframe containing the sheet to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+        """
+
+        self.open_sheet(name, get_header(sheet_df, values))
+        self.write_rows(sheet_df, values)
+        self.close_sheet()
+
+    def close(self) -> None:
+        """Write the workbook parts and close the output file"""
+
+        # finish the sheet being written if there is one
+        if self.sheet_file is not None:
+            self.close_sheet()
+
+        main_ns = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+        rel_ns = ("http://schemas.openxmlformats.org/"
+                  "officeDocument/2006/relationships")
+        pkg_ns = "http://schemas.openxmlformats.org/package/2006"
+        sheet_count = len(self.sheet_names)
+
+        # content types of every part
+        sheet_types = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{index}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.'
+            'spreadsheetml.worksheet+xml"/>'
+            for index in range(1, sheet_count + 1))
+        self.archive.writestr(
+            "[Content_Types].xml",
+            f'<Types xmlns="{pkg_ns}/content-types">'
+            '<Default Extension="rels" ContentType="application/'
+            'vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f"{sheet_types}</Types>")
+
+        # relationship of the package to the workbook
+        self.archive.writestr(
+            "_rels/.rels",
+            f'<Relationships xmlns="{pkg_ns}/relationships">'
+            f'<Relationship Id="rId1" Type="{rel_ns}/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>')
+
+        # workbook listing the sheets and its relationships
+        sheets = "".join(f"<sheet name={quoteattr(name)} "
+                         f'sheetId="{index}" r:id="rId{index}"/>'
+                         for index, name in enumerate(self.sheet_names, 1))
+        self.archive.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{main_ns}" xmlns:r="{rel_ns}">'
+            f"<sheets>{sheets}</sheets></workbook>")
+        sheet_rels = "".join(
+            f'<Relationship Id="rId{index}" Type="{rel_ns}/worksheet" '
+            f'Target="worksheets/sheet{index}.xml"/>'
+            for index in range(1, sheet_count + 1))
+        self.archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="{pkg_ns}/relationships">{sheet_rels}'
+            f'<Relationship Id="rId{sheet_count + 1}" '
+            f'Type="{rel_ns}/styles" Target="styles.xml"/></Relationships>')
+
+        # styles for default, header and date cells
+        self.archive.writestr(
+            "xl/styles.xml",
+            f'<styleSheet xmlns="{main_ns}">'
+            '<numFmts count="1"><numFmt numFmtId="164" '
+            'formatCode="yyyy\\-mm\\-dd\\ hh:mm:ss"/></numFmts>'
+            '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+            '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="2"><border><left/><right/><top/><bottom/>'
+            '<diagonal/></border><border><left style="thin"/>'
+            '<right style="thin"/><top style="thin"/><bottom style="thin"/>'
+            '<diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" '
+            'borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" '
+            'borderId="0" xfId="0"/>'
+            '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" '
+            'applyFont="1" applyBorder="1" applyAlignment="1">'
+            '<alignment horizontal="center" vertical="top"/></xf>'
+            '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" '
+            'applyNumberFormat="1"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" '
+            'builtinId="0"/></cellStyles></styleSheet>')
+
+        self.archive.close()
+
+
+class TableSheetWriter():
+    """
+    Write each sheet to its own CSV, Parquet or Feather file
+
+    The output path is a folder with a file per sheet, or a folder per
+    sheet with a file per partition. Rows are converted and written a chunk
+    at a time: appended to CSV files, as row groups of Parquet files and as
+    record batches of Feather files. A partition written again (e.g. from
+    another part of spilled data) goes to a numbered file next to it.
+    The files written are listed in the folder (see WRITTEN_FILE), so the
+    next run removes only those, never other files in the folder.
+
+    Methods:
+        remove_written_files() -> None:
+            remove the files listed by the last writer of the folder
+        save_written_files() -> None:
+            list the files written to the folder
+        open_sheet(name: str, columns: list[str],
+                   partition: str | None = None) -> None:
+            start a new sheet (or partition of a sheet) and write its header
+        get_schema(sheet_df: pd.DataFrame) -> pa.Schema:
+            get the arrow schema of the rows of a sheet
+        write_rows(sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+            write rows to the current sheet
+        close_sheet() -> None:
+            finish the current sheet
+        write_sheet(name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None,
+                    partition: str | None = None) -> None:
+            write a whole sheet (or partition of a sheet)
+        close() -> None:
+            finish the last sheet and list the files written
+
+    Attributes:
+        output_path (str):
+            full path of the output folder
+        output_format (str):
+            csv|parquet|feather
+        sheet_path (str):
+            path of the file that's being written
+        columns (list[str]):
+            names of the columns of the sheet that's being written
+        sheet_file (file object):
+            stream of the CSV file that's being written
+        table_writer (pq.ParquetWriter | pa.ipc.RecordBatchFileWriter):
+            writer of the Parquet or Feather file that's being written
+        schema (pa.Schema):
+            arrow schema of the sheet that's being written
+        text_columns (list[int]):
+            positions of columns with mixed types written as text
+        written_paths (set[str]):
+            paths of the files written so far
+    """
+
+    def __init__(self, output_path: str, output_format: str) -> None:
+        """
+        Create the output folder, removing the files written to it by the
+        last run
+
+        Arguments:
+            output_path (str):
+                full path of the output folder
+            output_format (str):
+                csv|parquet|feather
+
+        Raises:
+            ImportError:
+                pyarrow isn't installed (for Parquet and Feather)
+        """
+
+        if output_format != "csv":
+            import pyarrow  # noqa: F401
+
+        self.output_path = output_path
+        self.output_format = output_format
+        self.sheet_path = None
+        self.sheet_file = None
+        self.table_writer = None
+        self.written_paths = set()
+
+        # remove files of sheets or partitions that no longer exist
+        os.makedirs(output_path, exist_ok=True)
+        self.remove_written_files()
+
+    def remove_written_files(self) -> None:
+        """
+        Remove the files listed by the last writer of the folder
+
+        Only paths inside the folder are removed, along with the sheet
+        folders they leave empty
+        """
+
+        written_path = os.path.join(self.output_path, WRITTEN_FILE)
+        if not os.path.isfile(written_path):
+            return
+        try:
+            with open(written_path) as written_file:
+                written = json.load(written_file)
+        except ValueError:
+            written = []
+
+        for relative_path in written:
+            relative_path = os.path.normpath(str(relative_path))
+            if (os.path.isabs(relative_path)
+                    or relative_path.split(os.sep)[0] in ["", ".", ".."]):
+                continue
+            path = os.path.join(self.output_path, relative_path)
+            try:
+                os.remove(path)
+                if os.path.dirname(relative_path):
+                    os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+        os.remove(written_path)
+
+    def save_written_files(self) -> None:
+        """List the files written to the folder"""
+
+        written_path = os.path.join(self.output_path, WRITTEN_FILE)
+        with open(written_path + ".tmp", "w") as written_file:
+            json.dump(sorted(os.path.relpath(path, self.output_path)
+                             for path in self.written_paths),
+                      written_file, indent=4)
+        os.replace(written_path + ".tmp", written_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def open_sheet(self, name: str, columns: list[str],
+                   partition: str | None = None) -> None:
+        """
+        Start a new sheet (or partition of a sheet) and write its header
+
+        Arguments:
+            name (str):
+                name of the sheet
+            columns (list[str]):
+                names of the columns
+            partition (str | None):
+                label of the partition (e.g. "2023-01"), if partitioned
+        """
+
+        if partition is None:
+            self.sheet_path = os.path.join(self.output_path,
+                                           f"{name}.{self.output_format}")
+        else:
+            os.makedirs(os.path.join(self.output_path, name), exist_ok=True)
+            self.sheet_path = os.path.join(self.output_path, name,
+                                           f"{partition}.{self.output_format}")
+
+            # number partitions written again instead of replacing them
+            count = 1
+            while self.sheet_path in self.written_paths:
+                count += 1
+                self.sheet_path = os.path.join(
+                    self.output_path, name,
+                    f"{partition} ({count}).{self.output_format}")
+        self.written_paths.add(self.sheet_path)
+        self.columns = columns
+        self.schema = None
+
+        # Parquet and Feather files are opened once the types are known
+        if self.output_format == "csv":
+            self.sheet_file = open(self.sheet_path, "w", newline="",
+                                   encoding="utf-8")
+            pd.DataFrame(columns=columns).to_csv(self.sheet_file, index=False)
+
+    def get_schema(self, sheet_df: pd.DataFrame) -> "pa.Schema":
+        """
+        Get the arrow schema of the rows of a sheet
+
+        Types are inferred from the whole sheet rather than the first chunk
+        so every chunk has the same schema. Text columns whose first rows
+        are missing are still text, and columns mixing types (e.g. numbers
+        and text) are written as text. Categorical columns are dictionary
+        encoded in Parquet files, which take a dictionary per row group,
+        and written as their values in Feather files, which only take a
+        single dictionary per column (later rows may have other categories).
+
+        Arguments:
+            sheet_df (pd.DataFrame):
+                dataframe containing rows of the sheet
+
+        Returns:
+            arrow schema of the sheet
+        """
+
+        import pyarrow as pa
+
+        fields = []
+        self.text_columns = []
+        for position, name in enumerate(self.columns):
+            column_series = sheet_df.iloc[:, position]
+            if column_series.dtype != object:
+                column_type = pa.Array.from_pandas(column_series.iloc[:0]).type
+                if pa.types.is_dictionary(column_type):
+                    column_type = (pa.dictionary(pa.int32(),
+                                                 column_type.value_type)
+                                   if self.output_format == "parquet"
+                                   else column_type.value_type)
+            elif pd.api.types.infer_dtype(column_series,
+                                          skipna=True) in ["string", "empty"]:
+                column_type = pa.string()
+            else:
+                try:
+                    column_type = pa.Array.from_pandas(column_series).type
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    column_type = pa.string()
+                    self.text_columns.append(position)
+            fields.append(pa.field(str(name), column_type))
+        return pa.schema(fields)
+
+    def write_rows(self, sheet_df: pd.DataFrame,
+                   values: list[tuple] | None = None) -> None:
+        """
+        Write rows to the current sheet
+
+        Arguments:
+            sheet_df (pd.DataFrame):
+                dataframe containing rows to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+        """
+
+        if self.output_format == "csv":
+            # dates are written like the date cells of xlsx files
+            for begin in range(0, len(sheet_df), WRITE_CHUNKSIZE):
+                insert_values(sheet_df.iloc[begin:begin + WRITE_CHUNKSIZE],
+                              values).to_csv(self.sheet_file, header=False,
+                                             index=False,
+                                             date_format="%Y-%m-%d %H:%M:%S")
+            return
+
+        import pyarrow as pa
+
+        # open the file with the schema of the whole sheet
+        if self.schema is None:
+            self.schema = self.get_schema(insert_values(sheet_df, values))
+            if self.output_format == "parquet":
+                import pyarrow.parquet as pq
+
+                self.table_writer = pq.ParquetWriter(self.sheet_path,
+                                                     self.schema)
+            else:
+                self.table_writer = pa.ipc.new_file(
+                    self.sheet_path, self.schema,
+                    options=pa.ipc.IpcWriteOptions(compression="lz4"))
+
+        for begin in range(0, len(sheet_df), WRITE_CHUNKSIZE):
+            chunk = insert_values(sheet_df.iloc[begin:begin + WRITE_CHUNKSIZE],
+                                  values)
+            arrays = []
+            for position, field in enumerate(self.schema):
+                column_series = chunk.iloc[:, position]
+                if position in self.text_columns:
+                    column_series = column_series.map(str, na_action="ignore")
+                arrays.append(pa.Array.from_pandas(column_series,
+                                                   type=field.type))
+            batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+            if self.output_format == "parquet":
+                self.table_writer.write_batch(batch)
+            else:
+                self.table_writer.write(batch)
+
+    def close_sheet(self) -> None:
+        """Finish the current sheet"""
+
+        if self.sheet_file is not None:
+            self.sheet_file.close()
+            self.sheet_file = None
+        elif self.output_format != "csv":
+            # sheets without rows still get a file with their columns
+            if self.table_writer is None:
+                self.write_rows(pd.DataFrame(columns=self.columns))
+            self.table_writer.close()
+            self.table_writer = None
+        self.sheet_path = None
+
+    def write_sheet(self, name: str, sheet_df: pd.DataFrame,
+                    values: list[tuple] | None = None,
+                    partition: str | None = None) -> None:
+        """
+        Write a whole sheet (or partition of a sheet)
+
+        Arguments:
+            name (str):
+                name of the sheet
+            sheet_df (pd.DataFrame):
+                dataframe containing the sheet to write
+            values (list[tuple] | None):
+                position, name and value of each column with a custom value
+            partition (str | None):
+                label of the partition (e.g. "2023-01"), if partitioned
+        """
+
+        self.open_sheet(name, get_header(sheet_df, values), partition)
+        self.write_rows(sheet_df, values)
+        self.close_sheet()
+
+    def close(self) -> None:
+        """Finish the last sheet and list the files written"""
+
+        if self.sheet_path is not None:
+            self.close_sheet()
+        self.save_written_files()
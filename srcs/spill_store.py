@@ -0,0 +1,495 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from collections import Counter
+from collections.abc import Iterator
+from datetime import datetime
+from .exceptions import InputConfigError
+from .config_reader import PARTITIONS
+from .input_handler import InputHandler
+from .output_handler import OutputHandler
+from .instrumentation import Instrumentation
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# number of rows read at a time from input files without a "chunksize"
+SPILL_CHUNKSIZE = 1000000
+
+# label of the partition of rows without a date
+NULL_PARTITION = "null"
+
+# folder created in the folder given to spill to, which is never removed
+SPILL_FOLDER = "reformatted-sheets-spill"
+
+# file marking a folder as created by a spill store
+SPILL_MARKER = ".spill"
+
+# column of the position of each row in the combined data, spilled with it
+ROW_COLUMN = "__spill_row__"
+
+
+class SpillStore():
+    """
+    Spill the combined data to disk, partitioned by month
+
+    Input files are read a batch at a time and each batch is joined and
+    written to Parquet files in a folder per month of the range column most
+    sheets use, so only one batch of the combined data is in memory at a
+    time. Each row is spilled with its position in the combined data
+    (ROW_COLUMN), so sheets can merge the partitions within their range
+    back into the order the rows were read, reading only the columns they
+    use and a part file of each partition at a time.
+    The data is spilled to a folder of its own (SPILL_FOLDER) inside the
+    folder given, and only a folder with its marker is ever removed.
+
+    Methods:
+        get_partition_column() -> str:
+            get the range column the data is partitioned by
+        write_batch(data_df: pd.DataFrame) -> None:
+            write a batch of the combined data to its partitions
+        spill(fingerprint: str | None = None) -> None:
+            read, join and write the data from every input file
+        get_labels(range_config: dict | None = None) -> list[str]:
+            get the labels of the partitions with rows within a range
+        read_part(path: str, columns: list[str] | None = None,
+                  row_column: bool = False) -> pa.Table:
+            read the columns of a part file that it has
+        get_frame(tables: list,
+                  columns: list[str] | None = None) -> pd.DataFrame:
+            combine tables of part files like the input files
+        read_partition(label: str,
+                       columns: list[str] | None = None) -> pd.DataFrame:
+            read the columns of a partition
+        iter_partitions(range_config: dict,
+                        columns: list[str]) -> Iterator[tuple]:
+            read the partitions with rows within a range one at a time
+        iter_rows(range_config: dict,
+                  columns: list[str]) -> Iterator[pd.DataFrame]:
+            read the rows within a range in the order they were read
+        get_empty_frame() -> pd.DataFrame:
+            get the columns and dtypes of the combined data without rows
+
+    Attributes:
+        spill_dir (str):
+            path of the folder the data is spilled to (SPILL_FOLDER inside
+            the folder given)
+        input_handler (InputHandler):
+            input handler with its config read
+        output_handler (OutputHandler):
+            output handler with its config read
+        instrumentation (Instrumentation):
+            records duration, row counts and memory of each stage
+        partition_column (str):
+            date column the data is partitioned by
+        partition (str):
+            period of each partition (see PARTITIONS)
+        parts (dict):
+            paths of the part files of each partition, relative to spill_dir
+        schema (pa.Schema | None):
+            schema of the combined data
+        row_count (int):
+            number of rows spilled
+    """
+
+    def __init__(self, spill_dir: str, input_handler: InputHandler,
+                 output_handler: OutputHandler,
+                 instrumentation: Instrumentation | None = None) -> None:
+        """
+        Save the folder to spill to and the handlers whose configs are used
+
+        Arguments:
+            spill_dir (str):
+                path of the folder to spill the data to a folder in
+            input_handler (InputHandler):
+                input handler with its config read
+            output_handler (OutputHandler):
+                output handler with its config read
+            instrumentation (Instrumentation | None):
+                records duration, row counts and memory of each stage
+
+        Raises:
+            InputConfigError:
+                "MissingDependency": pyarrow isn't installed
+        """
+
+        if pa is None:
+            raise InputConfigError("MissingDependency",
+                                   input_handler.config_filename, "pyarrow")
+
+        self.spill_dir = os.path.join(spill_dir, SPILL_FOLDER)
+        self.input_handler = input_handler
+        self.output_handler = output_handler
+        self.instrumentation = instrumentation or Instrumentation()
+        self.partition_column = self.get_partition_column()
+        self.partition = "month"
+        self.parts = {}
+        self.schema = None
+        self.row_count = 0
+
+    def get_partition_column(self) -> str:
+        """
+        Get the range column the data is partitioned by
+
+        Returns:
+            range column used by the most sheets (sheets with another range
+            column read every partition)
+        """
+
+        counts = Counter(sheet["range"]["column"]
+                         for output_file in self.output_handler.config
+                         for sheet in output_file["sheets"])
+        return counts.most_common(1)[0][0]
+
+    def write_batch(self, data_df: pd.DataFrame) -> None:
+        """
+        Write a batch of the combined data to its partitions
+
+        Each distinct date is labeled once, then rows are grouped by label
+        with a single stable sort and each group is added to its partition
+        as a new part file, with the position of its rows in the combined
+        data (ROW_COLUMN)
+
+        Arguments:
+            data_df (pd.DataFrame):
+                batch of the combined data
+        """
+
+        schema = pa.Schema.from_pandas(data_df.iloc[:0], preserve_index=False)
+        self.schema = (schema if self.schema is None
+                       else pa.unify_schemas([self.schema, schema],
+                                             promote_options="permissive"))
+
+        # label each row by the period of its date (rows without one last)
+        codes, dates = pd.factorize(data_df[self.partition_column],
+                                    sort=True)
+        label_codes, labels = pd.factorize(
+                                dates.strftime(PARTITIONS[self.partition]))
+        labels = [*labels, NULL_PARTITION]
+        row_labels = np.where(codes >= 0, label_codes[codes], len(labels) - 1)
+        data_df = data_df.assign(**{ROW_COLUMN: np.arange(
+                    self.row_count, self.row_count + len(data_df))})
+
+        order = np.argsort(row_labels, kind="stable")
+        counts = np.bincount(row_labels, minlength=len(labels))
+        ends = np.cumsum(counts)
+        for code, label in enumerate(labels):
+            if not counts[code]:
+                continue
+            rows = order[ends[code] - counts[code]:ends[code]]
+            paths = self.parts.setdefault(label, [])
+            path = os.path.join(label, f"part-{len(paths):05d}.parquet")
+            os.makedirs(os.path.join(self.spill_dir, label), exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(data_df.take(rows),
+                                                preserve_index=False),
+                           os.path.join(self.spill_dir, path))
+            paths.append(path)
+        self.row_count += len(data_df)
+
+    def spill(self, fingerprint: str | None = None) -> None:
+        """
+        Read, join and write the data from every input file
+
+        Files are read SPILL_CHUNKSIZE rows at a time unless they have a
+        "chunksize" (or are read by pyarrow, which can't read in chunks).
+        Files with join_on are read whole, since each batch is joined
+        with them.
+        The data spilled for the same fingerprint is reused if the last
+        spill to the folder finished.
+
+        Arguments:
+            fingerprint (str | None):
+                fingerprint of the input files and their configs, if known
+
+        Raises:
+            InputConfigError:
+                "InputFileNotFound": the input file cannot be found
+                "ColumnNotFound": the specified columns cannot be found
+                "InvalidFormat": a column contains data that
+                                 doesn't match the specified format
+                "JoinColumnNotFound": the join_on column cannot be found
+                "InvalidJoinColumn": the join_on column
+                                     doesn't match any other columns
+                "DuplicateJoinKey": the join_on column has duplicate values
+                "InvalidSpillFolder": the folder exists but wasn't created
+                                      by a spill store
+        """
+
+        manifest_path = os.path.join(self.spill_dir, "manifest.json")
+        with self.instrumentation.stage("spill") as record:
+            # reuse the data spilled from the same input files
+            if fingerprint and os.path.isfile(manifest_path):
+                with open(manifest_path) as manifest_file:
+                    manifest = json.load(manifest_file)
+                if (manifest["fingerprint"] == fingerprint
+                        and manifest["partition_column"]
+                        == self.partition_column
+                        and manifest.get("row_column") == ROW_COLUMN):
+                    self.parts = manifest["parts"]
+                    self.row_count = manifest["rows"]
+                    self.schema = pq.read_schema(
+                        os.path.join(self.spill_dir, "schema.parquet"))
+                    record["reused"] = True
+                    record["rows_out"] = self.row_count
+                    return
+
+            # start from an empty folder, only removing one spilled to
+            if os.path.exists(self.spill_dir):
+                if not os.path.isfile(os.path.join(self.spill_dir,
+                                                   SPILL_MARKER)):
+                    raise InputConfigError("InvalidSpillFolder",
+                                           self.spill_dir)
+                shutil.rmtree(self.spill_dir)
+            os.makedirs(self.spill_dir)
+            open(os.path.join(self.spill_dir, SPILL_MARKER), "w").close()
+
+            # read the files to join with every batch
+            config = self.input_handler.config
+            join_data = []
+            for input_file in config:
+                if "join_on" not in input_file:
+                    continue
+                join_df = self.input_handler.read_input_file(input_file)
+                if input_file["join_on"] not in join_df.columns:
+                    raise InputConfigError("JoinColumnNotFound",
+                                           input_file["filename"],
+                                           input_file["join_on"])
+                join_data.append((join_df, input_file["join_on"],
+                                  input_file["filename"]))
+
+            # columns of the combined data that joined files also have are
+            # added to every batch, so they're suffixed like when combined
+            combined_columns = {column["name"] for input_file in config
+                                if "join_on" not in input_file
+                                for column in input_file["columns"]}
+            overlap = [column for join_df, join_on, filename in join_data
+                       for column in join_df.columns
+                       if column != join_on and column in combined_columns]
+
+            for input_file in config:
+                if "join_on" in input_file:
+                    continue
+                if not ("chunksize" in input_file
+                        or input_file.get("engine") == "pyarrow"):
+                    input_file = {**input_file, "chunksize": SPILL_CHUNKSIZE}
+                for batch in self.input_handler.iter_input_batches(
+                                                                input_file):
+                    batch = batch.assign(**{column: None
+                                            for column in overlap
+                                            if column not in batch})
+                    self.write_batch(self.input_handler.join_input_data(
+                                                        batch, join_data))
+
+            # save the schema, then the manifest once everything is written
+            pq.write_table(self.schema.empty_table(),
+                           os.path.join(self.spill_dir, "schema.parquet"))
+            with open(manifest_path + ".tmp", "w") as manifest_file:
+                json.dump({"fingerprint": fingerprint,
+                           "partition_column": self.partition_column,
+                           "row_column": ROW_COLUMN,
+                           "rows": self.row_count, "parts": self.parts},
+                          manifest_file, indent=4)
+            os.replace(manifest_path + ".tmp", manifest_path)
+            record["rows_out"] = self.row_count
+            record["partitions"] = len(self.parts)
+
+    def get_labels(self, range_config: dict | None = None) -> list[str]:
+        """
+        Get the labels of the partitions with rows within a range
+
+        Arguments:
+            range_config (dict | None):
+                config object of the range, or None for every partition
+
+        Returns:
+            labels of the partitions in order of their dates (rows without
+            a date last), only those within the range if it's on the
+            partition column
+        """
+
+        labels = sorted(label for label in self.parts
+                        if label != NULL_PARTITION)
+        if (range_config is None
+                or range_config["column"] != self.partition_column):
+            if NULL_PARTITION in self.parts:
+                labels.append(NULL_PARTITION)
+            return labels
+
+        # labels are zero-padded, so they sort like their dates
+        date_format = PARTITIONS[self.partition]
+        begin = datetime(*range_config["begin"][:3]).strftime(date_format)
+        end = datetime(*range_config["end"][:3]).strftime(date_format)
+        return [label for label in labels if begin <= label <= end]
+
+    def read_part(self, path: str, columns: list[str] | None = None,
+                  row_column: bool = False) -> "pa.Table":
+        """
+        Read the columns of a part file that it has
+
+        Arguments:
+            path (str):
+                path of the part file, relative to spill_dir
+            columns (list[str] | None):
+                columns to read, all of them if None
+            row_column (bool):
+                whether to also read the position of each row (ROW_COLUMN)
+
+        Returns:
+            table of the rows of the part file
+        """
+
+        part_file = pq.ParquetFile(os.path.join(self.spill_dir, path))
+        names = part_file.schema_arrow.names
+        if columns is None:
+            columns = [name for name in names if name != ROW_COLUMN]
+        return part_file.read([column for column in columns
+                               if column in names]
+                              + ([ROW_COLUMN] if row_column else []))
+
+    def get_frame(self, tables: list, columns: list[str] | None = None
+                  ) -> pd.DataFrame:
+        """
+        Combine tables of part files like the input files
+
+        Missing columns are filled, types are promoted and categories are
+        unioned
+
+        Arguments:
+            tables (list[pa.Table]):
+                tables of part files
+            columns (list[str] | None):
+                columns of the dataframe, all of them if None
+
+        Returns:
+            dataframe of the rows of the tables
+        """
+
+        data_df = pa.concat_tables(tables,
+                                   promote_options="permissive").to_pandas()
+
+        # add columns none of the part files have with their dtype
+        empty_df = self.get_empty_frame()
+        for column in columns or []:
+            if column not in data_df:
+                data_df[column] = pd.Series(index=data_df.index,
+                                            dtype=empty_df[column].dtype)
+        return data_df if columns is None else data_df[columns]
+
+    def read_partition(self, label: str,
+                       columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        Read the columns of a partition
+
+        Part files are combined like the input files (see get_frame)
+
+        Arguments:
+            label (str):
+                label of the partition
+            columns (list[str] | None):
+                columns to read, all of them if None
+
+        Returns:
+            dataframe of the rows of the partition
+        """
+
+        return self.get_frame([self.read_part(path, columns)
+                               for path in self.parts[label]], columns)
+
+    def iter_partitions(self, range_config: dict,
+                        columns: list[str]) -> Iterator[tuple]:
+        """
+        Read the partitions with rows within a range one at a time
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+            columns (list[str]):
+                columns to read
+
+        Yields:
+            label and dataframe of each partition (a single empty one if
+            no partition is within the range)
+        """
+
+        labels = self.get_labels(range_config)
+        if not labels:
+            yield None, self.get_empty_frame()[columns]
+        for label in labels:
+            with self.instrumentation.stage("read_partition",
+                                            partition=label) as record:
+                data_df = self.read_partition(label, columns)
+                record["rows_out"] = len(data_df)
+            yield label, data_df
+
+    def iter_rows(self, range_config: dict,
+                  columns: list[str]) -> Iterator[pd.DataFrame]:
+        """
+        Read the rows within a range in the order they were read
+
+        Rows of each partition are in the order they were read, so the
+        partitions within the range are merged on their positions
+        (ROW_COLUMN) a part file of each at a time: every row up to the
+        last position of the part file that ends first is yielded, then
+        that part file is replaced by the next one of its partition
+
+        Arguments:
+            range_config (dict):
+                config object of the range
+            columns (list[str]):
+                columns to read
+
+        Yields:
+            dataframes of consecutive rows (a single empty one if no
+            partition is within the range)
+        """
+
+        labels = self.get_labels(range_config)
+        if not labels:
+            yield self.get_empty_frame()[columns]
+
+        def iter_parts(label: str) -> Iterator["pa.Table"]:
+            for path in self.parts[label]:
+                with self.instrumentation.stage("read_partition",
+                                                partition=label) as record:
+                    table = self.read_part(path, columns, row_column=True)
+                    record["rows_out"] = table.num_rows
+                yield table
+
+        readers = [iter_parts(label) for label in labels]
+        tables = [next(reader) for reader in readers]
+        while readers:
+            last = min(table[ROW_COLUMN][-1].as_py() for table in tables)
+            merged = []
+            for index, table in enumerate(tables):
+                count = int(np.searchsorted(table[ROW_COLUMN].to_numpy(),
+                                            last, side="right"))
+                merged.append(table.slice(0, count))
+                tables[index] = table.slice(count)
+
+            # replace the part files read to the end
+            for index in reversed(range(len(tables))):
+                if not tables[index].num_rows:
+                    table = next(readers[index], None)
+                    if table is None:
+                        del readers[index], tables[index]
+                    else:
+                        tables[index] = table
+
+            data_df = self.get_frame(merged, columns + [ROW_COLUMN])
+            yield (data_df.sort_values(ROW_COLUMN, kind="stable")[columns]
+                   .reset_index(drop=True))
+
+    def get_empty_frame(self) -> pd.DataFrame:
+        """
+        Get the columns and dtypes of the combined data without rows
+
+        Returns:
+            empty dataframe with the columns of the combined data
+        """
+
+        return self.schema.empty_table().to_pandas()
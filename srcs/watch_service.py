@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime as dt
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .exceptions import InputConfigError, OutputConfigError
+from .sheet_reformatter import SheetReformatter
+
+
+class WatchService():
+    """
+    Keep parsed input files in memory and regenerate output files on changes
+
+    Methods:
+        get_snapshot() -> dict:
+            get the mtime and size of the configs and input files
+        run_once(force: bool = False, regenerate_all: bool = False) -> dict:
+            re-ingest changed input files and regenerate affected outputs
+        serve() -> ThreadingHTTPServer:
+            start the HTTP trigger in a background thread
+        run() -> None:
+            poll for changes until interrupted
+
+    Attributes:
+        reformatter (SheetReformatter):
+            reformatter whose handlers keep the parsed data
+        interval (float):
+            seconds to wait between checks for changes
+        port (int | None):
+            local port of the HTTP trigger or None to disable it
+        snapshot (dict):
+            mtime and size of each watched file at the last run
+        output_fingerprints (dict):
+            fingerprint of the data and config of each generated output file
+        last_result (dict | None):
+            summary of the last run
+        lock (threading.Lock):
+            lock so polling and triggered runs don't overlap
+    """
+
+    def __init__(self, reformatter: SheetReformatter, interval: float = 1.0,
+                 port: int | None = None) -> None:
+        """
+        Save the reformatter and how to watch for changes
+
+        Arguments:
+            reformatter (SheetReformatter):
+                reformatter whose handlers keep the parsed data
+            interval (float):
+                seconds to wait between checks for changes
+            port (int | None):
+                local port of the HTTP trigger or None to disable it
+        """
+
+        self.reformatter = reformatter
+        self.interval = interval
+        self.port = port
+        self.snapshot = None
+        self.output_fingerprints = {}
+        self.last_result = None
+        self.lock = threading.Lock()
+
+        # keep parsed data of input files that haven't changed between runs
+        self.reformatter.input_handler.keep_data = True
+
+    def get_snapshot(self) -> dict:
+        """
+        Get the mtime and size of the configs and input files
+
+        Returns:
+            mtime and size of each watched file (None if it doesn't exist)
+        """
+
+        input_handler = self.reformatter.input_handler
+        paths = ["configs/" + input_handler.config_filename,
+                 "configs/" + self.reformatter.output_handler.config_filename]
+        if hasattr(input_handler, "config"):
+            paths.extend("input_files/" + input_file["filename"]
+                         for input_file in input_handler.config)
+
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+    def run_once(self, force: bool = False,
+                 regenerate_all: bool = False) -> dict | None:
+        """
+        Re-ingest changed input files and regenerate affected outputs
+
+        Input files are only read again if they changed, and output files
+        are only generated again if the config or the data they use changed
+
+        Arguments:
+            force (bool):
+                whether to run even if no watched file changed
+            regenerate_all (bool):
+                whether to generate every output file again
+
+        Returns:
+            summary of the run or None if nothing changed
+        """
+
+        with self.lock:
+            snapshot = self.get_snapshot()
+            if snapshot == self.snapshot and not force:
+                return None
+
+            changed = sorted(path for path in snapshot
+                             if self.snapshot is None
+                             or snapshot[path] != self.snapshot.get(path))
+            self.snapshot = snapshot
+
+            start = time.perf_counter()
+            result = {"time": dt.now().isoformat(timespec="seconds"),
+                      "changed": changed, "generated": [], "error": None}
+            try:
+                # re-ingest input files that changed
+                self.reformatter.handle_input()
+                data = self.reformatter.data
+
+                # find output files whose config or data changed
+                output_handler = self.reformatter.output_handler
+                output_handler.read_config_file()
+                fingerprints = {
+                    output_file["filename"]:
+                    output_handler.fingerprint_output_data(output_file, data)
+                    for output_file in output_handler.config}
+                stale = [output_file for output_file in output_handler.config
+                         if regenerate_all
+                         or fingerprints[output_file["filename"]]
+                         != self.output_fingerprints.get(
+                                output_file["filename"])
+                         or not os.path.exists(
+                                output_handler.get_output_file_path(
+                                    output_file))]
+
+                # generate them again
+                if stale:
+                    self.reformatter.handle_output(stale)
+                self.output_fingerprints = fingerprints
+                result["generated"] = [output_file["filename"]
+                                       for output_file in stale]
+            except (InputConfigError, OutputConfigError) as error:
+                result["error"] = str(error)
+            except Exception as error:
+                # keep running until the inputs are fixed
+                result["error"] = f"{type(error).__name__}: {error}"
+
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            self.last_result = result
+            return result
+
+    def serve(self) -> ThreadingHTTPServer:
+        """
+        Start the HTTP trigger in a background thread
+
+        POST /run checks for changes right away (POST /run?all=1 generates
+        every output file again) and GET /status returns the last run
+
+        Returns:
+            server of the HTTP trigger
+        """
+
+        service = self
+
+        class TriggerHandler(BaseHTTPRequestHandler):
+            def send_json(self, status: int, body) -> None:
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_POST(self) -> None:
+                url = urlsplit(self.path)
+                if url.path != "/run":
+                    self.send_json(404, {"error": "not found"})
+                    return
+                regenerate_all = "all" in parse_qs(url.query)
+                result = service.run_once(True, regenerate_all)
+                service.report(result)
+                self.send_json(200 if result["error"] is None else 500,
+                               result)
+
+            def do_GET(self) -> None:
+                if urlsplit(self.path).path != "/status":
+                    self.send_json(404, {"error": "not found"})
+                    return
+                self.send_json(200, service.last_result)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        # only accept triggers from this machine
+        server = ThreadingHTTPServer(("127.0.0.1", self.port),
+                                     TriggerHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def report(self, result: dict | None) -> None:
+        """
+        Print a summary of a run
+
+        Arguments:
+            result (dict | None):
+                summary of the run or None if nothing changed
+        """
+
+        # stay quiet when changes didn't affect any output file
+        if result is None or not (result["error"] or result["generated"]):
+            return
+        if result["error"]:
+            print(f'[{result["time"]}] {result["error"]}', flush=True)
+        else:
+            print(f'[{result["time"]}] generated '
+                  f'{len(result["generated"])} output files '
+                  f'in {result["seconds"]}s', flush=True)
+
+    def run(self) -> None:
+        """Poll for changes until interrupted"""
+
+        server = self.serve() if self.port else None
+        if server:
+            print(f"listening on http://127.0.0.1:{self.port}", flush=True)
+
+        try:
+            while True:
+                self.report(self.run_once())
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
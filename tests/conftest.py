@@ -0,0 +1,149 @@
+"""
+Fixtures and helpers shared by the tests of the pipeline
+
+Tests run the example configs (and a pivot config written here) in a copy of
+the repo's configs and input files, and compare what an option generates
+with the sheets of the default path: a single process reading the whole
+files with pandas and writing them with openpyxl.
+
+Run from the repo root with `python -m pytest -q`.
+"""
+
+import os
+import sys
+import json
+import shutil
+import pandas as pd
+import pytest
+
+# import the entry point and the pipeline like reformatted_sheets.py does
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from reformatted_sheets import main  # noqa: E402
+
+INPUT_CONFIG = "input_config_example.json"
+OUTPUT_CONFIG = "output_config_example.json"
+PIVOT_CONFIG = "output_config_pivot.json"
+
+# pivots of the example data, grouped by month and spread into columns
+PIVOT_SHEETS = [
+    {"name": "by_sku", "title": "By SKU", "type": "pivot",
+     "range": {"column": "Order Date", "begin": [2023, 1, 1],
+               "end": [2023, 12, 31]},
+     "columns": [{"name": "SKU", "from": "SKU"},
+                 {"name": "Month", "from": "Order Date", "format": "%b"},
+                 {"name": "Total", "from": "QTY", "type": "value"},
+                 {"name": "Orders", "from": "QTY", "type": "value",
+                  "aggregate": "count"},
+                 {"name": "Average Price", "from": "Price", "type": "value",
+                  "aggregate": "mean"},
+                 {"name": "Sheet", "value": "By SKU"}]},
+    {"name": "by_month", "title": "By Month", "type": "pivot",
+     "spread": "Month",
+     "range": {"column": "Order Date", "begin": [2023, 1, 1],
+               "end": [2023, 12, 31]},
+     "columns": [{"name": "SKU", "from": "SKU"},
+                 {"name": "Month", "from": "Order Date", "format": "%b"},
+                 {"name": "Total", "from": "QTY", "type": "value"}]}]
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Run in a copy of the example configs and input files"""
+
+    shutil.copytree(os.path.join(REPO_DIR, "configs"), tmp_path / "configs")
+    shutil.copytree(os.path.join(REPO_DIR, "input_files"),
+                    tmp_path / "input_files")
+    (tmp_path / "output_files").mkdir()
+
+    # output file with the pivots next to the example sheets
+    with open(tmp_path / "configs" / OUTPUT_CONFIG) as config_file:
+        output_files = json.load(config_file)
+    output_files.append({"filename": "pivot", "sheets": PIVOT_SHEETS})
+    write_config(tmp_path / "configs" / PIVOT_CONFIG, output_files)
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def write_config(path, config) -> None:
+    """Write a config as JSON"""
+
+    with open(path, "w") as config_file:
+        json.dump(config, config_file, indent=4)
+
+
+def read_config(filename: str) -> list:
+    """Read a config of the workspace"""
+
+    with open(os.path.join("configs", filename)) as config_file:
+        return json.load(config_file)
+
+
+def prepend_rows(filename: str, *rows: str) -> None:
+    """Insert rows at the top of an input file, below its header"""
+
+    path = os.path.join("input_files", filename)
+    with open(path) as input_file:
+        header, *lines = input_file.readlines()
+    with open(path, "w") as input_file:
+        input_file.writelines([header, *(row + "\n" for row in rows),
+                               *lines])
+
+
+def run(*options: str, input_config: str = INPUT_CONFIG,
+        output_config: str = PIVOT_CONFIG) -> dict:
+    """
+    Run the pipeline and read the sheets of every xlsx file it generated
+
+    Arguments:
+        *options (str):
+            command line options
+        input_config (str):
+            name of the input config
+        output_config (str):
+            name of the output config
+
+    Returns:
+        dataframe of each sheet by filename and sheet name
+    """
+
+    shutil.rmtree("output_files")
+    os.mkdir("output_files")
+    main([input_config, output_config, *options])
+    return read_sheets()
+
+
+def read_sheets() -> dict:
+    """Read the sheets of every xlsx file in output_files"""
+
+    return {(filename, name): sheet_df
+            for filename in sorted(os.listdir("output_files"))
+            if filename.endswith(".xlsx")
+            for name, sheet_df in pd.read_excel(
+                os.path.join("output_files", filename),
+                sheet_name=None).items()}
+
+
+def read_lines(path: str) -> list[dict]:
+    """Read the JSON lines of an instrumentation file"""
+
+    with open(path) as timings_file:
+        return [json.loads(line) for line in timings_file]
+
+
+def assert_same_sheets(sheets: dict, expected: dict) -> None:
+    """Compare sheets by name, values and column order"""
+
+    assert list(sheets) == list(expected)
+    for key, sheet_df in sheets.items():
+        pd.testing.assert_frame_equal(sheet_df, expected[key],
+                                      check_dtype=False, obj=str(key))
+
+
+def sort_rows(sheet_df: pd.DataFrame) -> pd.DataFrame:
+    """Order rows by their values to compare sheets of partitioned files"""
+
+    return sheet_df.sort_values(list(sheet_df.columns),
+                                ignore_index=True, kind="stable")
@@ -0,0 +1,22 @@
+"""Tests of running the pairs of configs of a batch manifest"""
+
+import os
+import shutil
+from conftest import (INPUT_CONFIG, OUTPUT_CONFIG, PIVOT_CONFIG,
+                      assert_same_sheets, main, read_sheets, run,
+                      write_config)
+
+
+def test_batch(workspace):
+    """A batch manifest generates the output files of each of its pairs"""
+
+    write_config(os.path.join("configs", "batch.json"),
+                 [{"input": INPUT_CONFIG, "output": OUTPUT_CONFIG},
+                  {"input": INPUT_CONFIG, "output": PIVOT_CONFIG}])
+    expected = run()
+
+    shutil.rmtree("output_files")
+    os.mkdir("output_files")
+    main(["--batch", "batch.json"])
+
+    assert_same_sheets(read_sheets(), expected)
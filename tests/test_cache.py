@@ -0,0 +1,104 @@
+"""Tests of reusing the results of previous runs"""
+
+import os
+import pytest
+from conftest import (INPUT_CONFIG, OUTPUT_CONFIG, assert_same_sheets, main,
+                      read_config, read_lines, run, write_config)
+
+
+def test_cache(workspace):
+    """Cached data gives the same sheets as data read again"""
+
+    expected = run()
+
+    assert_same_sheets(run("--cache"), expected)
+    assert_same_sheets(run("--cache"), expected)
+
+
+def test_unchanged_output_files(workspace):
+    """Output files whose data and config haven't changed aren't written"""
+
+    path = os.path.join("output_files", "example.xlsx")
+    main([INPUT_CONFIG, OUTPUT_CONFIG, "--cache"])
+    modified = os.stat(path).st_mtime_ns
+
+    main([INPUT_CONFIG, OUTPUT_CONFIG, "--cache"])
+    assert os.stat(path).st_mtime_ns == modified
+
+    # a changed input file changes the data
+    with open(os.path.join("input_files", "example_two.csv")) as file:
+        lines = file.readlines()
+    with open(os.path.join("input_files", "example_two.csv"), "w") as file:
+        file.writelines(lines[:-1])
+    main([INPUT_CONFIG, OUTPUT_CONFIG, "--cache"])
+    assert os.stat(path).st_mtime_ns != modified
+
+
+def test_replaced_data_is_deleted(workspace):
+    """Only the latest data of each input file is kept"""
+
+    run("--cache")
+    data_files = os.listdir(os.path.join("cache", "data"))
+
+    # rewrite an input file a few times
+    path = os.path.join("input_files", "example_two.csv")
+    with open(path) as file:
+        lines = file.readlines()
+    for end in range(len(lines) - 1, len(lines) - 4, -1):
+        with open(path, "w") as file:
+            file.writelines(lines[:end])
+        run("--cache")
+
+    assert len(os.listdir(os.path.join("cache", "data"))) == len(data_files)
+
+
+def test_arrow_data(workspace):
+    """Input files with "cache" are saved as arrow files and read back"""
+
+    pytest.importorskip("pyarrow")
+    input_files = read_config(INPUT_CONFIG)
+    for input_file in input_files:
+        input_file["cache"] = True
+        for column in input_file["columns"]:
+            if column["name"] == "SKU":
+                column["dtype"] = "category"
+    write_config(os.path.join("configs", "input_config_cached.json"),
+                 input_files)
+    expected = run()
+
+    assert_same_sheets(run(input_config="input_config_cached.json"), expected)
+    data_files = os.listdir(os.path.join("cache", "data"))
+    assert len(data_files) == len(input_files)
+    assert all(filename.endswith(".arrow") for filename in data_files)
+
+    assert_same_sheets(run(input_config="input_config_cached.json"), expected)
+
+
+def test_appended_rows(workspace):
+    """Only rows appended to an input file since the last run are parsed"""
+
+    run("--cache")
+
+    path = os.path.join("input_files", "example_one.csv")
+    with open(path, "a") as file:
+        file.write("2023/4/15,A2,9\n")
+    sheets = run("--cache", "--instrument", "timings.jsonl")
+    assert_same_sheets(sheets, run())
+    assert len(sheets["example.xlsx", "example_sheet_2"]) == 19
+
+    reads = {line["input_file"]: line for line in read_lines("timings.jsonl")
+             if line["stage"] == "read_input_file"}
+    assert reads["example_one.csv"]["appended"] is True
+    assert reads["example_two.csv"]["cached"] is True
+
+    # rows that were changed rather than appended are read again
+    with open(path) as file:
+        lines = file.readlines()
+    with open(path, "w") as file:
+        file.writelines([lines[0], "2023/4/1,A3,3\n", *lines[2:]])
+    os.remove("timings.jsonl")
+    assert_same_sheets(run("--cache", "--instrument", "timings.jsonl"),
+                       run())
+    reads = {line["input_file"]: line for line in read_lines("timings.jsonl")
+             if line["stage"] == "read_input_file"}
+    assert reads["example_one.csv"]["appended"] is False
@@ -0,0 +1,32 @@
+"""Tests of keeping value and low-cardinality columns as categories"""
+
+import os
+import pandas as pd
+from conftest import (INPUT_CONFIG, PIVOT_CONFIG, assert_same_sheets,
+                      read_config, run, write_config)
+from srcs.sheet_reformatter import SheetReformatter
+
+
+def test_categories(workspace):
+    """Value, joined and category columns stay categorical to the sheets"""
+
+    input_files = read_config(INPUT_CONFIG)
+    for input_file in input_files:
+        for column in input_file["columns"]:
+            if column["name"] == "SKU":
+                column["dtype"] = "category"
+    write_config(os.path.join("configs", "input_config_categories.json"),
+                 input_files)
+
+    reformatter = SheetReformatter("input_config_categories.json",
+                                   PIVOT_CONFIG)
+    reformatter.handle_input()
+    for column in ["SKU", "Origin", "Product Name"]:
+        assert isinstance(reformatter.data[column].dtype,
+                          pd.CategoricalDtype), column
+    assert set(reformatter.data["Origin"].cat.categories) == {
+        input_file["filename"] for input_file in input_files
+        if "join_on" not in input_file}
+
+    assert_same_sheets(run(input_config="input_config_categories.json"),
+                       run())
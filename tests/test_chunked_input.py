@@ -0,0 +1,18 @@
+"""Tests of reading input files a chunk at a time"""
+
+import os
+from conftest import (INPUT_CONFIG, assert_same_sheets, read_config, run,
+                      write_config)
+
+
+def test_chunksize(workspace):
+    """Input files read a chunk at a time give the same sheets"""
+
+    input_files = read_config(INPUT_CONFIG)
+    for input_file in input_files:
+        if "join_on" not in input_file:
+            input_file["chunksize"] = 4
+    write_config(os.path.join("configs", "input_config_chunks.json"),
+                 input_files)
+
+    assert_same_sheets(run(input_config="input_config_chunks.json"), run())
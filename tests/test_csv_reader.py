@@ -0,0 +1,35 @@
+"""Tests of the columns, dtypes and parsers the CSV reader is given"""
+
+import os
+import pandas as pd
+import pytest
+from conftest import (INPUT_CONFIG, assert_same_sheets, read_config, run,
+                      write_config)
+
+
+@pytest.mark.parametrize("engine, module", [("c", None), ("python", None),
+                                            ("pyarrow", "pyarrow")])
+def test_dtypes_and_engines(workspace, engine, module):
+    """Each parser with dtypes gives the same sheets, ignoring other columns"""
+
+    if module:
+        pytest.importorskip(module)
+
+    # columns that aren't used are never read
+    path = os.path.join("input_files", "example_one.csv")
+    input_df = pd.read_csv(path, dtype=str)
+    input_df["Unused"] = "not a number"
+    input_df.to_csv(path, index=False)
+
+    input_files = read_config(INPUT_CONFIG)
+    for input_file in input_files:
+        input_file["engine"] = engine
+        for column in input_file["columns"]:
+            if column["name"] == "SKU":
+                column["dtype"] = "category"
+            elif column["name"] == "QTY":
+                column["dtype"] = "int64"
+    write_config(os.path.join("configs", "input_config_dtypes.json"),
+                 input_files)
+
+    assert_same_sheets(run(input_config="input_config_dtypes.json"), run())
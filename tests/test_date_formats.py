@@ -0,0 +1,36 @@
+"""Tests of formatting date columns of sheets"""
+
+import os
+import pandas as pd
+from conftest import run, write_config
+
+FORMATS = ["%a", "%b", "%d/%m/%Y", "%A %d %B %Y", "%Y-%m-%d %H:%M"]
+
+
+def test_formats(workspace):
+    """Dates are formatted like strftime, also when shared across sheets"""
+
+    columns = [{"name": "Date", "from": "Order Date", "format": "%Y-%m-%d"}]
+    columns.extend({"name": date_format, "from": "Order Date",
+                    "format": date_format} for date_format in FORMATS)
+    sheets = [{"name": name, "title": name, "type": "sheet",
+               "range": {"column": "Order Date", "begin": begin,
+                         "end": [2023, 12, 31]},
+               "columns": columns}
+              for name, begin in [("year", [2023, 1, 1]),
+                                  ("may", [2023, 5, 1])]]
+    write_config(os.path.join("configs", "output_config_dates.json"),
+                 [{"filename": "dates", "sheets": sheets},
+                  {"filename": "shared", "sheets": sheets[::-1]}])
+
+    output = run(output_config="output_config_dates.json")
+
+    assert len(output) == 4
+    for sheet_df in output.values():
+        dates = pd.to_datetime(sheet_df["Date"], format="%Y-%m-%d")
+        for date_format in FORMATS:
+            assert (list(sheet_df[date_format])
+                    == list(dates.dt.strftime(date_format)))
+    may_df = output["dates.xlsx", "may"]
+    assert 0 < len(may_df) < len(output["dates.xlsx", "year"])
+    assert (may_df["Date"] >= "2023-05-01").all()
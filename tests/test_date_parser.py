@@ -0,0 +1,83 @@
+"""Tests of parsing dates of input files"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import run
+from srcs.date_parser import get_fixed_width_layout, parse_dates
+from srcs.exceptions import InputConfigError
+
+
+@pytest.mark.parametrize("date_format", ["%Y-%m-%d", "%d/%m/%Y",
+                                         "%Y%m%d %H:%M:%S", "%Y/%m/%d"])
+def test_fixed_width(date_format):
+    """Fixed-width dates are parsed like pandas parses them"""
+
+    dates = pd.Series(pd.date_range("1999-12-25", "2001-03-05",
+                                    freq="37h")).dt.strftime(date_format)
+    dates = dates.where(np.arange(len(dates)) % 7 != 0)
+
+    assert get_fixed_width_layout(date_format) is not None
+    for series in [dates, dates.astype("category")]:
+        pd.testing.assert_series_equal(
+            parse_dates(series, date_format),
+            pd.to_datetime(dates, format=date_format).astype("datetime64[ns]"))
+
+
+@pytest.mark.parametrize("dates", [["2023-02-29"], ["2023-13-01"],
+                                   ["2023-01-01x"], ["2023-1-1", "x"]])
+def test_invalid_fixed_width(dates):
+    """Dates the fast path can't parse are left to pandas"""
+
+    series = pd.Series(["2024-02-29", *dates])
+
+    # the invalid date is the last one
+    with pytest.raises(ValueError, match=f"at position {len(dates)}"):
+        parse_dates(series, "%Y-%m-%d")
+
+
+def test_other_formats():
+    """Formats that aren't fixed-width are parsed by pandas"""
+
+    dates = pd.Series(["2023/4/1", "2023/12/31", None, "2023/4/1"])
+
+    assert get_fixed_width_layout("%Y/%m/%d %b") is None
+    pd.testing.assert_series_equal(
+        parse_dates(dates, "%Y/%m/%d"),
+        pd.to_datetime(dates, format="%Y/%m/%d").astype("datetime64[ns]"))
+
+
+def test_first_invalid_row():
+    """The first row of an invalid date is reported, not its distinct value"""
+
+    dates = np.array(["2023-01-01"] * 10, dtype=object)
+    dates[[3, 8]] = "2023-01-xx"
+    dates[[6, 9]] = "bad"
+
+    with pytest.raises(ValueError, match='"2023-01-xx".*at position 3'):
+        parse_dates(pd.Series(dates), "%Y-%m-%d")
+
+
+def test_invalid_format_position(workspace):
+    """A date that doesn't match its format is reported with its row"""
+
+    path = os.path.join("input_files", "example_one.csv")
+    input_df = pd.read_csv(path, dtype=str)
+    input_df.loc[4, "Order Date"] = "2023/4/xx"
+    input_df.to_csv(path, index=False)
+
+    with pytest.raises(InputConfigError) as error:
+        run()
+    message = str(error.value)
+    assert "'Order Date'" in message and '"example_one.csv"' in message
+    assert '"2023/4/xx"' in message and "at position 4" in message
+
+
+def test_first_invalid_row_after_missing():
+    """Dates pandas takes as missing aren't reported as invalid"""
+
+    dates = pd.Series(["2023-01-01", "NaT", "2023-01-xx", "NaT"])
+
+    with pytest.raises(ValueError, match='"2023-01-xx".*at position 2'):
+        parse_dates(dates, "%Y-%m-%d")
@@ -0,0 +1,45 @@
+"""Tests of the timings of each stage"""
+
+import os
+import pytest
+from conftest import assert_same_sheets, read_lines, run
+from srcs.exceptions import InputConfigError
+
+
+def test_instrument(workspace):
+    """Each stage of a run is recorded once it's done, without changes"""
+
+    expected = run()
+
+    assert_same_sheets(run("--instrument", "timings.jsonl"), expected)
+    lines = read_lines("timings.jsonl")
+    stages = [line["stage"] for line in lines]
+    assert stages.count("read_input_file") == 4
+    assert stages.count("output_file") == 2
+    assert stages.index("handle_input") < stages.index("handle_output")
+    assert len({line["run_id"] for line in lines}) == 1
+    assert all(line["seconds"] >= 0 and "rss_delta_mb" in line
+               for line in lines)
+
+
+def test_instrument_environment(workspace, monkeypatch):
+    """The environment variable enables instrumentation like the option"""
+
+    monkeypatch.setenv("REFORMATTED_SHEETS_INSTRUMENT", "timings.jsonl")
+    run()
+
+    assert {"handle_input", "handle_output"} <= {
+        line["stage"] for line in read_lines("timings.jsonl")}
+
+
+def test_failed_stage(workspace):
+    """A stage that fails is still recorded, with its error"""
+
+    with open(os.path.join("input_files", "example_join.csv"), "a") as file:
+        file.write('A2,"Example Product Two Again",1.9\n')
+
+    with pytest.raises(InputConfigError):
+        run("--instrument", "timings.jsonl")
+    errors = {line["stage"]: line["error"]
+              for line in read_lines("timings.jsonl") if "error" in line}
+    assert errors["handle_input"] == "InputConfigError"
@@ -0,0 +1,36 @@
+"""Tests of joining lookup files onto the data"""
+
+import os
+import pytest
+from conftest import run
+from srcs.exceptions import InputConfigError
+
+
+def test_missing_keys(workspace):
+    """Rows whose key isn't in the joined file are kept without its columns"""
+
+    with open(os.path.join("input_files", "example_one.csv"), "a") as file:
+        file.write("2023/4/20,Z9,6\n")
+
+    sheet_df = run()["example.xlsx", "example_sheet_2"]
+
+    assert len(sheet_df) == 19
+    missing = sheet_df[sheet_df["SKU"] == "Z9"]
+    assert list(missing["Amount"]) == [6]
+    assert missing[["Product Name", "Price"]].isna().all(axis=None)
+    assert sheet_df.loc[sheet_df["SKU"] != "Z9",
+                        "Product Name"].notna().all()
+
+
+def test_duplicate_join_key(workspace):
+    """Join files with a key on several rows are refused"""
+
+    with open(os.path.join("input_files", "example_join.csv"), "a") as file:
+        file.write('A2,"Example Product Two Again",1.9\n')
+
+    with pytest.raises(InputConfigError) as error:
+        run()
+    message = str(error.value)
+    assert "DuplicateJoinKey" not in message
+    assert "'SKU'" in message and '"example_join.csv"' in message
+    assert "A2" in message
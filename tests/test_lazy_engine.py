@@ -0,0 +1,25 @@
+"""Tests of running the pipeline as a lazy polars query"""
+
+import pytest
+from conftest import assert_same_sheets, prepend_rows, run
+
+
+@pytest.fixture(autouse=True)
+def polars():
+    """Skip the tests if polars isn't installed"""
+
+    return pytest.importorskip("polars")
+
+
+def test_engine(workspace):
+    """The lazy query gives the same sheets as pandas"""
+
+    assert_same_sheets(run("--engine", "polars"), run())
+
+
+def test_unsorted_rows(workspace):
+    """Rows keep the order they were read in"""
+
+    prepend_rows("example_one.csv", "2023/5/20,A3,8")
+
+    assert_same_sheets(run("--engine", "polars"), run())
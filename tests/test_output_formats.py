@@ -0,0 +1,86 @@
+"""Tests of output files in other formats than xlsx"""
+
+import os
+import pandas as pd
+import pytest
+from conftest import (INPUT_CONFIG, OUTPUT_CONFIG, main, read_config, run,
+                      sort_rows, write_config)
+from srcs.exceptions import OutputConfigError
+
+
+@pytest.mark.parametrize("file_format, module",
+                         [("csv", None), ("parquet", "pyarrow"),
+                          ("feather", "pyarrow")])
+def test_formats(workspace, file_format, module):
+    """Files of other formats, partitioned or not, have the xlsx sheets"""
+
+    if module:
+        pytest.importorskip(module)
+    expected = run(output_config=OUTPUT_CONFIG)
+
+    output_files = read_config(OUTPUT_CONFIG)
+    output_files[0]["format"] = file_format
+    output_files.append(dict(output_files[0], filename="partitioned",
+                             partition="month"))
+    write_config(os.path.join("configs", "output_config_formats.json"),
+                 output_files)
+    run(output_config="output_config_formats.json")
+
+    read = {"csv": pd.read_csv, "parquet": pd.read_parquet,
+            "feather": pd.read_feather}[file_format]
+    for (_, name), sheet_df in expected.items():
+        sheet_df = sheet_df.astype(str)
+        folder = os.path.join("output_files", "example")
+        whole_df = read(os.path.join(folder, f"{name}.{file_format}"))
+        pd.testing.assert_frame_equal(whole_df.astype(str), sheet_df)
+
+        # the partitions together have the rows of the sheet
+        folder = os.path.join("output_files", "partitioned", name)
+        part_df = pd.concat([read(os.path.join(folder, filename))
+                             for filename in sorted(os.listdir(folder))
+                             if filename.endswith("." + file_format)],
+                            ignore_index=True)
+        pd.testing.assert_frame_equal(sort_rows(part_df.astype(str)),
+                                      sort_rows(sheet_df))
+
+
+def test_invalid_filename(workspace):
+    """Filenames that could leave output_files are refused"""
+
+    output_files = read_config(OUTPUT_CONFIG)
+    output_files[0]["filename"] = "../example"
+    write_config(os.path.join("configs", "output_config_invalid.json"),
+                 output_files)
+
+    with pytest.raises(OutputConfigError) as error:
+        run(output_config="output_config_invalid.json")
+    assert "filename" in str(error.value)
+
+
+def test_removed_partitions(workspace):
+    """Partitions the last run wrote are removed, other files are kept"""
+
+    output_files = read_config(OUTPUT_CONFIG)
+    output_files[0].update({"format": "csv", "partition": "month"})
+    write_config(os.path.join("configs", "output_config_partitions.json"),
+                 output_files)
+    run(output_config="output_config_partitions.json")
+    folder = os.path.join("output_files", "example", "example_sheet_2")
+    assert "2023-05.csv" in os.listdir(folder)
+    with open(os.path.join(folder, "notes.txt"), "w") as notes_file:
+        notes_file.write("keep")
+
+    # without the rows of May, its partition isn't written again
+    for filename in ["example_one.csv", "example_two.csv",
+                     "example_three.csv"]:
+        path = os.path.join("input_files", filename)
+        input_df = pd.read_csv(path, dtype=str)
+        dates = pd.to_datetime(input_df.iloc[:, 0], format="mixed",
+                               dayfirst=filename == "example_three.csv")
+        input_df[dates.dt.month != 5].to_csv(path, index=False)
+    partitions = os.listdir(folder)
+    main([INPUT_CONFIG, "output_config_partitions.json"])
+
+    assert sorted(os.listdir(folder)) == sorted(
+        set(partitions) - {"2023-05.csv"})
+    assert "notes.txt" in partitions
@@ -0,0 +1,68 @@
+"""Tests of generating output files in worker processes"""
+
+import os
+import multiprocessing
+import pandas as pd
+import pytest
+from conftest import (INPUT_CONFIG, OUTPUT_CONFIG, PIVOT_SHEETS,
+                      assert_same_sheets, read_config, run, write_config)
+from srcs.exceptions import OutputConfigError
+from srcs.output_handler import OutputHandler
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_output_jobs(workspace, monkeypatch, start_method):
+    """Output files generated by workers have the same sheets"""
+
+    if start_method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{start_method} isn't supported")
+    expected = run()
+
+    # workers get the config and build their own handler, so the handler
+    # (and the data its planner holds) is never pickled
+    def refuse_pickling(self):
+        raise TypeError("the output handler was pickled")
+
+    monkeypatch.setattr(OutputHandler, "__getstate__", refuse_pickling,
+                        raising=False)
+    default_method = multiprocessing.get_start_method()
+    multiprocessing.set_start_method(start_method, force=True)
+    try:
+        sheets = run("--output-jobs", "2")
+    finally:
+        multiprocessing.set_start_method(default_method, force=True)
+
+    assert_same_sheets(sheets, expected)
+
+
+
+def test_output_files_failed(workspace):
+    """Every output file that fails in a worker process is reported"""
+
+    # the prices are text, so their mean can't be taken
+    input_files = read_config(INPUT_CONFIG)
+    input_files[-1]["columns"][-1]["dtype"] = "str"
+    write_config(os.path.join("configs", "input_config_text.json"),
+                 input_files)
+    output_files = [{"filename": f"failed_{index}",
+                     "sheets": PIVOT_SHEETS[:1]} for index in range(2)]
+    output_files.append(read_config(OUTPUT_CONFIG)[0])
+    write_config(os.path.join("configs", "output_config_failed.json"),
+                 output_files)
+
+    with pytest.raises(OutputConfigError) as error:
+        run("--output-jobs", "2", input_config="input_config_text.json",
+            output_config="output_config_failed.json")
+    message = str(error.value)
+    assert "2 of 3 output files failed" in message
+    assert message.count("aggregation 'mean'") == 2
+    assert '"failed_0": TypeError' in message
+    assert '"failed_1": TypeError' in message
+
+    # the output file that didn't fail is still generated
+    sheets = pd.read_excel(os.path.join("output_files", "example.xlsx"),
+                           sheet_name=None)
+    expected = run(input_config="input_config_text.json",
+                   output_config=OUTPUT_CONFIG)
+    assert_same_sheets({("example.xlsx", name): sheet_df
+                        for name, sheet_df in sheets.items()}, expected)
@@ -0,0 +1,26 @@
+"""Tests of reading input files with a pool of workers"""
+
+import os
+import pytest
+from conftest import assert_same_sheets, read_lines, run
+
+
+@pytest.mark.parametrize("options", [["--jobs", "2"],
+                                     ["--jobs", "2", "--processes"]],
+                         ids=["threads", "processes"])
+def test_jobs(workspace, options):
+    """Input files read by threads or processes give the same sheets"""
+
+    assert_same_sheets(run(*options), run())
+
+
+def test_instrumented_processes(workspace):
+    """Worker processes send the timings of their stages back"""
+
+    run("--jobs", "2", "--processes", "--instrument", "timings.jsonl")
+
+    lines = read_lines("timings.jsonl")
+    reads = [line for line in lines if line["stage"] == "read_input_file"]
+    assert len(reads) == 4
+    assert all(line["pid"] != os.getpid() for line in reads)
+    assert len({line["run_id"] for line in lines}) == 1
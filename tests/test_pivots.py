@@ -0,0 +1,58 @@
+"""Tests of pivot sheets"""
+
+import os
+import pytest
+from conftest import INPUT_CONFIG, PIVOT_SHEETS, main, run, write_config
+from srcs.exceptions import OutputConfigError
+
+
+def test_pivots(workspace):
+    """Pivots aggregate the rows of their range by their key columns"""
+
+    sheets = run()
+
+    assert list(sheets) == [("example.xlsx", "example_sheet_1"),
+                            ("example.xlsx", "example_sheet_2"),
+                            ("pivot.xlsx", "by_sku"),
+                            ("pivot.xlsx", "by_month")]
+    rows_df = sheets["example.xlsx", "example_sheet_2"]
+    expected = rows_df.groupby(["SKU", "Date"], sort=False).agg(
+        Total=("Amount", "sum"), Orders=("Amount", "count"),
+        Price=("Price", "mean"))
+
+    pivot_df = sheets["pivot.xlsx", "by_sku"].set_index(["SKU", "Month"])
+    assert list(pivot_df.columns) == ["Total", "Orders", "Average Price",
+                                      "Sheet"]
+    assert sorted(pivot_df.index) == sorted(expected.index)
+    for key, row in expected.iterrows():
+        assert pivot_df.loc[key, "Total"] == row["Total"]
+        assert pivot_df.loc[key, "Orders"] == row["Orders"]
+        assert pivot_df.loc[key, "Average Price"] == pytest.approx(
+                                                        row["Price"])
+    assert (pivot_df["Sheet"] == "By SKU").all()
+
+    # months are spread into columns, one row per SKU
+    spread_df = sheets["pivot.xlsx", "by_month"].set_index("SKU")
+    assert set(spread_df.columns) == set(rows_df["Date"])
+    assert sorted(spread_df.index) == sorted(rows_df["SKU"].unique())
+    for (sku, month), row in expected.iterrows():
+        assert spread_df.loc[sku, month] == row["Total"]
+
+
+@pytest.mark.parametrize("columns", [
+    [{"name": "Total", "from": "QTY", "type": "value"}],
+    [{"name": "Sheet", "value": "No Keys"},
+     {"name": "Total", "from": "QTY", "type": "value"}],
+    [{"name": "SKU", "from": "SKU"}]], ids=["values", "custom", "keys"])
+def test_invalid_columns(workspace, columns):
+    """Pivots without columns to group by or to aggregate are refused"""
+
+    sheet = dict(PIVOT_SHEETS[0], columns=columns)
+    write_config(os.path.join("configs", "output_config_invalid.json"),
+                 [{"filename": "invalid", "sheets": [sheet]}])
+
+    for options in [[], ["--validate"]]:
+        with pytest.raises(OutputConfigError) as error:
+            main([INPUT_CONFIG, "output_config_invalid.json", *options])
+        assert "invalid column info" in str(error.value)
+    assert not os.listdir("output_files")
@@ -0,0 +1,29 @@
+"""Tests of sharing filtered rows and columns across sheets"""
+
+import os
+import pandas as pd
+from conftest import OUTPUT_CONFIG, read_config, run, write_config
+
+
+def test_shared_sheets(workspace):
+    """Sheets with the same range give the same rows in every output file"""
+
+    expected = run(output_config=OUTPUT_CONFIG)
+
+    # the same sheets, reversed and with their columns reversed
+    output_files = read_config(OUTPUT_CONFIG)
+    reversed_file = {"filename": "reversed", "sheets": [
+        dict(sheet, columns=sheet["columns"][::-1])
+        for sheet in output_files[0]["sheets"][::-1]]}
+    output_files.extend([dict(output_files[0], filename="copy"),
+                         reversed_file])
+    write_config(os.path.join("configs", "output_config_shared.json"),
+                 output_files)
+
+    output = run(output_config="output_config_shared.json")
+
+    for (_, name), sheet_df in expected.items():
+        pd.testing.assert_frame_equal(output["example.xlsx", name], sheet_df)
+        pd.testing.assert_frame_equal(output["copy.xlsx", name], sheet_df)
+        pd.testing.assert_frame_equal(
+            output["reversed.xlsx", name][sheet_df.columns], sheet_df)
@@ -0,0 +1,60 @@
+"""Tests of slicing the date ranges of sheets from the combined data"""
+
+import os
+import pandas as pd
+from conftest import INPUT_CONFIG, read_config, run, write_config
+
+
+def read_example_data() -> pd.DataFrame:
+    """Read the dates and quantities of the example files in input order"""
+
+    frames = []
+    for input_file in read_config(INPUT_CONFIG):
+        if "join_on" in input_file:
+            continue
+        columns = {column["name"]: column for column in input_file["columns"]
+                   if "from" in column}
+        input_df = pd.read_csv(os.path.join("input_files",
+                                            input_file["filename"]),
+                               dtype=str)
+        frames.append(pd.DataFrame({
+            "Order Date": pd.to_datetime(
+                input_df[columns["Order Date"]["from"]],
+                format=columns["Order Date"]["format"]),
+            "QTY": input_df[columns["QTY"]["from"]].astype(int)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_ranges(workspace):
+    """Each sheet has the rows of its range, boundaries included, in order"""
+
+    # rows of a month before rows of an earlier one keep their order
+    path = os.path.join("input_files", "example_one.csv")
+    with open(path) as file:
+        header, *lines = file.readlines()
+    with open(path, "w") as file:
+        file.writelines([header, "2023/5/20,A3,8\n", *lines])
+
+    ranges = [([2023, 4, 1], [2023, 4, 30]), ([2023, 4, 2], [2023, 4, 2]),
+              ([2023, 4, 15], [2023, 5, 12]), ([2023, 5, 13], [2023, 5, 13]),
+              ([2022, 1, 1], [2022, 12, 31]), ([2023, 1, 1], [2023, 12, 31])]
+    sheets = [{"name": f"range_{index}", "title": f"Range {index}",
+               "type": "sheet",
+               "range": {"column": "Order Date", "begin": begin, "end": end},
+               "columns": [{"name": "Date", "from": "Order Date",
+                            "format": "%Y-%m-%d"},
+                           {"name": "Amount", "from": "QTY"}]}
+              for index, (begin, end) in enumerate(ranges)]
+    write_config(os.path.join("configs", "output_config_ranges.json"),
+                 [{"filename": "ranges", "sheets": sheets}])
+
+    output = run(output_config="output_config_ranges.json")
+
+    data_df = read_example_data()
+    for index, (begin, end) in enumerate(ranges):
+        in_range = data_df[data_df["Order Date"].between(
+            pd.Timestamp(*begin), pd.Timestamp(*end))]
+        sheet_df = output["ranges.xlsx", f"range_{index}"]
+        assert (list(sheet_df["Date"])
+                == list(in_range["Order Date"].dt.strftime("%Y-%m-%d")))
+        assert list(sheet_df["Amount"]) == list(in_range["QTY"])
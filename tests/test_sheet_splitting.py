@@ -0,0 +1,61 @@
+"""Tests of splitting sheets too large for xlsx into parts"""
+
+import os
+import pandas as pd
+import pytest
+from conftest import OUTPUT_CONFIG, read_config, run, write_config
+
+# rows of a part in the tests, instead of the rows that fit in a sheet
+PART_ROWS = 5
+
+# writers and the modules they require
+WRITERS = [("openpyxl", None), ("xlsxwriter", "xlsxwriter"), ("stream", None)]
+
+
+def get_part_count(sheet_df: pd.DataFrame) -> int:
+    """Get the number of parts a sheet is split into"""
+
+    return (len(sheet_df) - 1) // PART_ROWS + 1
+
+
+@pytest.mark.parametrize("writer, module", WRITERS)
+def test_split_sheets(workspace, monkeypatch, writer, module):
+    """Sheets split into continuation sheets have the rows of the sheet"""
+
+    if module:
+        pytest.importorskip(module)
+    expected = run(output_config=OUTPUT_CONFIG)
+    monkeypatch.setattr("srcs.output_handler.MAX_SHEET_ROWS", PART_ROWS)
+    sheets = run("--writer", writer, output_config=OUTPUT_CONFIG)
+
+    assert len(sheets) == sum(map(get_part_count, expected.values()))
+    for (filename, name), sheet_df in expected.items():
+        parts = [sheets[filename, name]]
+        parts.extend(sheets[filename, f"{name} ({part})"]
+                     for part in range(2, get_part_count(sheet_df) + 1))
+        assert all(len(part_df) <= PART_ROWS for part_df in parts)
+        pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True),
+                                      sheet_df, check_dtype=False)
+
+
+@pytest.mark.parametrize("writer, module", WRITERS)
+def test_split_files(workspace, monkeypatch, writer, module):
+    """Sheets split into continuation files have the rows of the sheet"""
+
+    if module:
+        pytest.importorskip(module)
+    expected = run(output_config=OUTPUT_CONFIG)
+    output_files = read_config(OUTPUT_CONFIG)
+    output_files[0]["split"] = "files"
+    write_config(os.path.join("configs", "output_config_split.json"),
+                 output_files)
+    monkeypatch.setattr("srcs.output_handler.MAX_SHEET_ROWS", PART_ROWS)
+    sheets = run("--writer", writer, output_config="output_config_split.json")
+
+    for (_, name), sheet_df in expected.items():
+        parts = [sheets["example.xlsx", name]]
+        parts.extend(sheets[f"example ({part}).xlsx", name]
+                     for part in range(2, get_part_count(sheet_df) + 1))
+        assert all(len(part_df) <= PART_ROWS for part_df in parts)
+        pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True),
+                                      sheet_df, check_dtype=False)
@@ -0,0 +1,56 @@
+"""Tests of spilling the combined data to disk by month"""
+
+import pytest
+import os
+from conftest import (INPUT_CONFIG, assert_same_sheets, prepend_rows,
+                      read_config, run, write_config)
+from srcs.exceptions import InputConfigError
+
+
+@pytest.fixture(autouse=True)
+def pyarrow():
+    """Skip the tests if pyarrow isn't installed"""
+
+    return pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("writer", ["openpyxl", "stream"])
+def test_spill(workspace, writer):
+    """Sheets generated a month at a time are the same"""
+
+    expected = run()
+
+    assert_same_sheets(run("--spill", "spill", "--writer", writer), expected)
+
+
+def test_foreign_spill_folder(workspace):
+    """Folders --spill didn't create are neither used nor removed"""
+
+    foreign = workspace / "spill" / "reformatted-sheets-spill"
+    foreign.mkdir(parents=True)
+    (foreign / "keep.txt").write_text("keep")
+
+    with pytest.raises(InputConfigError) as error:
+        run("--spill", "spill")
+    assert "reformatted-sheets-spill" in str(error.value)
+    assert (foreign / "keep.txt").read_text() == "keep"
+
+
+@pytest.mark.parametrize("writer", ["openpyxl", "stream"])
+@pytest.mark.parametrize("chunksize", [None, 3])
+def test_unsorted_rows(workspace, writer, chunksize):
+    """Rows of a month read before rows of an earlier one keep their order"""
+
+    prepend_rows("example_one.csv", "2023/5/20,A3,8")
+    expected = run()
+
+    # small chunks spill several part files to each month
+    input_files = read_config(INPUT_CONFIG)
+    for input_file in input_files:
+        if chunksize and "join_on" not in input_file:
+            input_file["chunksize"] = chunksize
+    write_config(os.path.join("configs", "input_config_spill.json"),
+                 input_files)
+
+    assert_same_sheets(run("--spill", "spill", "--writer", writer,
+                           input_config="input_config_spill.json"), expected)
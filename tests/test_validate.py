@@ -0,0 +1,76 @@
+"""Tests of checking configs without running the pipeline"""
+
+import os
+import sys
+import subprocess
+import pytest
+from conftest import (INPUT_CONFIG, PIVOT_CONFIG, REPO_DIR, main, read_config,
+                      read_lines, write_config)
+from srcs.exceptions import InputConfigError, OutputConfigError
+
+# entry point of the command line
+SCRIPT = os.path.join(REPO_DIR, "reformatted_sheets.py")
+
+
+def test_validate(workspace):
+    """Valid configs are reported without reading data or importing pandas"""
+
+    code = (f"import sys; sys.path.insert(0, {REPO_DIR!r}); "
+            "from reformatted_sheets import main; "
+            f"main([{INPUT_CONFIG!r}, {PIVOT_CONFIG!r}, '--validate']); "
+            "print('pandas' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code],
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.splitlines() == [
+        f'"{INPUT_CONFIG}" and "{PIVOT_CONFIG}" are valid', "False"]
+    assert not os.listdir("output_files")
+
+
+def test_validate_errors(workspace):
+    """Invalid configs are reported and exit with an error"""
+
+    result = subprocess.run([sys.executable, SCRIPT, INPUT_CONFIG,
+                             "missing.json", "--validate"],
+                            capture_output=True, text=True)
+
+    assert result.returncode == 1
+    assert result.stdout.startswith("OutputConfigError: ")
+    assert '"missing.json"' in result.stdout
+
+
+def test_missing_input_column(workspace):
+    """Columns missing from the header of an input file fail before reading"""
+
+    path = os.path.join("input_files", "example_two.csv")
+    with open(path) as file:
+        lines = file.readlines()
+    with open(path, "w") as file:
+        file.writelines([lines[0].replace("Quantity", "Amount"),
+                         *lines[1:]])
+
+    for options in [["--validate"], ["--instrument", "timings.jsonl"]]:
+        with pytest.raises(InputConfigError) as error:
+            main([INPUT_CONFIG, PIVOT_CONFIG, *options])
+        assert ("column 'Quantity' cannot be found in \"example_two.csv\""
+                in str(error.value))
+    assert not os.listdir("output_files")
+
+    # no input file was read
+    stages = {line["stage"] for line in read_lines("timings.jsonl")}
+    assert "schema" in stages and "read_csv" not in stages
+
+
+def test_missing_output_column(workspace):
+    """Sheet columns no input file has fail before reading"""
+
+    output_files = read_config(PIVOT_CONFIG)
+    output_files[1]["sheets"][0]["columns"][0]["from"] = "Region"
+    write_config(os.path.join("configs", "output_config_region.json"),
+                 output_files)
+
+    for options in [["--validate"], []]:
+        with pytest.raises(OutputConfigError) as error:
+            main([INPUT_CONFIG, "output_config_region.json", *options])
+        assert "Region" in str(error.value)
+    assert not os.listdir("output_files")
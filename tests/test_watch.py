@@ -0,0 +1,56 @@
+"""Tests of regenerating output files when their inputs change"""
+
+import os
+from conftest import (INPUT_CONFIG, PIVOT_CONFIG, assert_same_sheets,
+                      read_config, read_sheets, run, write_config)
+from srcs.sheet_reformatter import SheetReformatter
+from srcs.watch_service import WatchService
+
+
+def test_run_once(workspace):
+    """Only output files whose config or data changed are generated again"""
+
+    service = WatchService(SheetReformatter(INPUT_CONFIG, PIVOT_CONFIG))
+
+    assert service.run_once()["generated"] == ["example", "pivot"]
+
+    # input files are watched once the input config was read
+    assert service.run_once()["generated"] == []
+    assert service.run_once() is None
+
+    # a changed sheet of one output file
+    output_files = read_config(PIVOT_CONFIG)
+    output_files[1]["sheets"][0]["title"] = "Changed"
+    write_config(os.path.join("configs", PIVOT_CONFIG), output_files)
+    assert service.run_once()["generated"] == ["pivot"]
+
+    # rows appended to an input file
+    with open(os.path.join("input_files", "example_one.csv"), "a") as file:
+        file.write("2023/4/15,A2,9\n")
+    result = service.run_once()
+    assert result["generated"] == ["example", "pivot"]
+    assert result["changed"] == ["input_files/example_one.csv"]
+    assert_same_sheets(read_sheets(), run())
+
+
+def test_errors_keep_running(workspace):
+    """Errors are reported and the next change is picked up"""
+
+    service = WatchService(SheetReformatter(INPUT_CONFIG, PIVOT_CONFIG))
+    service.run_once()
+
+    path = os.path.join("input_files", "example_join.csv")
+    with open(path) as file:
+        lines = file.readlines()
+    with open(path, "a") as file:
+        file.write('A2,"Example Product Two Again",1.9\n')
+    result = service.run_once()
+    assert "duplicate values" in result["error"]
+    assert result["generated"] == []
+
+    # a fixed file with new data
+    with open(path, "w") as file:
+        file.writelines(lines[:-1])
+    result = service.run_once()
+    assert result["error"] is None
+    assert result["generated"] == ["example", "pivot"]
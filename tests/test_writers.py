@@ -0,0 +1,43 @@
+"""Tests of the xlsx writers"""
+
+import os
+import pandas as pd
+import pytest
+from conftest import assert_same_sheets, run
+
+
+@pytest.mark.parametrize("writer, module", [("xlsxwriter", "xlsxwriter"),
+                                            ("stream", None)])
+def test_writer(workspace, writer, module):
+    """Each writer writes the same sheets as openpyxl"""
+
+    if module:
+        pytest.importorskip(module)
+
+    assert_same_sheets(run("--writer", writer), run())
+
+
+@pytest.mark.parametrize("writer, module", [("openpyxl", None),
+                                            ("xlsxwriter", "xlsxwriter"),
+                                            ("stream", None)])
+def test_non_finite_numbers(workspace, writer, module):
+    """Infinite and missing numbers are written as empty cells"""
+
+    if module:
+        pytest.importorskip(module)
+
+    # prices of A1 and A2 are infinite and of A3 missing
+    path = os.path.join("input_files", "example_join.csv")
+    join_df = pd.read_csv(path, dtype=str)
+    join_df["Price"] = join_df["Price"].mask(join_df["SKU"] == "A1", "inf")
+    join_df["Price"] = join_df["Price"].mask(join_df["SKU"] == "A2", "-inf")
+    join_df["Price"] = join_df["Price"].mask(join_df["SKU"] == "A3", "")
+    join_df.to_csv(path, index=False)
+
+    sheets = run("--writer", writer)
+
+    sheet_df = sheets["example.xlsx", "example_sheet_2"]
+    missing = sheet_df["SKU"].isin(["A1", "A2", "A3"])
+    assert sheet_df.loc[missing, "Price"].isna().all()
+    assert sheet_df.loc[~missing, "Price"].notna().all()
+    assert sheets["pivot.xlsx", "by_sku"]["Average Price"].isna().any()